@@ -6,6 +6,7 @@ from api.api import api as translator_ns
 from person.views import api as person_ns
 from orgs.views import api as orgs_ns
 from resource.views import api as resource_ns
+from transaction.views import api as transaction_ns
 app = Flask(__name__)
 cors = CORS(app,
             allow_headers=["Content-Type", "Authorization", "User-Agent", "Accept"],
@@ -47,3 +48,4 @@ api = Api(app,
 api.add_namespace(translator_ns, path='/api/v1/translator')
 api.add_namespace(person_ns, path='/api/v1/person')
 api.add_namespace(resource_ns, path='/api/v1/resource')
+api.add_namespace(transaction_ns, path='/api/v1/transaction')
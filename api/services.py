@@ -0,0 +1,93 @@
+import functools
+import threading
+
+from api import settings
+from blockchain_interface.decision_engine import DecisionEngine
+from blockchain_interface.interfaces.ABACContracts.Multicall import ABACMulticall
+from blockchain_interface.interfaces.ABACContracts.PAP import PolicyAdministrationPoint
+from blockchain_interface.interfaces.ABACContracts.PDP import PolicyDecisionPoint
+from blockchain_interface.interfaces.ABACContracts.PIP import PolicyInformationPoint
+from blockchain_interface.registry import ContractRegistry
+from keycloak_interface.keycloakInterface import KeycloakInterface
+
+# Clients shared by every API namespace, built on first use so importing the app
+# neither needs the RPC node nor reads the compiled contracts.
+registry = ContractRegistry()
+
+
+def lazy(factory):
+    """
+    Build the value of a getter once, on its first call (thread-safe).
+    """
+    lock = threading.Lock()
+    built = []
+
+    @functools.wraps(factory)
+    def getter():
+        if not built:
+            with lock:
+                if not built:
+                    built.append(factory())
+        return built[0]
+
+    return getter
+
+
+def _contract_path(file_name: str) -> str:
+    return f"{settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_CONTRACTS_ROOT_PATH')}/{file_name}"
+
+
+@lazy
+def get_keycloak_interface() -> KeycloakInterface:
+    return KeycloakInterface.from_config(settings.KEYCLOAK_CONFIG)
+
+
+@lazy
+def get_evm_interface():
+    evm_interface = registry.get_interface(
+        settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_RPC_URL'),
+        settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_PRIVATE_KEY')
+    )
+    evm_interface.read_cache.configure(
+        ttl=settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_READ_CACHE_TTL'),
+        max_size=settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_READ_CACHE_SIZE'),
+        log_check_interval=settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_READ_CACHE_LOG_CHECK_INTERVAL')
+    )
+    evm_interface.gas_estimator.configure(
+        margin=settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_GAS_MARGIN'),
+        refresh_interval=settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_GAS_REFRESH_INTERVAL'),
+        enabled=settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_GAS_ESTIMATION')
+    )
+    return evm_interface
+
+
+def get_pip() -> PolicyInformationPoint:
+    return registry.get_contract(PolicyInformationPoint, get_evm_interface(),
+                                 settings.BLOCKCHAIN_CONFIG.get('POLICY_INFORMATION_POINT_ADDRESS'),
+                                 _contract_path("PIP.sol"))
+
+
+def get_pap() -> PolicyAdministrationPoint:
+    return registry.get_contract(PolicyAdministrationPoint, get_evm_interface(),
+                                 settings.BLOCKCHAIN_CONFIG.get('POLICY_ADMINISTRATION_POINT_ADDRESS'),
+                                 _contract_path("PAP.sol"))
+
+
+def get_pdp() -> PolicyDecisionPoint:
+    return registry.get_contract(PolicyDecisionPoint, get_evm_interface(),
+                                 settings.BLOCKCHAIN_CONFIG.get('POLICY_DECISION_POINT_ADDRESS'),
+                                 _contract_path("PDP.sol"))
+
+
+def get_multicall() -> ABACMulticall | None:
+    # optional, the PIP falls back to a batched JSON-RPC request when it is not deployed
+    if not settings.BLOCKCHAIN_CONFIG.get('ABAC_MULTICALL_ADDRESS'):
+        return None
+    return registry.get_contract(ABACMulticall, get_evm_interface(),
+                                 settings.BLOCKCHAIN_CONFIG.get('ABAC_MULTICALL_ADDRESS'),
+                                 _contract_path("ABACMulticall.sol"))
+
+
+@lazy
+def get_decision_engine() -> DecisionEngine:
+    return DecisionEngine.from_config(get_pdp(), get_pip(), get_pap(), settings.BLOCKCHAIN_CONFIG)
@@ -30,7 +30,29 @@ KEYCLOAK_CONFIG = {
     'KEYCLOAK_SERVER_URL': os.environ.get('KEYCLOAK_SERVER_URL'),
     'KEYCLOAK_REALM': os.environ.get('OIDC_RP_REALM_ID'),
     'KEYCLOAK_CLIENT_ID': os.environ.get('OIDC_RP_CLIENT_ID'),
-    'KEYCLOAK_CLIENT_SECRET_KEY': os.environ.get('OIDC_RP_CLIENT_SECRET')
+    'KEYCLOAK_CLIENT_SECRET_KEY': os.environ.get('OIDC_RP_CLIENT_SECRET'),
+    # Token verification: "introspect" (ask Keycloak on every request) or "local" (verify JWT with the JWKS)
+    'KEYCLOAK_TOKEN_VERIFICATION': os.environ.get('KEYCLOAK_TOKEN_VERIFICATION', 'introspect'),
+    'KEYCLOAK_JWKS_ENDPOINT': OIDC_OP_JWKS_ENDPOINT,
+    'KEYCLOAK_JWKS_CACHE_TTL': int(os.environ.get('KEYCLOAK_JWKS_CACHE_TTL', 300)),
+    'KEYCLOAK_TOKEN_ALGORITHMS': [OIDC_RP_SIGN_ALGO or 'RS256'],
+    'KEYCLOAK_TOKEN_AUDIENCE': os.environ.get('KEYCLOAK_TOKEN_AUDIENCE'),
+    'KEYCLOAK_TOKEN_ISSUER': os.environ.get('KEYCLOAK_TOKEN_ISSUER'),
+    'KEYCLOAK_INTROSPECTION_FALLBACK': os.environ.get('KEYCLOAK_INTROSPECTION_FALLBACK', 'False').lower() == 'true',
+    # In-process cache of introspect/userinfo responses (size 0 disables it)
+    'KEYCLOAK_TOKEN_CACHE_SIZE': int(os.environ.get('KEYCLOAK_TOKEN_CACHE_SIZE', 1024)),
+    'KEYCLOAK_TOKEN_CACHE_TTL': int(os.environ.get('KEYCLOAK_TOKEN_CACHE_TTL', 60)),
+    # Pooled HTTP client used to talk to Keycloak
+    'KEYCLOAK_HTTP_POOL_SIZE': int(os.environ.get('KEYCLOAK_HTTP_POOL_SIZE', 10)),
+    'KEYCLOAK_HTTP_CONNECT_TIMEOUT': float(os.environ.get('KEYCLOAK_HTTP_CONNECT_TIMEOUT', 3.05)),
+    'KEYCLOAK_HTTP_READ_TIMEOUT': float(os.environ.get('KEYCLOAK_HTTP_READ_TIMEOUT', 10)),
+    'KEYCLOAK_HTTP_MAX_RETRIES': int(os.environ.get('KEYCLOAK_HTTP_MAX_RETRIES', 2)),
+    'KEYCLOAK_HTTP_RETRY_BACKOFF': float(os.environ.get('KEYCLOAK_HTTP_RETRY_BACKOFF', 0.2)),
+    'KEYCLOAK_LOG_RESPONSE_BODY': os.environ.get('KEYCLOAK_LOG_RESPONSE_BODY', 'False').lower() == 'true',
+    # Seconds before expiry at which the shared admin token is refreshed
+    'KEYCLOAK_ADMIN_REFRESH_MARGIN': int(os.environ.get('KEYCLOAK_ADMIN_REFRESH_MARGIN', 30)),
+    # Seconds between background reloads of the cached organisation roles/groups catalog
+    'KEYCLOAK_CATALOG_REFRESH_INTERVAL': int(os.environ.get('KEYCLOAK_CATALOG_REFRESH_INTERVAL', 300)),
 }
 
 # Blockchain setup
@@ -40,5 +62,36 @@ BLOCKCHAIN_CONFIG = {
     'BLOCKCHAIN_CONTRACTS_ROOT_PATH': os.environ.get("CONTRACTS_ROOT_PATH", BASE_DIR / "contracts"),
     'POLICY_INFORMATION_POINT_ADDRESS': os.environ.get('POLICY_INFORMATION_POINT_ADDRESS'),
     'POLICY_ADMINISTRATION_POINT_ADDRESS': os.environ.get('POLICY_ADMINISTRATION_POINT_ADDRESS'),
-    'POLICY_DECISION_POINT_ADDRESS': os.environ.get('POLICY_DECISION_POINT_ADDRESS')
+    'POLICY_DECISION_POINT_ADDRESS': os.environ.get('POLICY_DECISION_POINT_ADDRESS'),
+    'ABAC_MULTICALL_ADDRESS': os.environ.get('ABAC_MULTICALL_ADDRESS'),
+    # Cache of PIP/PAP view calls: max staleness in seconds (0 disables it), size and new block check interval
+    'BLOCKCHAIN_READ_CACHE_TTL': float(os.environ.get('BLOCKCHAIN_READ_CACHE_TTL', 30)),
+    'BLOCKCHAIN_READ_CACHE_SIZE': int(os.environ.get('BLOCKCHAIN_READ_CACHE_SIZE', 4096)),
+    'BLOCKCHAIN_READ_CACHE_LOG_CHECK_INTERVAL': float(os.environ.get('BLOCKCHAIN_READ_CACHE_LOG_CHECK_INTERVAL', 1.0)),
+    # Gas limit of the writes: cached eth_estimateGas (per function and argument size) plus a margin,
+    # re-estimated every refresh interval; disabled, every write is sent with the fixed 4.1M gas limit
+    'BLOCKCHAIN_GAS_ESTIMATION': os.environ.get('BLOCKCHAIN_GAS_ESTIMATION', 'True').lower() == 'true',
+    'BLOCKCHAIN_GAS_MARGIN': float(os.environ.get('BLOCKCHAIN_GAS_MARGIN', 0.2)),
+    'BLOCKCHAIN_GAS_REFRESH_INTERVAL': float(os.environ.get('BLOCKCHAIN_GAS_REFRESH_INTERVAL', 300)),
+    # Access decisions: "chain" (PDP eth_call), "shadow" (PDP, sample checked locally) or "local" (local engine,
+    # sample checked against the PDP). shadow and local mirror the PIP/PAP state with an in-process indexer
+    'DECISION_ENGINE_MODE': os.environ.get('DECISION_ENGINE_MODE', 'chain'),
+    'DECISION_ENGINE_SHADOW_SAMPLE_RATE': float(os.environ.get('DECISION_ENGINE_SHADOW_SAMPLE_RATE', 0.0)),
+    'DECISION_ENGINE_MAX_STATE_AGE': float(os.environ.get('DECISION_ENGINE_MAX_STATE_AGE', 30)),
+    'DECISION_ENGINE_INDEX_PATH': os.environ.get('DECISION_ENGINE_INDEX_PATH', ':memory:'),
+    'DECISION_ENGINE_INDEX_POLL_INTERVAL': float(os.environ.get('DECISION_ENGINE_INDEX_POLL_INTERVAL', 2.0)),
+    'ABAC_INDEX_START_BLOCK': int(os.environ.get('ABAC_INDEX_START_BLOCK', 0)),
+    # Cache of the access decisions: seconds a decision is served (0 disables it), extra seconds it is served
+    # while re-evaluated in the background, and size. Decisions never outlive the on-behalf-of access expiry
+    # nor the next work hours boundary of the policy, and are dropped on PIP/PAP writes of the user or resource
+    'DECISION_CACHE_TTL': float(os.environ.get('DECISION_CACHE_TTL', 30)),
+    'DECISION_CACHE_STALE_TTL': float(os.environ.get('DECISION_CACHE_STALE_TTL', 10)),
+    'DECISION_CACHE_SIZE': int(os.environ.get('DECISION_CACHE_SIZE', 10000)),
+    # Maximum number of (uri, scope) pairs evaluated by one /resource/access/batch request
+    'ACCESS_BATCH_MAX_SIZE': int(os.environ.get('ACCESS_BATCH_MAX_SIZE', 100)),
+    # Default confirmation level of the write endpoints: "sent" (on broadcast), "mined" (on receipt)
+    # or "details" (receipt and transaction details); requests can override it with ?confirmation=
+    'BLOCKCHAIN_WRITE_CONFIRMATION': os.environ.get('BLOCKCHAIN_WRITE_CONFIRMATION', 'details'),
+    'PROTECT_WRITE_CONFIRMATION': os.environ.get('PROTECT_WRITE_CONFIRMATION',
+                                                 os.environ.get('BLOCKCHAIN_WRITE_CONFIRMATION', 'details')),
 }
\ No newline at end of file
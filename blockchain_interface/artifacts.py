@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import re
+
+SOLC_VERSION = "0.8.18"
+
+# import "path"; / import {A} from "path"; / import * as A from "path";
+_IMPORT_PATTERN = re.compile(r'^\s*import\s+(?:[^"\';]*?\s+from\s+)?["\']([^"\']+)["\']', re.MULTILINE)
+
+
+def artifact_base_path(contract_path: str) -> str:
+    """
+    The path the compiled artifacts of a contract are stored under (without extension).
+    :param contract_path: str - the path to the Solidity contract
+    :return: str - e.g. contracts/PIP for contracts/PIP.sol
+    """
+    return contract_path.split(".")[0]
+
+
+class ArtifactStore:
+    """
+    Keeps track of the compiled artifacts (.abi/.bin) next to each contract, keyed by a fingerprint
+    of the contract source, the sources it imports (transitively) and the compiler version.
+
+    The fingerprint of the last compilation is stored in a .hash file next to the artifacts, so
+    a contract only has to be recompiled when one of its sources or the compiler changes.
+    """
+
+    def __init__(self, solc_version: str = SOLC_VERSION, base_path: str = "."):
+        """
+        :param solc_version: str - the compiler version the artifacts are built with
+        :param base_path: str - the path non-relative imports (e.g. "contracts/PIP.sol") are resolved from
+        """
+        self.solc_version = solc_version
+        self.base_path = base_path
+
+    def _resolve_import(self, contract_path: str, import_path: str) -> str:
+        if import_path.startswith("./") or import_path.startswith("../"):
+            return os.path.normpath(os.path.join(os.path.dirname(contract_path), import_path))
+        return os.path.normpath(os.path.join(self.base_path, import_path))
+
+    def _hash_sources(self, contract_path: str, digest, visited: set):
+        contract_path = os.path.normpath(contract_path)
+        if contract_path in visited:
+            return
+        visited.add(contract_path)
+
+        with open(contract_path, 'rb') as contract_file:
+            source = contract_file.read()
+        digest.update(contract_path.encode())
+        digest.update(hashlib.sha256(source).digest())
+
+        for import_path in _IMPORT_PATTERN.findall(source.decode()):
+            self._hash_sources(self._resolve_import(contract_path, import_path), digest, visited)
+
+    def fingerprint(self, contract_path: str) -> str:
+        """
+        Compute the fingerprint of a contract.
+        :param contract_path: str - the path to the Solidity contract
+        :raises FileNotFoundError: if the contract or one of its imports is not found
+        :return: str - hex digest of the compiler version and the sources the contract depends on
+        """
+        digest = hashlib.sha256(self.solc_version.encode())
+        self._hash_sources(contract_path, digest, set())
+        return digest.hexdigest()
+
+    def is_fresh(self, contract_path: str) -> bool:
+        """
+        Check whether the stored artifacts were built from the current sources.
+        :param contract_path: str - the path to the Solidity contract
+        :return: bool - True if the contract does not need to be recompiled
+        """
+        base_path = artifact_base_path(contract_path)
+        if not (os.path.exists(f'{base_path}.abi') and os.path.exists(f'{base_path}.bin')):
+            return False
+        try:
+            with open(f'{base_path}.hash', 'r') as hash_file:
+                return hash_file.read().strip() == self.fingerprint(contract_path)
+        except FileNotFoundError:
+            return False
+
+    def load(self, contract_path: str) -> dict:
+        """
+        Load the stored artifacts of a contract.
+        :param contract_path: str - the path to the Solidity contract
+        :raises FileNotFoundError: if the contract has not been compiled
+        :return: dict - {'abi': list, 'bin': str}
+        """
+        base_path = artifact_base_path(contract_path)
+        with open(f'{base_path}.abi', 'r') as abi_file:
+            abi = json.load(abi_file)
+        with open(f'{base_path}.bin', 'r') as bytecode_file:
+            bytecode = bytecode_file.read()
+        return {'abi': abi, 'bin': bytecode}
+
+    def save(self, contract_path: str, abi: list, bytecode: str, fingerprint: str = None):
+        """
+        Store the artifacts of a contract along with the fingerprint of the sources they were built from.
+        :param contract_path: str - the path to the Solidity contract
+        :param abi: list - the contract ABI
+        :param bytecode: str - the contract bytecode
+        :param fingerprint: str - the fingerprint computed before compiling (computed now if None)
+        """
+        base_path = artifact_base_path(contract_path)
+        fingerprint = fingerprint or self.fingerprint(contract_path)
+        with open(f'{base_path}.abi', 'w') as abi_file:
+            abi_file.write(json.dumps(abi))
+        with open(f'{base_path}.bin', 'w') as bytecode_file:
+            bytecode_file.write(bytecode)
+        # written last: an interrupted save leaves the artifacts stale, not wrongly fresh
+        with open(f'{base_path}.hash', 'w') as hash_file:
+            hash_file.write(fingerprint)
@@ -0,0 +1,189 @@
+import threading
+import time
+from collections import OrderedDict
+
+FRESH = "fresh"
+STALE = "stale"  # served while it is re-evaluated in the background
+MISS = "miss"
+
+
+class DecisionCache:
+    """
+    Cache of access decisions, keyed by the whole request context (user, email, IP, scope, location, URI).
+
+    An entry is fresh for `ttl` seconds and can then be served stale for `stale_ttl` more seconds while it
+    is re-evaluated, but never past its hard bound: the moment the decision may change on its own (expiry of
+    the on-behalf-of access, work hours boundary of the policy). Entries of a user or resource are dropped
+    when the PIP/PAP state they depend on changes. Only grants and denials are cached, never reverts.
+    """
+
+    DEFAULT_TTL = 30
+    DEFAULT_STALE_TTL = 10
+    DEFAULT_MAX_SIZE = 10000
+
+    def __init__(self, ttl: float = DEFAULT_TTL, stale_ttl: float = DEFAULT_STALE_TTL,
+                 max_size: int = DEFAULT_MAX_SIZE):
+        """
+        :param ttl: float - seconds a decision is served without re-evaluation (0 disables the cache)
+        :param stale_ttl: float - seconds past the ttl a decision is served while it is re-evaluated
+        :param max_size: int - maximum number of decisions (least recently used are evicted)
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._keys_by_uri = {}
+        self._expiries = {}
+        self._refreshing = set()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "staleHits": 0, "misses": 0, "refreshes": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    @property
+    def generation(self) -> int:
+        """
+        Invalidation counter: pass it back to set() so a decision evaluated before a concurrent
+        invalidation is not cached.
+        """
+        with self._lock:
+            return self._generation
+
+    @staticmethod
+    def key(user: str, user_email: str, user_ip_address: str, user_request_scope: str, user_lat: int,
+            user_long: int, resource_uri: str) -> tuple:
+        """
+        :return: tuple - the cache key of a request (arguments of PolicyDecisionPoint.evaluate_request)
+        """
+        return user.lower(), user_email, user_ip_address, user_request_scope, int(user_lat), int(user_long), \
+            resource_uri
+
+    def get(self, key: tuple) -> tuple:
+        """
+        Look up a decision.
+        :param key: tuple - as returned by key()
+        :return: tuple (FRESH, STALE or MISS, decision)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now < entry["freshUntil"]:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return FRESH, entry["decision"]
+                if now < entry["staleUntil"]:
+                    self._stats["staleHits"] += 1
+                    return STALE, entry["decision"]
+                self._drop(key)
+            self._stats["misses"] += 1
+            return MISS, None
+
+    def set(self, key: tuple, decision: bool, valid_until: float, generation: int = None):
+        """
+        Cache a decision.
+        :param key: tuple - as returned by key()
+        :param decision: bool - the decision
+        :param valid_until: float - unix time the decision may change at on its own (hard bound)
+        :param generation: int - the value of generation taken before the evaluation
+        """
+        now = time.time()
+        if valid_until <= now:
+            return
+        user, resource_uri = key[0], key[-1]
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = {
+                "decision": decision,
+                "freshUntil": min(now + self.ttl, valid_until),
+                "staleUntil": min(now + self.ttl + self.stale_ttl, valid_until)
+            }
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(user, set()).add(key)
+            self._keys_by_uri.setdefault(resource_uri, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def start_refresh(self, key: tuple) -> bool:
+        """
+        Mark a stale decision as being re-evaluated.
+        :return: bool - False if it is already being re-evaluated
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self._stats["refreshes"] += 1
+            return True
+
+    def end_refresh(self, key: tuple):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def get_expiry(self, user: str) -> int | None:
+        """
+        Get the cached on-behalf-of expiry of a user, if it has not passed yet.
+        """
+        with self._lock:
+            expiry = self._expiries.get(user.lower())
+            return expiry if expiry is not None and expiry > time.time() else None
+
+    def set_expiry(self, user: str, expiry: int, generation: int = None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if len(self._expiries) >= self.max_size:
+                self._expiries.clear()
+            self._expiries[user.lower()] = expiry
+
+    def invalidate(self, key: str):
+        """
+        Drop the decisions of a user or of a resource.
+        :param key: str - a user address or a resource URI
+        """
+        with self._lock:
+            self._generation += 1
+            self._stats["invalidations"] += 1
+            # addresses are compared in lower case, URIs as they are
+            keys = set(self._keys_by_user.get(key.lower(), ())) | set(self._keys_by_uri.get(key, ()))
+            for entry_key in keys:
+                self._drop(entry_key)
+            self._expiries.pop(key.lower(), None)
+
+    def clear(self):
+        """
+        Drop every decision.
+        """
+        with self._lock:
+            self._generation += 1
+            self._stats["invalidations"] += 1
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self._keys_by_uri.clear()
+            self._expiries.clear()
+
+    def _drop(self, key: tuple):
+        self._entries.pop(key, None)
+        for index, index_key in ((self._keys_by_user, key[0]), (self._keys_by_uri, key[-1])):
+            keys = index.get(index_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    index.pop(index_key, None)
+
+    def stats(self) -> dict:
+        """
+        :return: dict with the cache size, hit/miss counters and hit rate (fresh and stale hits)
+        """
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["staleHits"] + self._stats["misses"]
+            return {
+                "size": len(self._entries),
+                **self._stats,
+                "hitRate": (self._stats["hits"] + self._stats["staleHits"]) / lookups if lookups else None
+            }
@@ -0,0 +1,506 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from eth_utils import keccak, to_checksum_address
+from web3.exceptions import BadFunctionCallOutput
+
+from blockchain_interface.decision_cache import DecisionCache, FRESH, MISS, STALE
+from blockchain_interface.errors import PolicyEvaluationError, UnsupportedPolicyError
+from blockchain_interface.indexer import ABACIndexer
+from blockchain_interface.interfaces.ABACContracts.PDP import PolicyDecisionPoint
+from blockchain_interface.interfaces.ABACContracts.SamplePolicy import SamplePolicy
+from blockchain_interface.interfaces.ReadCache import ALL_KEYS
+
+LOGGER = logging.getLogger(__name__)
+
+MODE_CHAIN = "chain"  # every decision is an eth_call to the PDP
+MODE_SHADOW = "shadow"  # on-chain decisions are served, a sample is also evaluated locally and compared
+MODE_LOCAL = "local"  # local decisions are served, a sample is cross-checked against the PDP in the background
+MODES = (MODE_CHAIN, MODE_SHADOW, MODE_LOCAL)
+
+GET_POLICY_PARAMETERS_SELECTOR = keccak(text="getPolicyParameters()")[:4]
+
+
+def _solidity_div(a: int, b: int) -> int:
+    # Solidity int256 division truncates towards zero
+    quotient = abs(a) // abs(b)
+    return quotient if (a >= 0) == (b >= 0) else -quotient
+
+
+def is_point_in_polygon(polygon: tuple, point: tuple) -> bool:
+    """
+    Ray casting test, same integer arithmetic as SamplePolicy.isPointInPolygon.
+    :param polygon: tuple - 4 (lat, long) points
+    :param point: tuple - (lat, long)
+    :return: True if the point is inside the polygon
+    """
+    lat, long = point
+    crossings = 0
+    for (a_lat, a_long), (b_lat, b_long) in zip(polygon, polygon[1:] + polygon[:1]):
+        if (a_lat > lat) != (b_lat > lat):
+            x = _solidity_div((b_long - a_long) * (lat - a_lat), b_lat - a_lat) + a_long
+            if long < x:
+                crossings += 1
+    return crossings % 2 == 1
+
+
+class SamplePolicyEvaluator:
+    """
+    Local evaluation of SamplePolicy.evaluateRequest from the policy parameters.
+    """
+
+    def __init__(self, parameters: dict):
+        """
+        :param parameters: dict - as returned by SamplePolicy.get_policy_parameters
+        """
+        self.roles = frozenset(parameters["roles"])
+        self.groups = frozenset(parameters["groups"])
+        self.locations = [tuple(area) for area in parameters["locations"]]
+        self.ip_hashes = frozenset(parameters["ipHashes"])
+        self.content_valid_hash = parameters["contentValidHash"]
+        self.shift_start = parameters["shiftStart"]
+        self.shift_end = parameters["shiftEnd"]
+        self.working_day_start = parameters["workingDayStart"]
+        self.working_day_end = parameters["workingDayEnd"]
+
+    def is_during_work_hours(self, timestamp: int) -> bool:
+        hour = (timestamp // 3600) % 24
+        weekday = (timestamp // 86400 + 4) % 7
+        return (self.shift_start <= hour <= self.shift_end) and \
+            (self.working_day_start <= weekday <= self.working_day_end)
+
+    def next_work_hours_change(self, timestamp: int) -> int | None:
+        """
+        Find when is_during_work_hours changes next: it is checked per UTC hour, so only hour boundaries
+        within the next week are tried.
+        :param timestamp: int - the time to start from
+        :return: int - the timestamp of the change, None if the result never changes
+        """
+        current = self.is_during_work_hours(timestamp)
+        boundary = (timestamp // 3600 + 1) * 3600
+        for hour in range(7 * 24):
+            if self.is_during_work_hours(boundary + hour * 3600) != current:
+                return boundary + hour * 3600
+        return None
+
+    def is_user_near_approved_location(self, location: tuple) -> bool:
+        # as on-chain, the user must be inside every allowed area
+        return all(is_point_in_polygon(area, location) for area in self.locations)
+
+    def evaluate(self, context: dict, timestamp: int) -> bool:
+        """
+        :param context: dict - the AccessControlPolicy.RequestContext fields
+        :param timestamp: int - the block timestamp to evaluate at
+        :return: bool - True if access is granted
+        """
+        return (
+            keccak(text=context["resourceContentHash"]) == self.content_valid_hash and
+            context["userRole"] in self.roles and
+            any(group in self.groups for group in context["userGroups"]) and
+            self.is_during_work_hours(timestamp) and
+            keccak(text=context["userIPAddress"]) in self.ip_hashes and
+            self.is_user_near_approved_location(context["userLocation"])
+        )
+
+
+class DecisionEngine:
+    """
+    Evaluates access requests with the semantics of PDP.evaluateRequest.
+
+    In local mode the request context is assembled from the ABACIndexer mirror of the PIP/PAP state
+    and evaluated in-process with the parameters of the policy contract, which are read once per policy
+    (SamplePolicy contracts are immutable). Requests that cannot be reproduced locally (unsupported
+    policy, stale index) fall back to the on-chain PDP.
+
+    In every mode, decisions can be served from a DecisionCache. They are cached until the on-behalf-of
+    access expires or the work hours of the resource policy start or end (the next UTC hour if the policy
+    parameters are unknown), and dropped when the PIP/PAP entries of the user or resource change.
+    """
+
+    # seconds before the parameters of a policy are read again after an RPC error
+    EVALUATOR_RETRY_INTERVAL = 30
+
+    def __init__(self, pdp: PolicyDecisionPoint, contracts_root_path: str, state: ABACIndexer = None,
+                 mode: str = MODE_CHAIN, shadow_sample_rate: float = 0.0, max_state_age: float = 30,
+                 pip=None, pap=None, cache: DecisionCache = None):
+        """
+        :param pdp: PolicyDecisionPoint - the loaded PDP contract, used for on-chain decisions
+        :param contracts_root_path: str - folder of the compiled SamplePolicy ABI
+        :param state: ABACIndexer - the synchronised PIP/PAP state (required unless mode is chain)
+        :param mode: str - chain, shadow or local
+        :param shadow_sample_rate: float - share of the requests cross-checked against the other engine (0 to 1)
+        :param max_state_age: float - seconds since the last index sync after which decisions go on-chain
+        :param pip: PolicyInformationPoint - the loaded PIP contract (required to cache decisions)
+        :param pap: PolicyAdministrationPoint - the loaded PAP contract (required to cache decisions)
+        :param cache: DecisionCache - cache of the decisions, None to evaluate every request
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown decision engine mode {mode}, expected one of {MODES}")
+        if mode != MODE_CHAIN and state is None:
+            raise ValueError(f"The {mode} decision engine mode needs a synchronised state")
+        self.pdp = pdp
+        self.contracts_root_path = contracts_root_path
+        self.state = state
+        self.mode = mode
+        self.shadow_sample_rate = shadow_sample_rate
+        self.max_state_age = max_state_age
+        self._evaluators = {}
+        self._evaluator_locks = {}
+        self._evaluator_failures = {}  # policy address -> time.monotonic() of the last failed load
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="decision-shadow")
+        self._stats = {"local": 0, "chain": 0, "fallbacks": 0, "compared": 0, "mismatches": 0}
+        self._mismatches = []
+
+        self.pip = pip
+        self.pap = pap
+        self.cache = cache if cache is not None and cache.enabled and pip is not None and pap is not None else None
+        if self.cache is not None:
+            read_cache = pdp.evm_interface.read_cache
+            read_cache.watch(pip.contract_address)
+            read_cache.watch(pap.contract_address)
+            read_cache.add_listener(self._on_state_invalidated)
+
+    @classmethod
+    def from_config(cls, pdp: PolicyDecisionPoint, pip, pap, config: dict):
+        """
+        Build the engine from the BLOCKCHAIN_CONFIG settings, starting the in-process indexer if needed.
+        :param pdp: PolicyDecisionPoint - the loaded PDP contract
+        :param pip: PolicyInformationPoint - the loaded PIP contract
+        :param pap: PolicyAdministrationPoint - the loaded PAP contract
+        :param config: dict - settings.BLOCKCHAIN_CONFIG
+        :return: DecisionEngine
+        """
+        mode = config.get('DECISION_ENGINE_MODE', MODE_CHAIN)
+        state = None
+        if mode != MODE_CHAIN:
+            state = ABACIndexer(pdp.evm_interface, pip, pap, config.get('DECISION_ENGINE_INDEX_PATH', ':memory:'),
+                                start_block=config.get('ABAC_INDEX_START_BLOCK', 0))
+            state.start(config.get('DECISION_ENGINE_INDEX_POLL_INTERVAL', 2.0))
+        cache = DecisionCache(config.get('DECISION_CACHE_TTL', DecisionCache.DEFAULT_TTL),
+                              config.get('DECISION_CACHE_STALE_TTL', DecisionCache.DEFAULT_STALE_TTL),
+                              config.get('DECISION_CACHE_SIZE', DecisionCache.DEFAULT_MAX_SIZE))
+        return cls(pdp, str(config.get('BLOCKCHAIN_CONTRACTS_ROOT_PATH')), state, mode,
+                   config.get('DECISION_ENGINE_SHADOW_SAMPLE_RATE', 0.0),
+                   config.get('DECISION_ENGINE_MAX_STATE_AGE', 30), pip, pap, cache)
+
+    # ---------------------------------------------------------------- evaluation
+
+    def evaluate_request(self, user: str, user_email: str, user_ip_address: str, user_request_scope: str,
+                         user_lat: int, user_long: int, resource_uri: str) -> bool:
+        """
+        Evaluate an access request, same arguments as PolicyDecisionPoint.evaluate_request.
+        :return: bool - True if access is granted
+        """
+        args = (user, user_email, user_ip_address, user_request_scope, user_lat, user_long, resource_uri)
+        if self.cache is None:
+            return self._evaluate_request(*args)
+
+        self.pdp.evm_interface.read_cache.check_new_blocks()
+        key = DecisionCache.key(*args)
+        status, decision = self.cache.get(key)
+        if status == FRESH:
+            return decision
+        if status == STALE:
+            if self.cache.start_refresh(key):
+                self._executor.submit(self._refresh, args, key)
+            return decision
+
+        generation = self.cache.generation
+        decision = self._evaluate_request(*args)
+        self._cache_decision(key, decision, generation)
+        return decision
+
+    def _evaluate_request(self, *args) -> bool:
+        sampled = self.shadow_sample_rate > 0 and random.random() < self.shadow_sample_rate
+
+        if self.mode == MODE_LOCAL:
+            try:
+                decision = self.evaluate_locally(*args)
+            except UnsupportedPolicyError as e:
+                LOGGER.debug(f"Local evaluation not possible, falling back to the PDP: {str(e)}")
+                self._count("fallbacks")
+                return self._evaluate_on_chain(*args)
+            self._count("local")
+            if sampled:
+                self._executor.submit(self._compare, args, decision, self._evaluate_on_chain)
+            return decision
+
+        decision = self._evaluate_on_chain(*args)
+        if self.mode == MODE_SHADOW and sampled:
+            self._executor.submit(self._compare, args, decision, self.evaluate_locally)
+        return decision
+
+    def evaluate_requests(self, user: str, user_email: str, user_ip_address: str, user_lat: int, user_long: int,
+                          requests: List[tuple]) -> List:
+        """
+        Evaluate several access requests of the same user. On-chain decisions are sent as one batched
+        JSON-RPC request instead of one eth_call each.
+        :param requests: list of (resource_uri, user_request_scope) tuples
+        :return: list of bool, or an exception for the requests the PDP rejects, in the order of the requests
+        """
+        if self.cache is None:
+            return self._evaluate_requests(user, user_email, user_ip_address, user_lat, user_long, requests)
+
+        self.pdp.evm_interface.read_cache.check_new_blocks()
+        results = [None] * len(requests)
+        keys = [DecisionCache.key(user, user_email, user_ip_address, scope, user_lat, user_long, resource_uri)
+                for resource_uri, scope in requests]
+        missing = []
+        for position, key in enumerate(keys):
+            status, decision = self.cache.get(key)
+            if status == MISS:
+                missing.append(position)
+                continue
+            results[position] = decision
+            if status == STALE and self.cache.start_refresh(key):
+                resource_uri, scope = requests[position]
+                args = (user, user_email, user_ip_address, scope, user_lat, user_long, resource_uri)
+                self._executor.submit(self._refresh, args, key)
+
+        if missing:
+            generation = self.cache.generation
+            decisions = self._evaluate_requests(user, user_email, user_ip_address, user_lat, user_long,
+                                                [requests[position] for position in missing])
+            for position, decision in zip(missing, decisions):
+                results[position] = decision
+                self._cache_decision(keys[position], decision, generation)
+        return results
+
+    def _evaluate_requests(self, user: str, user_email: str, user_ip_address: str, user_lat: int, user_long: int,
+                           requests: List[tuple]) -> List:
+        results = [None] * len(requests)
+        on_chain = list(range(len(requests)))
+
+        if self.mode == MODE_LOCAL:
+            on_chain = []
+            for position, (resource_uri, scope) in enumerate(requests):
+                args = (user, user_email, user_ip_address, scope, user_lat, user_long, resource_uri)
+                try:
+                    results[position] = self.evaluate_locally(*args)
+                    self._count("local")
+                    if self.shadow_sample_rate > 0 and random.random() < self.shadow_sample_rate:
+                        self._executor.submit(self._compare, args, results[position], self._evaluate_on_chain)
+                except PolicyEvaluationError as e:
+                    results[position] = e
+                except UnsupportedPolicyError:
+                    self._count("fallbacks")
+                    on_chain.append(position)
+
+        if on_chain:
+            with self._lock:
+                self._stats["chain"] += len(on_chain)
+            decisions = self.pdp.evaluate_requests(user, user_email, user_ip_address, user_lat, user_long,
+                                                   [requests[position] for position in on_chain])
+            for position, decision in zip(on_chain, decisions):
+                results[position] = decision
+                if self.mode == MODE_SHADOW and isinstance(decision, bool) and \
+                        self.shadow_sample_rate > 0 and random.random() < self.shadow_sample_rate:
+                    resource_uri, scope = requests[position]
+                    args = (user, user_email, user_ip_address, scope, user_lat, user_long, resource_uri)
+                    self._executor.submit(self._compare, args, decision, self.evaluate_locally)
+        return results
+
+    # ---------------------------------------------------------------- decision cache
+
+    def _cache_decision(self, key: tuple, decision, generation: int):
+        if not isinstance(decision, bool):
+            return
+        user, resource_uri = key[0], key[-1]
+        try:
+            valid_until = self._decision_valid_until(user, resource_uri, generation)
+        except Exception as e:
+            LOGGER.debug(f"Decision not cached, its validity could not be bounded: {str(e)}")
+            return
+        self.cache.set(key, decision, valid_until, generation)
+
+    def _decision_valid_until(self, user: str, resource_uri: str, generation: int) -> float:
+        """
+        The time a decision may change at without any PIP/PAP write: the on-behalf-of access expiry
+        or the next work hours boundary of the resource policy, whichever comes first.
+        """
+        now = int(time.time())
+        expiry = self.cache.get_expiry(user)
+        if expiry is None:
+            expiry = self.pip.get_on_behalf_of_expiry(user, self.pdp.evm_interface.account_address)
+            self.cache.set_expiry(user, expiry, generation)
+
+        try:
+            policy_address = self.pap.get_resource_policy(resource_uri)
+            work_hours_change = self._get_evaluator(policy_address).next_work_hours_change(now)
+        except UnsupportedPolicyError:
+            # unknown policy: time based rules of the policies are assumed to change on the hour at most
+            work_hours_change = (now // 3600 + 1) * 3600
+        return min(expiry, work_hours_change if work_hours_change is not None else float("inf"))
+
+    def _refresh(self, args: tuple, key: tuple):
+        try:
+            generation = self.cache.generation
+            decision = self._evaluate_request(*args)
+            self._cache_decision(key, decision, generation)
+        except Exception as e:
+            # the stale decision expires on its own, the next request evaluates it again
+            LOGGER.debug(f"Background re-evaluation of a cached decision failed: {str(e)}")
+        finally:
+            self.cache.end_refresh(key)
+
+    def _on_state_invalidated(self, contract_address: str, key):
+        if contract_address not in (self.pip.contract_address, self.pap.contract_address):
+            return
+        if key is ALL_KEYS:
+            self.cache.clear()
+        elif isinstance(key, str):
+            self.cache.invalidate(key)
+
+    def _evaluate_on_chain(self, *args) -> bool:
+        self._count("chain")
+        return self.pdp.evaluate_request(*args)
+
+    def evaluate_locally(self, user: str, user_email: str, user_ip_address: str, user_request_scope: str,
+                         user_lat: int, user_long: int, resource_uri: str, timestamp: int = None) -> bool:
+        """
+        Evaluate an access request from the synchronised state, without any RPC once the policy is known.
+        :param timestamp: int - the time to evaluate at (default: now)
+        :return: bool - True if access is granted
+        :raises PolicyEvaluationError: where the PDP would revert
+        :raises UnsupportedPolicyError: if the request cannot be reproduced locally
+        """
+        if self.state.synced_at is None or time.time() - self.state.synced_at > self.max_state_age:
+            raise UnsupportedPolicyError("The synchronised state is stale")
+
+        timestamp = int(timestamp or time.time())
+        organisation = self.pdp.evm_interface.account_address
+        if not self.state.organisation_has_access(user, organisation, timestamp):
+            raise PolicyEvaluationError("Organisation does not have access on behalf of user")
+
+        policy_address = self.state.get_resource_policy(resource_uri)
+        if policy_address is None or int(policy_address, 16) == 0:
+            raise PolicyEvaluationError(f"No policy registered for resource {resource_uri}")
+
+        resource = self.state.get_resource(resource_uri)
+        context = {
+            "userWalletAddress": user,
+            "userRole": self.state.get_user_role(user),
+            "userEmail": user_email,
+            "userGroups": self.state.get_user_groups(user),
+            "userLocation": (int(user_lat), int(user_long)),
+            "userIPAddress": user_ip_address,
+            "userRequestScope": user_request_scope,
+            "resourceURI": resource_uri,
+            "resourceContentHash": resource["content_hash"] if resource else ""
+        }
+        return self._get_evaluator(policy_address).evaluate(context, timestamp)
+
+    def _get_evaluator(self, policy_address: str) -> SamplePolicyEvaluator:
+        with self._lock:
+            if policy_address in self._evaluators:
+                evaluator = self._evaluators[policy_address]
+                if evaluator is None:
+                    raise UnsupportedPolicyError(f"Policy {policy_address} does not expose its parameters")
+                return evaluator
+            failed_at = self._evaluator_failures.get(policy_address)
+            if failed_at is not None and time.monotonic() - failed_at < self.EVALUATOR_RETRY_INTERVAL:
+                raise UnsupportedPolicyError(f"Parameters of policy {policy_address} could not be loaded")
+            # only the requests for the same policy wait for its parameters
+            loading_lock = self._evaluator_locks.setdefault(policy_address, threading.Lock())
+
+        with loading_lock:
+            with self._lock:
+                loaded = policy_address in self._evaluators
+                evaluator = self._evaluators.get(policy_address)
+            if not loaded:
+                evaluator = self._load_evaluator(policy_address)
+                with self._lock:
+                    self._evaluators[policy_address] = evaluator
+                    self._evaluator_failures.pop(policy_address, None)
+        if evaluator is None:
+            raise UnsupportedPolicyError(f"Policy {policy_address} does not expose its parameters")
+        return evaluator
+
+    def _load_evaluator(self, policy_address: str) -> SamplePolicyEvaluator | None:
+        """
+        Read the parameters of a policy contract.
+        :return: SamplePolicyEvaluator, None if the contract does not expose getPolicyParameters
+        :raises UnsupportedPolicyError: if the parameters could not be read this time (RPC error), they are
+            read again after EVALUATOR_RETRY_INTERVAL seconds
+        """
+        try:
+            code = bytes(self.pdp.evm_interface.web3.eth.get_code(to_checksum_address(policy_address)))
+            # the function dispatcher of the contract pushes the selector of every external function
+            if GET_POLICY_PARAMETERS_SELECTOR not in code:
+                LOGGER.info(f"Policy {policy_address} cannot be evaluated locally: no getPolicyParameters function")
+                return None
+            policy = SamplePolicy(self.pdp.evm_interface, policy_address,
+                                  f"{self.contracts_root_path}/SamplePolicy.sol").load()
+            return SamplePolicyEvaluator(policy.get_policy_parameters())
+        except BadFunctionCallOutput as e:
+            # getPolicyParameters exists but does not return the SamplePolicy parameters
+            LOGGER.info(f"Policy {policy_address} cannot be evaluated locally: {str(e)}")
+            return None
+        except Exception as e:
+            LOGGER.warning(f"Parameters of policy {policy_address} could not be loaded, retrying in "
+                           f"{self.EVALUATOR_RETRY_INTERVAL}s: {str(e)}")
+            with self._lock:
+                self._evaluator_failures[policy_address] = time.monotonic()
+            raise UnsupportedPolicyError(f"Parameters of policy {policy_address} could not be loaded") from e
+
+    # ---------------------------------------------------------------- shadow checks
+
+    @staticmethod
+    def _outcome(evaluate, args) -> str:
+        try:
+            return "grant" if evaluate(*args) else "deny"
+        except PolicyEvaluationError:
+            return "revert"
+        except UnsupportedPolicyError:
+            return "unsupported"
+        except Exception as e:
+            # on-chain reverts surface as web3 errors
+            return "revert" if "revert" in str(e).lower() else f"error: {str(e)}"
+
+    def _compare(self, args: tuple, decision: bool, evaluate):
+        outcome = self._outcome(evaluate, args)
+        if outcome == "unsupported" or outcome.startswith("error"):
+            return
+        self._count("compared")
+        served = "grant" if decision else "deny"
+        if outcome != served:
+            self._count("mismatches")
+            mismatch = {"request": args, "served": served, "expected": outcome, "at": time.time()}
+            LOGGER.warning(f"Decision engine mismatch ({self.mode} mode): {mismatch}")
+            with self._lock:
+                self._mismatches = (self._mismatches + [mismatch])[-100:]
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self) -> dict:
+        """
+        :return: dict with the decision counters and the last mismatches
+        """
+        with self._lock:
+            return {
+                "mode": self.mode,
+                **self._stats,
+                "indexedBlock": self.state.last_block if self.state else None,
+                "cache": self.cache.stats() if self.cache else None,
+                "lastMismatches": list(self._mismatches)
+            }
+
+    def invalidate_policy(self, policy_address: str = None):
+        """
+        Forget the cached parameters of a policy (or of every policy).
+        :param policy_address: str - the policy contract address
+        """
+        with self._lock:
+            if policy_address is None:
+                self._evaluators.clear()
+                self._evaluator_failures.clear()
+            else:
+                self._evaluators.pop(policy_address, None)
+                self._evaluator_failures.pop(policy_address, None)
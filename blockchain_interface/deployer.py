@@ -1,17 +1,36 @@
-import json
+import math
+import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
 
 import solcx
 from typing_extensions import override
 from web3 import Web3, HTTPProvider
 from web3.middleware import ExtraDataToPOAMiddleware
 
+from blockchain_interface.artifacts import ArtifactStore, SOLC_VERSION
 from blockchain_interface.errors import SolidityCompilationError, SolidityDeploymentError
 from blockchain_interface.interfaces.EVMInterface import EVMInterface
 
-_solc_version = "0.8.18"
-solcx.install_solc(_solc_version)
-solcx.set_solc_version(_solc_version)
+_solc_ready = False
+_solc_lock = threading.Lock()
+
+
+def ensure_solc(solc_version: str = SOLC_VERSION):
+    """
+    Install (if missing) and select the solc compiler, once per process, on the first compilation.
+    :param solc_version: str - the compiler version
+    """
+    global _solc_ready
+    with _solc_lock:
+        if _solc_ready:
+            return
+        if solc_version not in [str(version) for version in solcx.get_installed_solc_versions()]:
+            solcx.install_solc(solc_version)
+        solcx.set_solc_version(solc_version)
+        _solc_ready = True
 
 
 class SolidityDeployer:
@@ -19,7 +38,8 @@ class SolidityDeployer:
     Deploys a Solidity contract to the blockchain. generating the ABI and bytecode
     """
 
-    DEFAULT_GAS_LIMIT = 4100000
+    DEFAULT_GAS_LIMIT = 4100000  # maximum gas of a deployment, the gas sent is estimated
+    GAS_MARGIN = 0.2
 
     def __init__(self, blockchain_address: str, gas_limit: int):
         self.web3 = Web3(HTTPProvider(blockchain_address))
@@ -27,6 +47,7 @@ class SolidityDeployer:
         self.gas_limit = gas_limit
         self.account_private_key = None
         self.account_address = None
+        self.artifact_store = ArtifactStore()
 
     def load_account(self, account_pk: str):
         """
@@ -48,39 +69,106 @@ class SolidityDeployer:
         self.account_address = evm_interface.account_address
         return self
 
-    def compile_contract(self, contract_path: str, dump_compiled=False) -> dict:
+    def compile_contract(self, contract_path: str, dump_compiled=False, force=False) -> dict:
         """
         Compiles a Solidity contract to generate the ABI and bytecode.
-        Also, can save the contract's ABI and bytecode to the same directory as the contract.
+        Also, can save the contract's ABI and bytecode to the same directory as the contract, in which case
+        the compilation is skipped while the saved artifacts match the contract sources and compiler version.
         :param contract_path: str - the path to the Solidity contract
         :param dump_compiled: bool - whether to save the compiled contract to a file
+        :param force: bool - compile even if the saved artifacts are up to date
         :raises FileNotFoundError: if the contract file is not found
         :raises SolidityCompilationError: if the contract compilation fails
         :return: dict - the compiled contract containing the ABI and bytecode
+            (keyed by the contract path when loaded from the saved artifacts)
         """
 
         try:
+            fingerprint = self.artifact_store.fingerprint(contract_path)
+            if dump_compiled and not force and self.artifact_store.is_fresh(contract_path):
+                return {contract_path: self.artifact_store.load(contract_path)}
+
+            ensure_solc(self.artifact_store.solc_version)
             with open(contract_path, 'r') as file:
                 contract_code = file.read()
                 compiled_contract = solcx.compile_source(contract_code, overwrite=True, output_values=['abi', 'bin'])
                 if dump_compiled:
                     contract_raw_name = list(compiled_contract.keys())[0]
                     contract_interface = compiled_contract[contract_raw_name]
-
-                    abi = contract_interface['abi']
-                    # dump json abi
-                    abi = json.dumps(abi)
-                    with open(f'{contract_path.split(".")[0]}.abi', 'w') as abi_file:
-                        abi_file.write(abi)
-                    bytecode = contract_interface['bin']
-                    with open(f'{contract_path.split(".")[0]}.bin', 'w') as bytecode_file:
-                        bytecode_file.write(bytecode)
+                    self.artifact_store.save(contract_path, contract_interface['abi'], contract_interface['bin'],
+                                             fingerprint)
                 return compiled_contract
         except FileNotFoundError:
             raise FileNotFoundError(f'Contract file {contract_path} not found')
         except Exception as e:
             raise SolidityCompilationError(f'Error compiling contract {contract_path}: {e}')
 
+    def compile_contracts(self, contract_paths: List[str], force=False) -> Dict[str, dict]:
+        """
+        Compiles several Solidity contracts in a single solc invocation and saves their ABI and bytecode
+        next to each contract. Contracts whose saved artifacts are up to date are not recompiled.
+        :param contract_paths: list of str - the paths to the Solidity contracts
+        :param force: bool - compile even if the saved artifacts are up to date
+        :raises FileNotFoundError: if a contract file is not found
+        :raises SolidityCompilationError: if the compilation fails
+        :return: dict - contract path -> {'abi': list, 'bin': str}
+        """
+
+        try:
+            fingerprints = {contract_path: self.artifact_store.fingerprint(contract_path)
+                            for contract_path in contract_paths}
+            stale_paths = [contract_path for contract_path in contract_paths
+                           if force or not self.artifact_store.is_fresh(contract_path)]
+
+            if stale_paths:
+                ensure_solc(self.artifact_store.solc_version)
+                compiled_contracts = solcx.compile_files(stale_paths, output_values=['abi', 'bin'])
+                for contract_path in stale_paths:
+                    # keys are "<source unit>:<contract name>", keep the first contract of the file itself
+                    # (same choice as compile_contract)
+                    contract_raw_name = sorted(
+                        key for key in compiled_contracts
+                        if os.path.abspath(key.rsplit(":", 1)[0]) == os.path.abspath(contract_path)
+                    )[0]
+                    contract_interface = compiled_contracts[contract_raw_name]
+                    self.artifact_store.save(contract_path, contract_interface['abi'], contract_interface['bin'],
+                                             fingerprints[contract_path])
+
+            return {contract_path: self.artifact_store.load(contract_path) for contract_path in contract_paths}
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f'Contract file not found: {e}')
+        except Exception as e:
+            raise SolidityCompilationError(f'Error compiling contracts {", ".join(contract_paths)}: {e}')
+
+    def _estimate_deployment_gas(self, tx: dict) -> int:
+        """
+        Estimates the gas of a deployment plus a margin, gas_limit being the maximum (and the fallback).
+        """
+        try:
+            estimated = self.web3.eth.estimate_gas({'from': tx['from'], 'data': tx['data']})
+        except Exception:
+            return self.gas_limit
+        return min(math.ceil(estimated * (1 + self.GAS_MARGIN)), self.gas_limit)
+
+    def _send_deployment(self, contract_path: str, args: tuple, nonce: int):
+        """
+        Signs and broadcasts the transaction deploying a contract, without waiting for it to be mined.
+        :return: HexBytes - the transaction hash
+        """
+        with open(f'{contract_path.split(".")[0]}.abi', 'r') as abi_file:
+            abi = abi_file.read()
+        with open(f'{contract_path.split(".")[0]}.bin', 'r') as bytecode_file:
+            bytecode = bytecode_file.read()
+        contract = self.web3.eth.contract(abi=abi, bytecode=bytecode)
+        # send transaction that deploys the contract signed with the account private key
+        tx = contract.constructor(*args).build_transaction({'from': self.web3.eth.default_account.address,
+                                                            'gasPrice': self.web3.eth.gas_price,
+                                                            'gas': self.gas_limit,
+                                                            'nonce': nonce})
+        tx['gas'] = self._estimate_deployment_gas(tx)
+        return self.web3.eth.send_raw_transaction(
+            self.web3.eth.account.sign_transaction(tx, self.account_private_key).raw_transaction)
+
     def deploy_contract(self, contract_path: str, *args):
         """
         Deploys a Solidity contract to the blockchain.
@@ -92,18 +180,9 @@ class SolidityDeployer:
         """
 
         try:
-            with open(f'{contract_path.split(".")[0]}.abi', 'r') as abi_file:
-                abi = abi_file.read()
-            with open(f'{contract_path.split(".")[0]}.bin', 'r') as bytecode_file:
-                bytecode = bytecode_file.read()
-            contract = self.web3.eth.contract(abi=abi, bytecode=bytecode)
-            # send transaction that deploys the contract signed with the account private key
-            tx = contract.constructor(*args).build_transaction({'from': self.web3.eth.default_account.address,
-                                                                'gasPrice': self.web3.eth.gas_price,
-                                                                'gas': self.gas_limit,
-                                                                'nonce': self.web3.eth.get_transaction_count(self.web3.eth.default_account.address)})
-            tx_hash = self.web3.eth.send_raw_transaction(
-                self.web3.eth.account.sign_transaction(tx, self.account_private_key).raw_transaction)
+            tx_hash = self._send_deployment(
+                contract_path, args, self.web3.eth.get_transaction_count(self.web3.eth.default_account.address)
+            )
             # wait for the transaction to be mined
             tx_receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
             return tx_receipt['contractAddress']
@@ -112,6 +191,37 @@ class SolidityDeployer:
         except Exception as e:
             raise SolidityDeploymentError(f'Error deploying contract {contract_path}: {e}')
 
+    def deploy_contracts(self, deployments: List[Tuple[str, tuple]]) -> List[str]:
+        """
+        Deploys several independent contracts at once: the transactions are sent back to back with
+        consecutive nonces and mined concurrently.
+        :param deployments: list of (contract path, constructor arguments)
+        :return: list of str - the contract addresses, in the order of the deployments
+        :raises SolidityDeploymentError: if one of the deployments fails
+        """
+
+        first_nonce = self.web3.eth.get_transaction_count(self.web3.eth.default_account.address, 'pending')
+        tx_hashes = []
+        for position, (contract_path, args) in enumerate(deployments):
+            try:
+                tx_hashes.append(self._send_deployment(contract_path, args, first_nonce + position))
+            except FileNotFoundError:
+                raise FileNotFoundError(f'Contract file {contract_path} not found')
+            except Exception as e:
+                raise SolidityDeploymentError(f'Error deploying contract {contract_path}: {e}')
+
+        def wait_for(position):
+            contract_path = deployments[position][0]
+            try:
+                tx_receipt = self.web3.eth.wait_for_transaction_receipt(tx_hashes[position])
+            except Exception as e:
+                raise SolidityDeploymentError(f'Error deploying contract {contract_path}: {e}')
+            if tx_receipt['status'] != 1:
+                raise SolidityDeploymentError(f'Error deploying contract {contract_path}: transaction reverted')
+            return tx_receipt['contractAddress']
+
+        with ThreadPoolExecutor(max_workers=max(len(deployments), 1)) as executor:
+            return list(executor.map(wait_for, range(len(deployments))))
 
 if __name__ == "__main__":
     # get arguments
@@ -2,4 +2,21 @@ class SolidityCompilationError(Exception):
     pass
 
 class SolidityDeploymentError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class ContractReadError(Exception):
+    pass
+
+class PolicyEvaluationError(Exception):
+    pass
+
+class UnsupportedPolicyError(Exception):
+    pass
+
+class TransactionFailedError(Exception):
+    def __init__(self, message, receipt=None):
+        super().__init__(message)
+        self.receipt = receipt
+
+class OutOfGasError(TransactionFailedError):
+    pass
@@ -1,5 +1,8 @@
 import json
 
+from blockchain_interface.interfaces.TransactionTracker import Confirmation
+
+
 def load_json_from_file(file_path):
     """
     Load JSON data from a file.
@@ -25,4 +28,54 @@ def transaction_to_dict(tx):
             result[key] = transaction_to_dict(value)
         else:
             result[key] = value
-    return result
\ No newline at end of file
+    return result
+
+def str_to_bool(value, default: bool = False) -> bool:
+    """
+    Convert a query string or JSON flag to a boolean.
+    :param value: str, bool or None - the value to convert
+    :param default: bool - value returned when the flag is missing
+    :return: bool
+    """
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def confirmation_from_request(args, payload: dict, default: str = Confirmation.DETAILS) -> str:
+    """
+    Read the write confirmation level of a request from the `confirmation` query/payload field.
+    The legacy `wait=false` flag maps to Confirmation.SENT.
+    :param args: the request query args
+    :param payload: dict - the request JSON payload
+    :param default: str - level used when the request does not set one
+    :return: str - one of Confirmation.LEVELS
+    :raises ValueError: if the level is unknown
+    """
+    payload = payload or {}
+    confirmation = args.get('confirmation', payload.get('confirmation'))
+    if confirmation is None:
+        wait = args.get('wait', payload.get('wait'))
+        return default if wait is None or str_to_bool(wait) else Confirmation.SENT
+    if confirmation not in Confirmation.LEVELS:
+        raise ValueError(f"Unknown confirmation level {confirmation}, expected one of {Confirmation.LEVELS}")
+    return confirmation
+
+
+def serialize_transaction(tx, confirmation: str = Confirmation.DETAILS) -> dict:
+    """
+    Convert the result of a write call to a JSON friendly dictionary, doing only the work the level needs.
+    :param tx: the tracking record (SENT) or the transaction receipt (MINED, DETAILS)
+    :param confirmation: str - the confirmation level the transaction was sent with
+    :return: dict - transaction data
+    """
+    if confirmation == Confirmation.SENT:
+        return dict(tx)
+    if confirmation == Confirmation.MINED:
+        return {
+            key: tx[key].hex() if isinstance(tx[key], bytes) else tx[key]
+            for key in ('transactionHash', 'blockHash', 'blockNumber', 'status', 'gasUsed') if key in tx
+        }
+    return transaction_to_dict(tx)
@@ -0,0 +1,392 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from eth_utils import event_abi_to_log_topic
+from hexbytes import HexBytes
+
+from blockchain_interface.interfaces.ABACContracts.PAP import PolicyAdministrationPoint
+from blockchain_interface.interfaces.ABACContracts.Multicall import ZERO_ADDRESS
+from blockchain_interface.interfaces.ABACContracts.PIP import PolicyInformationPoint
+from blockchain_interface.interfaces.EVMInterface import EVMInterface
+
+LOGGER = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    number INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    transaction_hash TEXT NOT NULL,
+    contract TEXT NOT NULL,
+    event TEXT NOT NULL,
+    args TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE TABLE IF NOT EXISTS user_groups (
+    user TEXT NOT NULL,
+    group_name TEXT NOT NULL,
+    PRIMARY KEY (user, group_name)
+);
+CREATE INDEX IF NOT EXISTS user_groups_by_group ON user_groups (group_name);
+CREATE TABLE IF NOT EXISTS user_roles (
+    user TEXT PRIMARY KEY,
+    role TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS user_roles_by_role ON user_roles (role);
+CREATE TABLE IF NOT EXISTS on_behalf_of (
+    user TEXT NOT NULL,
+    organisation TEXT NOT NULL,
+    expires_at INTEGER NOT NULL,
+    PRIMARY KEY (user, organisation)
+);
+CREATE INDEX IF NOT EXISTS on_behalf_of_by_organisation ON on_behalf_of (organisation);
+CREATE TABLE IF NOT EXISTS resources (
+    uri TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS resources_by_owner ON resources (owner);
+CREATE TABLE IF NOT EXISTS resource_policies (
+    uri TEXT PRIMARY KEY,
+    policy_address TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS resource_policies_by_policy ON resource_policies (policy_address);
+CREATE TABLE IF NOT EXISTS registered_policies (
+    owner TEXT NOT NULL,
+    policy_address TEXT NOT NULL,
+    PRIMARY KEY (owner, policy_address)
+);
+"""
+
+# tables derived from the events, rebuilt by replaying the events table after a reorg
+STATE_TABLES = ("user_groups", "user_roles", "on_behalf_of", "resources", "resource_policies", "registered_policies")
+
+
+class ABACIndexer:
+    """
+    Mirrors the PIP and PAP state into a local SQLite database from the contract events.
+
+    The history is backfilled by fetching logs of fixed-size block ranges in parallel and applying
+    them in order; afterwards the indexer follows the chain head block by block. Every step is
+    applied in a single SQLite transaction together with the hashes of the processed blocks, so a
+    reorg is detected by comparing them with the chain and undone by rolling back to the common
+    ancestor and replaying the stored events.
+    """
+
+    def __init__(self, evm_interface: EVMInterface, pip: PolicyInformationPoint, pap: PolicyAdministrationPoint,
+                 database_path: str, start_block: int = 0, batch_size: int = 2000, workers: int = 4,
+                 confirmations: int = 0, reorg_depth: int = 64):
+        """
+        :param evm_interface: EVMInterface - connection to the node
+        :param pip: PolicyInformationPoint - the loaded PIP contract
+        :param pap: PolicyAdministrationPoint - the loaded PAP contract
+        :param database_path: str - path of the SQLite database (created if missing)
+        :param start_block: int - first block to index (the contracts deployment block)
+        :param batch_size: int - number of blocks per eth_getLogs request
+        :param workers: int - number of log ranges fetched in parallel during the backfill
+        :param confirmations: int - blocks to stay behind the head
+        :param reorg_depth: int - number of recent block hashes kept to detect reorgs
+        """
+        self.web3 = evm_interface.web3
+        self.database_path = database_path
+        self.start_block = start_block
+        self.batch_size = batch_size
+        self.workers = workers
+        self.confirmations = confirmations
+        self.reorg_depth = reorg_depth
+        self.synced_at = None  # time of the last sync that reached the head
+        self.contracts = {
+            pip.contract_address: pip.contract,
+            pap.contract_address: pap.contract
+        }
+        self._events_by_topic = {}
+        for contract in self.contracts.values():
+            for abi in contract.abi:
+                if abi.get("type") == "event":
+                    self._events_by_topic[HexBytes(event_abi_to_log_topic(abi))] = (contract, abi["name"])
+        self._lock = threading.Lock()
+        # the connection is shared with the API threads, writes and reads are serialised
+        self._db_lock = threading.RLock()
+        self._stop = threading.Event()
+        self.connection = sqlite3.connect(database_path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+
+    # ---------------------------------------------------------------- sync
+
+    @property
+    def last_block(self) -> int | None:
+        """
+        The last block applied to the database.
+        """
+        with self._db_lock:
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'last_block'").fetchone()
+        return int(row["value"]) if row else None
+
+    def sync(self) -> int:
+        """
+        Index every new block up to the head (minus the confirmations), handling reorgs first.
+        :return: int - the last indexed block
+        """
+        with self._lock:
+            self._handle_reorg()
+            head = self.web3.eth.block_number - self.confirmations
+            last_block = self.last_block
+            from_block = self.start_block if last_block is None else last_block + 1
+            while from_block <= head:
+                # fetch a window of ranges in parallel, then apply them in order
+                window_end = min(head, from_block + self.batch_size * self.workers - 1)
+                ranges = [
+                    (start, min(start + self.batch_size - 1, window_end))
+                    for start in range(from_block, window_end + 1, self.batch_size)
+                ]
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    results = list(executor.map(lambda block_range: self._fetch_logs(*block_range), ranges))
+                logs = [log for range_logs in results for log in range_logs]
+                self._apply(logs, from_block, window_end, head)
+                LOGGER.info(f"Indexed blocks {from_block}-{window_end} ({len(logs)} events)")
+                from_block = window_end + 1
+            self.synced_at = time.time()
+            return self.last_block
+
+    def run(self, poll_interval: float = 2.0):
+        """
+        Keep the database in sync with the chain until stop() is called.
+        :param poll_interval: float - seconds between two syncs
+        """
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                LOGGER.error(f"Error indexing ABAC events: {str(e)}")
+            self._stop.wait(poll_interval)
+
+    def start(self, poll_interval: float = 2.0) -> threading.Thread:
+        """
+        Run the indexer in a daemon thread.
+        :param poll_interval: float - seconds between two syncs
+        :return: the indexer thread
+        """
+        thread = threading.Thread(target=self.run, args=(poll_interval,), name="abac-indexer", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+    def _fetch_logs(self, from_block: int, to_block: int) -> List:
+        return self.web3.eth.get_logs({
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "address": list(self.contracts)
+        })
+
+    def _decode(self, log) -> tuple | None:
+        event = self._events_by_topic.get(HexBytes(log["topics"][0])) if log["topics"] else None
+        if event is None:
+            return None
+        contract, event_name = event
+        return event_name, dict(contract.events[event_name]().process_log(log)["args"])
+
+    def _apply(self, logs: List, from_block: int, to_block: int, head: int):
+        """
+        Store the logs, update the state tables and record the processed block in one transaction.
+        """
+        logs = sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"]))
+        block_hashes = {log["blockNumber"]: HexBytes(log["blockHash"]).to_0x_hex() for log in logs}
+        # keep the hashes of the recent blocks to detect reorgs near the head
+        for number in range(max(from_block, head - self.reorg_depth + 1), to_block + 1):
+            if number not in block_hashes:
+                block_hashes[number] = HexBytes(self.web3.eth.get_block(number)["hash"]).to_0x_hex()
+        if to_block not in block_hashes:
+            block_hashes[to_block] = HexBytes(self.web3.eth.get_block(to_block)["hash"]).to_0x_hex()
+
+        with self._db_lock, self.connection:
+            for log in logs:
+                decoded = self._decode(log)
+                if decoded is None:
+                    continue
+                event_name, args = decoded
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?)",
+                    (log["blockNumber"], log["logIndex"], HexBytes(log["transactionHash"]).to_0x_hex(),
+                     log["address"], event_name, json.dumps(args))
+                )
+                self._apply_event(event_name, args)
+            self.connection.executemany("INSERT OR REPLACE INTO blocks VALUES (?, ?)", block_hashes.items())
+            self.connection.execute("DELETE FROM blocks WHERE number < ?", (to_block - self.reorg_depth,))
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('last_block', ?)", (str(to_block),))
+
+    def _apply_event(self, event_name: str, args: dict):
+        execute = self.connection.execute
+        if event_name == "AccessGranted":
+            execute("INSERT OR REPLACE INTO on_behalf_of VALUES (?, ?, ?)",
+                    (args["user"], args["organisation"], args["expiresAt"]))
+        elif event_name == "AccessRevoked":
+            execute("DELETE FROM on_behalf_of WHERE user = ? AND organisation = ?",
+                    (args["user"], args["organisation"]))
+        elif event_name == "GroupAdded":
+            execute("INSERT OR IGNORE INTO user_groups VALUES (?, ?)", (args["user"], args["group"]))
+        elif event_name == "GroupRemoved":
+            execute("DELETE FROM user_groups WHERE user = ? AND group_name = ?", (args["user"], args["group"]))
+        elif event_name == "UserRoleSet":
+            execute("INSERT OR REPLACE INTO user_roles VALUES (?, ?)", (args["user"], args["role"]))
+        elif event_name == "ResourceAdded":
+            execute("INSERT OR REPLACE INTO resources VALUES (?, ?, ?, ?, ?)",
+                    (args["uri"], args["owner"], args["contentHash"], args["createdAt"], args["createdAt"]))
+        elif event_name == "ResourceContentHashUpdated":
+            # the PIP stores the hash of URIs that were never added too, with a zero owner and creation time
+            execute("INSERT INTO resources VALUES (?, ?, ?, 0, ?) "
+                    "ON CONFLICT(uri) DO UPDATE SET content_hash = excluded.content_hash, updated_at = excluded.updated_at",
+                    (args["uri"], ZERO_ADDRESS, args["contentHash"], args["updatedAt"]))
+        elif event_name == "ResourcePolicySet":
+            execute("INSERT OR REPLACE INTO resource_policies VALUES (?, ?)", (args["uri"], args["policyAddress"]))
+        elif event_name == "ResourcePolicyRemoved":
+            execute("DELETE FROM resource_policies WHERE uri = ?", (args["uri"],))
+        elif event_name == "PolicyRegistered":
+            execute("INSERT OR IGNORE INTO registered_policies VALUES (?, ?)", (args["owner"], args["policyAddress"]))
+        elif event_name == "PolicyUnregistered":
+            execute("DELETE FROM registered_policies WHERE owner = ? AND policy_address = ?",
+                    (args["owner"], args["policyAddress"]))
+
+    def _handle_reorg(self):
+        """
+        Roll back to the last stored block still on the canonical chain and rebuild the state tables.
+        """
+        stored_blocks = self._query("SELECT number, hash FROM blocks ORDER BY number DESC")
+        if not stored_blocks:
+            return
+        if HexBytes(self.web3.eth.get_block(stored_blocks[0]["number"])["hash"]).to_0x_hex() == stored_blocks[0]["hash"]:
+            return
+
+        ancestor = self.start_block - 1
+        for row in stored_blocks[1:]:
+            if HexBytes(self.web3.eth.get_block(row["number"])["hash"]).to_0x_hex() == row["hash"]:
+                ancestor = row["number"]
+                break
+        LOGGER.warning(f"Chain reorganisation detected, rolling the index back to block {ancestor}")
+
+        with self._db_lock, self.connection:
+            self.connection.execute("DELETE FROM events WHERE block_number > ?", (ancestor,))
+            self.connection.execute("DELETE FROM blocks WHERE number > ?", (ancestor,))
+            if ancestor < self.start_block:
+                self.connection.execute("DELETE FROM meta WHERE key = 'last_block'")
+            else:
+                self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('last_block', ?)", (str(ancestor),))
+            for table in STATE_TABLES:
+                self.connection.execute(f"DELETE FROM {table}")
+            events = self.connection.execute(
+                "SELECT event, args FROM events ORDER BY block_number, log_index"
+            ).fetchall()
+            for event in events:
+                self._apply_event(event["event"], json.loads(event["args"]))
+
+    # ---------------------------------------------------------------- queries
+
+    def _query(self, sql: str, params: tuple = ()) -> List[dict]:
+        with self._db_lock:
+            return [dict(row) for row in self.connection.execute(sql, params).fetchall()]
+
+    def get_user_groups(self, user: str) -> List[str]:
+        """
+        :param user: str - the address of the user
+        :return: list of the user groups
+        """
+        rows = self._query("SELECT group_name FROM user_groups WHERE user = ? ORDER BY group_name",
+                           (self.web3.to_checksum_address(user),))
+        return [row["group_name"] for row in rows]
+
+    def get_user_role(self, user: str) -> str:
+        """
+        :param user: str - the address of the user
+        :return: the user role ("default-role" if unset, as in the PIP)
+        """
+        rows = self._query("SELECT role FROM user_roles WHERE user = ?", (self.web3.to_checksum_address(user),))
+        return rows[0]["role"] if rows and rows[0]["role"] else "default-role"
+
+    def list_users(self, group: str = None, role: str = None) -> List[dict]:
+        """
+        List the users with attributes, optionally filtered by group and/or role.
+        :param group: str - only users in this group
+        :param role: str - only users with this role
+        :return: list of dicts with user, role and groups
+        """
+        users = {row["user"] for row in self._query("SELECT user FROM user_groups UNION SELECT user FROM user_roles")}
+        if group is not None:
+            users &= {row["user"] for row in self._query("SELECT user FROM user_groups WHERE group_name = ?", (group,))}
+        if role is not None:
+            users &= {row["user"] for row in self._query("SELECT user FROM user_roles WHERE role = ?", (role,))}
+        return [
+            {"user": user, "role": self.get_user_role(user), "groups": self.get_user_groups(user)}
+            for user in sorted(users)
+        ]
+
+    def organisation_has_access(self, user: str, organisation: str, timestamp: int = None) -> bool:
+        """
+        :param user: str - the address of the user
+        :param organisation: str - the address of the organisation
+        :param timestamp: int - the time to check at (default: now)
+        :return: True if the on behalf of grant has not expired
+        """
+        rows = self._query("SELECT expires_at FROM on_behalf_of WHERE user = ? AND organisation = ?",
+                           (self.web3.to_checksum_address(user), self.web3.to_checksum_address(organisation)))
+        return bool(rows) and (timestamp or time.time()) <= rows[0]["expires_at"]
+
+    def get_resource(self, uri: str) -> dict | None:
+        """
+        :param uri: str - the URI of the resource
+        :return: the resource attributes and policy, or None if the resource is unknown
+        """
+        rows = self._query(
+            "SELECT r.*, p.policy_address FROM resources r LEFT JOIN resource_policies p ON p.uri = r.uri "
+            "WHERE r.uri = ?", (uri,)
+        )
+        return rows[0] if rows else None
+
+    def list_resources(self, owner: str = None, policy_address: str = None) -> List[dict]:
+        """
+        List the resources, optionally filtered by owner and/or policy.
+        :param owner: str - only resources added by this address
+        :param policy_address: str - only resources protected by this policy
+        :return: list of resource attributes and policies
+        """
+        sql = "SELECT r.*, p.policy_address FROM resources r LEFT JOIN resource_policies p ON p.uri = r.uri WHERE 1 = 1"
+        params = []
+        if owner is not None:
+            sql += " AND r.owner = ?"
+            params.append(self.web3.to_checksum_address(owner))
+        if policy_address is not None:
+            sql += " AND p.policy_address = ?"
+            params.append(self.web3.to_checksum_address(policy_address))
+        return self._query(sql + " ORDER BY r.uri", tuple(params))
+
+    def get_resource_policy(self, uri: str) -> str | None:
+        """
+        :param uri: str - the URI of the resource
+        :return: the policy address, or None if the resource is not protected
+        """
+        rows = self._query("SELECT policy_address FROM resource_policies WHERE uri = ?", (uri,))
+        return rows[0]["policy_address"] if rows else None
+
+    def get_registered_policies(self, owner: str) -> List[str]:
+        """
+        :param owner: str - the address that registered the policies
+        :return: list of policy addresses
+        """
+        rows = self._query("SELECT policy_address FROM registered_policies WHERE owner = ?",
+                           (self.web3.to_checksum_address(owner),))
+        return [row["policy_address"] for row in rows]
@@ -0,0 +1,68 @@
+from typing import List
+
+from ..ReadBatch import decode_function_result
+from .PIP import PolicyInformationPoint
+from .SmartContract import SmartContract
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+class ABACMulticall(SmartContract):
+    def __init__(self, evm_interface, contract_address: str, contract_address_path: str):
+        super().__init__(evm_interface, contract_address, contract_address_path)
+
+    def aggregate(self, calls: List[tuple]) -> List:
+        """
+        Run several read calls in a single eth_call.
+        :param calls: list of (web3.Contract, function_name, args) tuples
+        :return: list of decoded results (None for calls that reverted)
+        """
+        encoded_calls = []
+        outputs = []
+        for contract, function_name, args in calls:
+            encoded_calls.append((contract.address, contract.encode_abi(function_name, args=args)))
+            outputs.append(contract.functions[function_name](*args).abi["outputs"])
+
+        _, raw_results = self.call_read_function("aggregate", encoded_calls)
+        return [
+            decode_function_result(self.evm_interface.web3, function_outputs, return_data) if success else None
+            for function_outputs, (success, return_data) in zip(outputs, raw_results)
+        ]
+
+    def get_access_context(self, pip_address: str, user: str, organisation: str, uris: List[str],
+                           pap_address: str = None) -> dict:
+        """
+        Fetch the full access context of a user and a list of resources in one round trip.
+        :param pip_address: str - the address of the PIP contract
+        :param user: str - the address of the user
+        :param organisation: str - the wallet address of the organisation acting on behalf of the user
+        :param uris: list - the URIs of the resources
+        :param pap_address: str - the address of the PAP contract, to also resolve the resource policies
+        :return: dict with role, groups, onBehalfOf and the attributes of every resource
+        """
+        to_checksum_address = self.evm_interface.web3.to_checksum_address
+        context = self.call_read_function(
+            "getAccessContext",
+            to_checksum_address(pip_address),
+            to_checksum_address(pap_address or ZERO_ADDRESS),
+            to_checksum_address(user),
+            to_checksum_address(organisation),
+            list(uris)
+        )
+        block_number, timestamp, role, groups, on_behalf_of, resources, policies = context
+
+        resources_context = {}
+        for uri, raw_attributes, policy in zip(uris, resources, policies):
+            attributes = PolicyInformationPoint.resource_attributes_to_dict(raw_attributes)
+            if pap_address:
+                attributes["policy"] = policy
+            resources_context[uri] = attributes
+
+        return {
+            "blockNumber": block_number,
+            "timestamp": timestamp,
+            "role": role,
+            "groups": groups,
+            "onBehalfOf": on_behalf_of,
+            "resources": resources_context
+        }
@@ -4,20 +4,35 @@ from .SmartContract import SmartContract
 
 
 class PolicyAdministrationPoint(SmartContract):
+    # getRegisteredPolicy depends on the caller, it is not cached
+    CACHEABLE_READS = {"getResourcePolicy"}
+    WRITE_INVALIDATION_KEYS = {
+        "registerResource": 0,
+        "removeResourcePolicy": 0,
+    }
+    EVENT_INVALIDATION_KEYS = {
+        "ResourcePolicySet": "uri",
+        "ResourcePolicyRemoved": "uri",
+        # the registered policies are not cached and do not take part in the decisions
+        "PolicyRegistered": None,
+        "PolicyUnregistered": None,
+    }
+
     def __init__(self, evm_interface, contract_address: str, contract_address_path: str):
         super().__init__(evm_interface, contract_address, contract_address_path)
 
-    def register_resource(self, uri: str, policy_address: str):
+    def register_resource(self, uri: str, policy_address: str, **kwargs):
         """
         Register a resource with its associated policy contract address.
         :param uri: str - the URI of the resource
         :param policy_address: str - the address of the associated policy contract
+        :param kwargs: write options forwarded to call_write_function (e.g. confirmation)
         :return: transaction hash
         """
 
         address = self.evm_interface.web3.to_checksum_address(policy_address)
 
-        return self.call_write_function("registerResource", uri, address)
+        return self.call_write_function("registerResource", uri, address, **kwargs)
 
     def get_resource_policy(self, uri: str):
         """
@@ -27,25 +42,27 @@ class PolicyAdministrationPoint(SmartContract):
         """
         return self.call_read_function("getResourcePolicy", uri)
 
-    def remove_resource_policy(self, uri: str):
+    def remove_resource_policy(self, uri: str, **kwargs):
         """
         Remove the policy contract association for a resource.
         :param uri: str - the URI of the resource
+        :param kwargs: write options forwarded to call_write_function (e.g. confirmation)
         :return: transaction hash
         """
-        return self.call_write_function("removeResourcePolicy", uri)
+        return self.call_write_function("removeResourcePolicy", uri, **kwargs)
 
 
-    def register_policy(self, policy_address):
+    def register_policy(self, policy_address, **kwargs):
         """
         Register a policy contract.
         :param policy_address: str - the address of the policy contract
+        :param kwargs: write options forwarded to call_write_function (e.g. confirmation)
         :return: transaction hash
         """
 
         address = self.evm_interface.web3.to_checksum_address(policy_address)
 
-        return self.call_write_function("registerPolicy", address)
+        return self.call_write_function("registerPolicy", address, **kwargs)
 
     def get_registered_policy(self) -> List[str]:
         """
@@ -54,13 +71,14 @@ class PolicyAdministrationPoint(SmartContract):
         """
         return self.call_read_function("getRegisteredPolicy")
 
-    def unregister_policy(self, policy_address):
+    def unregister_policy(self, policy_address, **kwargs):
         """
         Unregister a policy contract.
         :param policy_address: str - the address of the policy contract
+        :param kwargs: write options forwarded to call_write_function (e.g. confirmation)
         :return: transaction hash
         """
 
         address = self.evm_interface.web3.to_checksum_address(policy_address)
 
-        return self.call_write_function("unregisterPolicy", address)
\ No newline at end of file
+        return self.call_write_function("unregisterPolicy", address, **kwargs)
\ No newline at end of file
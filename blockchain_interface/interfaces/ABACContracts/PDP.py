@@ -1,3 +1,5 @@
+from typing import List
+
 from .SmartContract import SmartContract
 
 
@@ -23,16 +25,37 @@ class PolicyDecisionPoint(SmartContract):
         return self.call_read_function("evaluateRequest", user_address, user_email, user_ip_address, user_request_scope, user_lat, user_long, resource_uri)
 
 
-    def set_pip(self, pip_address: str):
+    def evaluate_requests(self, user: str, user_email: str, user_ip_address: str, user_lat: int, user_long: int,
+                          requests: List[tuple]) -> List:
+        """
+        Evaluate several access requests of the same user in a single batched JSON-RPC request.
+        :param user: str - the address of the user making the requests
+        :param user_email: str - the email of the user making the requests
+        :param user_ip_address: str - the IP address of the user making the requests
+        :param user_lat: int - the latitude of the user's location
+        :param user_long: int - the longitude of the user's location
+        :param requests: list of (resource_uri, user_request_scope) tuples
+        :return: list of bool, or a ContractReadError for the requests that reverted
+        """
+        user_address = self.evm_interface.web3.to_checksum_address(user)
+
+        batch = self.evm_interface.read_batch()
+        for resource_uri, user_request_scope in requests:
+            batch.add(self.contract, "evaluateRequest", user_address, user_email, user_ip_address,
+                      user_request_scope, user_lat, user_long, resource_uri)
+        return batch.execute(raise_on_error=False)
+
+    def set_pip(self, pip_address: str, **kwargs):
         """
         Set the address of the Policy Information Point (PIP) contract.
         :param pip_address: str - the address of the PIP contract
+        :param kwargs: write options forwarded to call_write_function (e.g. confirmation)
         :return: transaction hash
         """
 
         address = self.evm_interface.web3.to_checksum_address(pip_address)
 
-        return self.call_write_function("setPIP", address)
+        return self.call_write_function("setPIP", address, **kwargs)
 
     def get_pip(self) -> str:
         """
@@ -41,16 +64,17 @@ class PolicyDecisionPoint(SmartContract):
         """
         return self.call_read_function("getPIP")
 
-    def set_pap(self, pap_address: str):
+    def set_pap(self, pap_address: str, **kwargs):
         """
         Set the address of the Policy Administration Point (PAP) contract.
         :param pap_address: str - the address of the PAP contract
+        :param kwargs: write options forwarded to call_write_function (e.g. confirmation)
         :return: transaction hash
         """
 
         address = self.evm_interface.web3.to_checksum_address(pap_address)
 
-        return self.call_write_function("setPAP", address)
+        return self.call_write_function("setPAP", address, **kwargs)
 
     def get_pap(self) -> str:
         """
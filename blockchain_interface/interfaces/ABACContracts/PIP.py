@@ -1,20 +1,71 @@
 import datetime
+from typing import List
 
-from .SmartContract import SmartContract
+from .SmartContract import SENDER, SmartContract
 
 
 class PolicyInformationPoint(SmartContract):
+    # organisationHasAccess depends on the block time (token expiry), it is not cached
+    CACHEABLE_READS = {"getUserGroups", "getUserRoleAttribute", "getResourceAttributes"}
+    WRITE_INVALIDATION_KEYS = {
+        "addGroupToUser": 0,
+        "addGroupsToUser": 0,
+        "updateUserAttributes": 0,
+        "removeGroupFromUser": 0,
+        "setUserRoleAttribute": 0,
+        "addResource": 0,
+        "updateResourceContentHash": 0,
+        # changes the attributes of the granting user, the organisation is only the argument
+        "grantOnBehalfOfToken": SENDER,
+        "revokeAccess": 0,
+    }
+    EVENT_INVALIDATION_KEYS = {
+        "AccessGranted": "user",
+        "AccessRevoked": "user",
+        "GroupAdded": "user",
+        "GroupRemoved": "user",
+        "UserRoleSet": "user",
+        "ResourceAdded": "uri",
+        "ResourceContentHashUpdated": "uri",
+    }
+
     def __init__(self, evm_interface, contract_address: str, contract_address_path: str):
         super().__init__(evm_interface, contract_address, contract_address_path)
 
-    def add_group_to_user(self, user: str, group: str):
+    def add_group_to_user(self, user: str, group: str, **kwargs):
         """
         Add a group to a user.
         :param user: str - the address of the user
         :param group: str - the name of the group
+        :param kwargs: write options forwarded to call_write_function (e.g. confirmation)
+        :return: transaction hash
+        """
+        return self.call_write_function("addGroupToUser", user, group, **kwargs)
+
+    def add_groups_to_user(self, user: str, groups: List[str], **kwargs):
+        """
+        Add several groups to a user's attributes in one transaction. Groups already set are skipped.
+        :param user: str - the address of the user
+        :param groups: list - the groups to add
+        :param kwargs: write options forwarded to call_write_function (e.g. confirmation)
+        :return: transaction hash
+        """
+        user_hex = self.evm_interface.web3.to_checksum_address(user)
+
+        return self.call_write_function("addGroupsToUser", user_hex, list(groups), **kwargs)
+
+    def update_user_attributes(self, user: str, groups: List[str] = None, role: str = None, **kwargs):
+        """
+        Add several groups and set the role of a user in one transaction.
+        :param user: str - the address of the user
+        :param groups: list - the groups to add (already set groups are skipped)
+        :param role: str - the role to set, left unchanged if empty
+        :param kwargs: write options forwarded to call_write_function (e.g. confirmation)
         :return: transaction hash
         """
-        return self.call_write_function("addGroupToUser", user, group)
+        user_hex = self.evm_interface.web3.to_checksum_address(user)
+
+        return self.call_write_function("updateUserAttributes", user_hex, list(groups or []), role or "", **kwargs)
 
     def get_user_groups(self, user: str):
         """
@@ -27,26 +78,28 @@ class PolicyInformationPoint(SmartContract):
 
         return self.call_read_function("getUserGroups", user_hex)
 
-    def remove_group_from_user(self, user: str, group: str):
+    def remove_group_from_user(self, user: str, group: str, **kwargs):
         """
         Remove a group from a user.
         :param user: str - the address of the user
         :param group: str - the name of the group
+        :param kwargs: write options forwarded to call_write_function (e.g. confirmation)
         :return: transaction hash
         """
-        return self.call_write_function("removeGroupFromUser", user, group)
+        return self.call_write_function("removeGroupFromUser", user, group, **kwargs)
 
-    def set_user_role_attribute(self, user: str, role: str):
+    def set_user_role_attribute(self, user: str, role: str, **kwargs):
         """
         Set the role attribute of a user.
         :param user: str - the address of the user
         :param role: str - the role to set
+        :param kwargs: write options forwarded to call_write_function (e.g. confirmation)
         :return: transaction hash
         """
 
         user_hex = self.evm_interface.web3.to_checksum_address(user)
 
-        return self.call_write_function("setUserRoleAttribute", user_hex, role)
+        return self.call_write_function("setUserRoleAttribute", user_hex, role, **kwargs)
 
     def get_user_role_attribute(self, user: str):
         """
@@ -59,23 +112,25 @@ class PolicyInformationPoint(SmartContract):
 
         return self.call_read_function("getUserRoleAttribute", user_hex)
 
-    def add_resource(self, uri: str, contentHash: str):
+    def add_resource(self, uri: str, contentHash: str, **kwargs):
         """
         Add a resource.
         :param uri: str - the URI of the resource
         :param contentHash: str - the content hash of the resource
+        :param kwargs: write options forwarded to call_write_function (e.g. confirmation)
         :return: transaction hash
         """
-        return self.call_write_function("addResource", uri, contentHash)
+        return self.call_write_function("addResource", uri, contentHash, **kwargs)
 
-    def update_resource_content_hash(self, uri: str, contentHash: str):
+    def update_resource_content_hash(self, uri: str, contentHash: str, **kwargs):
         """
         Update the content hash of a resource.
         :param uri: str - the URI of the resource
         :param contentHash: str - the new content hash of the resource
+        :param kwargs: write options forwarded to call_write_function (e.g. confirmation)
         :return: transaction hash
         """
-        return self.call_write_function("updateResourceContentHash", uri, contentHash)
+        return self.call_write_function("updateResourceContentHash", uri, contentHash, **kwargs)
 
     def get_resource_attributes(self, uri: str) -> dict:
         """
@@ -85,6 +140,15 @@ class PolicyInformationPoint(SmartContract):
         """
 
         raw_attributes = self.call_read_function("getResourceAttributes", uri)
+        return self.resource_attributes_to_dict(raw_attributes)
+
+    @staticmethod
+    def resource_attributes_to_dict(raw_attributes) -> dict:
+        """
+        Convert the ResourceAttributes struct returned by the PIP to a dict.
+        :param raw_attributes: tuple - (owner, uri, contentHash, createdAt, updatedAt)
+        :return: dict of attributes
+        """
         # IN: check PIP.sol for the order of attributes
         attributes = {
             "owner": raw_attributes[0],
@@ -97,17 +161,77 @@ class PolicyInformationPoint(SmartContract):
         # Convert timestamps to ISO 8601 format
         return attributes
 
+    def get_user_attributes(self, user: str, organisation: str = None) -> dict:
+        """
+        Get the groups, role and (optionally) the on behalf of status of a user
+        with a single batched JSON-RPC request.
+        :param user: str - the address of the user
+        :param organisation: str - the wallet address of the organisation to check the on behalf of grant for
+        :return: dict with groups, role and onBehalfOf (None if no organisation is given)
+        """
+
+        user_hex = self.evm_interface.web3.to_checksum_address(user)
+
+        with self.evm_interface.read_batch() as batch:
+            batch.add(self.contract, "getUserGroups", user_hex)
+            batch.add(self.contract, "getUserRoleAttribute", user_hex)
+            if organisation:
+                organisation_hex = self.evm_interface.web3.to_checksum_address(organisation)
+                batch.add(self.contract, "organisationHasAccess", user_hex, organisation_hex)
+
+        return {
+            "groups": batch.results[0],
+            "role": batch.results[1],
+            "onBehalfOf": batch.results[2] if organisation else None,
+            "blockNumber": batch.block_number
+        }
+
+    def get_access_context(self, user: str, organisation: str, uris: list, multicall=None) -> dict:
+        """
+        Get the role, groups, on behalf of status and resource attributes needed to evaluate a request.
+        Uses the ABACMulticall contract (one eth_call) if given, otherwise a batched JSON-RPC request.
+        :param user: str - the address of the user
+        :param organisation: str - the wallet address of the organisation acting on behalf of the user
+        :param uris: list - the URIs of the resources
+        :param multicall: ABACMulticall - optional aggregator contract instance
+        :return: dict with role, groups, onBehalfOf and the attributes of every resource
+        """
+        if multicall is not None:
+            return multicall.get_access_context(self.contract_address, user, organisation, uris)
+
+        user_hex = self.evm_interface.web3.to_checksum_address(user)
+        organisation_hex = self.evm_interface.web3.to_checksum_address(organisation)
+
+        with self.evm_interface.read_batch() as batch:
+            batch.add(self.contract, "getUserRoleAttribute", user_hex)
+            batch.add(self.contract, "getUserGroups", user_hex)
+            batch.add(self.contract, "organisationHasAccess", user_hex, organisation_hex)
+            for uri in uris:
+                batch.add(self.contract, "getResourceAttributes", uri)
+
+        role, groups, on_behalf_of = batch.results[:3]
+        return {
+            "blockNumber": batch.block_number,
+            "role": role,
+            "groups": groups,
+            "onBehalfOf": on_behalf_of,
+            "resources": {
+                uri: self.resource_attributes_to_dict(raw_attributes)
+                for uri, raw_attributes in zip(uris, batch.results[3:])
+            }
+        }
 
-    def grant_on_behalf_of_token(self, organisation: str):
+    def grant_on_behalf_of_token(self, organisation: str, **kwargs):
         """
         Grant on behalf of token to an organisation.
         :param organisation: the wallet address of the organisation
+        :param kwargs: write options forwarded to call_write_function (e.g. confirmation)
         :return: None
         """
 
         organisation_hex = self.evm_interface.web3.to_checksum_address(organisation)
 
-        return self.call_write_function("grantOnBehalfOfToken", organisation_hex)
+        return self.call_write_function("grantOnBehalfOfToken", organisation_hex, **kwargs)
 
     def organisation_has_access(self, user: str, organisation: str) -> bool:
         """
@@ -121,13 +245,26 @@ class PolicyInformationPoint(SmartContract):
         organisation_hex = self.evm_interface.web3.to_checksum_address(organisation)
         return self.call_read_function("organisationHasAccess", user_hex, organisation_hex)
 
-    def revoke_access(self, user: str):
+    def get_on_behalf_of_expiry(self, user: str, organisation: str) -> int:
+        """
+        Get the expiry of the access granted by a user to an organisation.
+        :param user: the wallet address of the user
+        :param organisation: the wallet address of the organisation
+        :return: int - the expiry block timestamp, 0 if the access was never granted or was revoked
+        """
+
+        user_hex = self.evm_interface.web3.to_checksum_address(user)
+        organisation_hex = self.evm_interface.web3.to_checksum_address(organisation)
+        return self.call_read_function("getOnBehalfOfExpiry", user_hex, organisation_hex)
+
+    def revoke_access(self, user: str, **kwargs):
         """
         Revoke access for an organisation.
         :param user: the wallet address of the user to revoke access from
+        :param kwargs: write options forwarded to call_write_function (e.g. confirmation)
         :return: None
         """
 
         user_hex = self.evm_interface.web3.to_checksum_address(user)
 
-        return self.call_write_function("revokeAccess", user_hex)
\ No newline at end of file
+        return self.call_write_function("revokeAccess", user_hex, **kwargs)
\ No newline at end of file
@@ -0,0 +1,28 @@
+from .SmartContract import SmartContract
+
+
+class SamplePolicy(SmartContract):
+    def __init__(self, evm_interface, contract_address: str, contract_address_path: str):
+        super().__init__(evm_interface, contract_address, contract_address_path)
+
+    def get_policy_parameters(self) -> dict:
+        """
+        Get the parameters the policy evaluates requests against.
+        :return: dict with the allowed roles, locations, groups, IP hashes, content hash, shift and working days
+        """
+        # IN: check SamplePolicy.sol getPolicyParameters for the order of the values
+        roles, locations, groups, ip_hashes, content_valid_hash, shift_start, shift_end, \
+            working_day_start, working_day_end = self.call_read_function("getPolicyParameters")
+
+        return {
+            "roles": list(roles),
+            # every area is ((lat, long) x 4)
+            "locations": [tuple(tuple(point) for point in area) for area in locations],
+            "groups": list(groups),
+            "ipHashes": [bytes(ip_hash) for ip_hash in ip_hashes],
+            "contentValidHash": bytes(content_valid_hash),
+            "shiftStart": shift_start,
+            "shiftEnd": shift_end,
+            "workingDayStart": working_day_start,
+            "workingDayEnd": working_day_end
+        }
@@ -1,20 +1,62 @@
+import json
 import os
+import threading
 
-import solcx
+from eth_utils import event_abi_to_log_topic
+from hexbytes import HexBytes
 
 from blockchain_interface.interfaces.EVMInterface import EVMInterface
+from blockchain_interface.interfaces.ReadCache import ALL_KEYS
+from blockchain_interface.interfaces.TransactionPipeline import TransactionPipeline
+from blockchain_interface.interfaces.TransactionTracker import Confirmation
+
+# WRITE_INVALIDATION_KEYS value of the writes changing the key of their sender (msg.sender)
+SENDER = "msg.sender"
+
+# compiled artifacts shared by every contract instance: path -> (mtime, content)
+# (built by the deployer, the runtime never compiles)
+_artifacts = {}
+_artifacts_lock = threading.Lock()
+
+
+def read_artifact(artifact_path: str, parse_json: bool = False):
+    """
+    Read a compiled contract artifact (.abi/.bin), cached until the file changes.
+    :param artifact_path: the path to the artifact file
+    :param parse_json: parse the content as JSON (for ABIs)
+    :return: the file content, parsed if requested
+    """
+    mtime = os.path.getmtime(artifact_path)
+    with _artifacts_lock:
+        cached = _artifacts.get((artifact_path, parse_json))
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    with open(artifact_path, 'r') as artifact_file:
+        content = artifact_file.read()
+    if parse_json:
+        content = json.loads(content)
+    with _artifacts_lock:
+        _artifacts[(artifact_path, parse_json)] = (mtime, content)
+    return content
 
-_solc_version = "0.8.18"
-solcx.install_solc(_solc_version)
-solcx.set_solc_version(_solc_version)
 
 class SmartContract:
+    # view functions whose results can be served from the ReadCache
+    CACHEABLE_READS = set()
+    # write function -> index of the argument holding the key it changes, or SENDER for the sending account
+    # (the first argument of the reads it affects); writes not listed drop every cached read
+    WRITE_INVALIDATION_KEYS = {}
+    # event -> name of the argument holding the key it changes (None: it changes no cached read),
+    # used to invalidate the reads affected by the logs of other writers; unlisted events drop every cached read
+    EVENT_INVALIDATION_KEYS = {}
+
     def __init__(self, evm_interface: EVMInterface, contract_address: str, contract_file_path: str):
         self.evm_interface = evm_interface
         self.contract_address = self.evm_interface.web3.to_checksum_address(contract_address)
         self.contract_file_path = contract_file_path
         self.contract = None
         self.abi = None
+        self._events_by_topic = {}
         self.bytecode = None
 
     def load(self):
@@ -27,6 +69,10 @@ class SmartContract:
         self._load_abi(self.contract_file_path)
         self._load_bytecode(self.contract_file_path)
         self.contract = self.evm_interface.get_contract(self.contract_address, self.abi, self.bytecode)
+        if self.EVENT_INVALIDATION_KEYS:
+            self._events_by_topic = {HexBytes(event_abi_to_log_topic(abi)): abi["name"]
+                                     for abi in self.abi if abi.get("type") == "event"}
+            self.evm_interface.read_cache.register_log_keys(self.contract_address, self.log_invalidation_key)
         return self
 
     def _load_abi(self, contract_path: str):
@@ -37,8 +83,7 @@ class SmartContract:
         """
 
         try:
-            with open(f'{contract_path.split(".")[0]}.abi', 'r') as abi_file:
-                self.abi = abi_file.read()
+            self.abi = read_artifact(f'{contract_path.split(".")[0]}.abi', parse_json=True)
         except FileNotFoundError:
             raise FileNotFoundError(f'Contract file {contract_path} not found')
         except Exception as e:
@@ -52,20 +97,103 @@ class SmartContract:
         """
 
         try:
-            with open(f'{contract_path.split(".")[0]}.bin', 'r') as bytecode_file:
-                self.bytecode = bytecode_file.read()
+            self.bytecode = read_artifact(f'{contract_path.split(".")[0]}.bin')
         except FileNotFoundError:
             raise FileNotFoundError(f'Contract file {contract_path} not found')
         except Exception as e:
             raise Exception(f'Error loading contract bytecode: {str(e)}')
 
     def call_read_function(self, function_name, *args):
-        # Code to call a function of the smart contract
-        return self.evm_interface.call_contract_read_function(self.contract, function_name, *args)
+        """
+        Call a view function of the smart contract, through the read cache if the function is cacheable.
+        :param function_name: the name of the function to call
+        :param args: the arguments to pass to the function
+        :return: the decoded result
+        """
+        read_cache = self.evm_interface.read_cache
+        if function_name not in self.CACHEABLE_READS or not read_cache.enabled:
+            return self.evm_interface.call_contract_read_function(self.contract, function_name, *args)
+
+        hit, value = read_cache.get(self.contract_address, function_name, args)
+        if hit:
+            return value
+        generation = read_cache.generation(self.contract_address)
+        value = self.evm_interface.call_contract_read_function(self.contract, function_name, *args)
+        read_cache.set(self.contract_address, function_name, args, value, generation)
+        return value
+
+    def invalidate_cached_reads(self, function_name: str = None, *args, transaction_hash=None):
+        """
+        Drop the cached reads affected by a write function.
+        :param function_name: the write function, or None to drop every cached read of the contract
+        :param args: the arguments of the write function
+        :param transaction_hash: the mined transaction of the write, so its logs are not applied a second time
+        """
+        key_index = self.WRITE_INVALIDATION_KEYS.get(function_name)
+        if key_index == SENDER:
+            key = self.evm_interface.account_address or ALL_KEYS
+        else:
+            key = args[key_index] if key_index is not None and key_index < len(args) else ALL_KEYS
+        self.evm_interface.read_cache.invalidate(self.contract_address, key, transaction_hash)
+
+    def log_invalidation_key(self, log):
+        """
+        Get the key changed by a log of the contract (the first argument of the reads it affects).
+        :param log: the raw log
+        :return: the key, None if the log changes no cached read, ALL_KEYS if it cannot be told
+        """
+        event_name = self._events_by_topic.get(HexBytes(log["topics"][0])) if log["topics"] else None
+        if event_name not in self.EVENT_INVALIDATION_KEYS:
+            return ALL_KEYS
+        argument = self.EVENT_INVALIDATION_KEYS[event_name]
+        if argument is None:
+            return None
+        try:
+            return self.contract.events[event_name]().process_log(log)["args"][argument]
+        except Exception:
+            return ALL_KEYS
 
-    def call_write_function(self, function_name, *args):
-        # Code to call a write function of the smart contract
-        return self.evm_interface.call_contract_write_function(self.contract, function_name, *args)
+    @staticmethod
+    def _transaction_hash(result):
+        # completion callbacks receive the tracking record (sent) or the transaction hash (pipelines)
+        return result.get("transactionHash") if isinstance(result, dict) else result
+
+    def call_write_function(self, function_name, *args, wait: bool = True, confirmation: str = None,
+                            pipeline: TransactionPipeline = None):
+        """
+        Call a write function of the smart contract.
+        :param function_name: the name of the function to call
+        :param args: the arguments to pass to the function
+        :param wait: wait for the transaction to be mined, otherwise return the tracking record right away
+            (same as confirmation=Confirmation.SENT)
+        :param confirmation: Confirmation level, SENT, MINED or DETAILS (default: DETAILS, or SENT if wait is False)
+        :param pipeline: queue the call in a TransactionPipeline instead of sending it now (its confirmation applies)
+        :return: the tracking record (SENT), the transaction receipt (MINED, DETAILS), or the position in the pipeline
+        """
+        if pipeline is not None:
+            if pipeline.confirmation == Confirmation.SENT:
+                self.invalidate_cached_reads(function_name, *args)
+            return pipeline.add(self.contract, function_name, *args,
+                                on_complete=lambda result: self.invalidate_cached_reads(
+                                    function_name, *args, transaction_hash=self._transaction_hash(result)))
+
+        confirmation = confirmation or (Confirmation.DETAILS if wait else Confirmation.SENT)
+        if confirmation == Confirmation.SENT:
+            # dropped now and again once mined, reads in between may cache the old value
+            self.invalidate_cached_reads(function_name, *args)
+            return self.evm_interface.submit_contract_write_function(
+                self.contract, function_name, *args,
+                on_complete=lambda record: self.invalidate_cached_reads(
+                    function_name, *args, transaction_hash=self._transaction_hash(record))
+            )
+        receipt = None
+        try:
+            receipt = self.evm_interface.call_contract_write_function(self.contract, function_name, *args,
+                                                                      confirmation=confirmation)
+            return receipt
+        finally:
+            self.invalidate_cached_reads(function_name, *args,
+                                         transaction_hash=receipt.get("transactionHash") if receipt else None)
 
     def call_dry_read_function(self, function_name, *args):
         data = self.contract.encode_abi("organisationHasAccess", args=args)
@@ -1,16 +1,39 @@
-from typing import Type
+import threading
+import time
+from typing import List, Type
 
+from hexbytes import HexBytes
 from web3 import Web3, HTTPProvider
 from web3.contract import Contract
+from web3.exceptions import TimeExhausted
+
+from blockchain_interface.errors import OutOfGasError, TransactionFailedError
+from blockchain_interface.interfaces.GasEstimator import GasEstimator
+from blockchain_interface.interfaces.NonceManager import NonceManager
+from blockchain_interface.interfaces.ReadBatch import ReadBatch
+from blockchain_interface.interfaces.ReadCache import ReadCache
+from blockchain_interface.interfaces.TransactionPipeline import TransactionPipeline
+from blockchain_interface.interfaces.TransactionTracker import TransactionTracker, TransactionStatus, Confirmation
 
 
 class EVMInterface:
+    GAS_PRICE_TTL = 10  # seconds a fetched gas price is reused
+
     def __init__(self, blockchain_address: str, blockchain_type: str):
         self.web3 = Web3(HTTPProvider(blockchain_address))
+        self.blockchain_address = blockchain_address
         self.blockchain_type = blockchain_type
         self.gas_limit = None
         self.account_private_key = None
         self.account_address = None
+        self.nonce_manager = NonceManager.for_endpoint(blockchain_address, self.web3)
+        self.transaction_tracker = TransactionTracker.for_endpoint(blockchain_address, self.web3)
+        self.read_cache = ReadCache.for_endpoint(blockchain_address, self.web3)
+        self.gas_estimator = GasEstimator.for_endpoint(blockchain_address, self.web3)
+        self._chain_id = None
+        self._gas_price = None
+        self._gas_price_fetched_at = 0.0
+        self._lock = threading.Lock()
 
     def connect(self, account_pk: str):
         """
@@ -67,34 +90,227 @@ class EVMInterface:
         response = contract.functions[function_name](*args).call(params)
         return response
 
-    def call_contract_write_function(self, contract, function_name, *args) -> dict:
+    def read_batch(self, block_identifier=None) -> ReadBatch:
+        """
+        Returns a batch that sends several contract read calls in a single JSON-RPC request.
+        :param block_identifier: block number or tag to pin the reads to (default: the current block)
+        :return: ReadBatch - use it as a context manager or call execute()
+        """
+        return ReadBatch(self, block_identifier)
+
+    @property
+    def chain_id(self) -> int:
+        """
+        The chain id of the connected network, fetched once.
+        """
+        if self._chain_id is None:
+            self._chain_id = self.web3.eth.chain_id
+        return self._chain_id
+
+    def get_gas_price(self) -> int:
+        """
+        Returns the network gas price, cached for GAS_PRICE_TTL seconds.
+        :return: int - the gas price in wei
+        """
+        with self._lock:
+            if self._gas_price is None or time.monotonic() - self._gas_price_fetched_at > self.GAS_PRICE_TTL:
+                self._gas_price = self.web3.eth.gas_price
+                self._gas_price_fetched_at = time.monotonic()
+            return self._gas_price
+
+    def send_contract_transaction(self, function, nonce: int = None, refresh_gas: bool = False):
+        """
+        Signs and broadcasts a contract function call without waiting for it to be mined.
+        The nonce is reserved from the shared NonceManager unless one is given, and the
+        local nonce counter is resynchronised if the node rejects it.
+        The gas limit comes from the GasEstimator, gas_limit being the maximum.
+        :param function: web3 ContractFunction - the bound function call to send
+        :param nonce: int - optional pre-reserved nonce
+        :param refresh_gas: bool - estimate the gas of this call instead of reusing a cached estimate
+        :return: HexBytes - the transaction hash
+        """
+        reserved = nonce is None
+        for attempt in range(2):
+            if reserved:
+                nonce = self.nonce_manager.reserve(self.account_address)
+            params = {
+                "from": self.account_address,
+                "chainId": self.chain_id,
+                "gas": self.gas_limit,
+                "gasPrice": self.get_gas_price(),
+                "nonce": nonce
+            }
+            try:
+                transaction = function.build_transaction(params)
+                transaction["gas"] = self.gas_estimator.estimate(transaction, self.gas_limit, refresh=refresh_gas)
+                signed_txn = self.web3.eth.account.sign_transaction(transaction, private_key=self.account_private_key)
+                tx_hash = self.web3.eth.send_raw_transaction(signed_txn.raw_transaction)
+                self.nonce_manager.sent(self.account_address, nonce)
+                self.gas_estimator.sent(tx_hash, transaction)
+                return tx_hash
+            except Exception as e:
+                if not reserved:
+                    raise
+                self.nonce_manager.release(self.account_address, nonce)
+                if attempt == 0 and NonceManager.is_nonce_error(e):
+                    self.nonce_manager.resync(self.account_address)
+                    continue
+                raise
+
+    def send_contract_transactions(self, functions: List) -> List:
+        """
+        Signs and broadcasts several contract function calls back to back with nonces reserved together,
+        so they can all be mined in the same block.
+        If one broadcast fails, its nonce and the following ones are released and the following calls
+        are sent with freshly synchronised nonces, so no gap is left.
+        :param functions: list of web3 ContractFunction - the bound function calls to send
+        :return: list of HexBytes transaction hashes, or the exception of the calls that failed
+        """
+        nonces = self.nonce_manager.reserve_many(self.account_address, len(functions))
+        results = []
+        for position, (function, nonce) in enumerate(zip(functions, nonces)):
+            try:
+                results.append(self.send_contract_transaction(function, nonce))
+            except Exception as e:
+                results.append(e)
+                for unused_nonce in nonces[position:]:
+                    self.nonce_manager.release(self.account_address, unused_nonce)
+                self.nonce_manager.resync(self.account_address)
+                for remaining_function in functions[position + 1:]:
+                    try:
+                        results.append(self.send_contract_transaction(remaining_function))
+                    except Exception as remaining_error:
+                        results.append(remaining_error)
+                break
+        return results
+
+    def pipeline(self, confirmation: str = Confirmation.DETAILS) -> TransactionPipeline:
+        """
+        Returns a pipeline that sends several contract write calls back to back and waits for them together.
+        :param confirmation: String - Confirmation level the transactions are waited for
+        :return: TransactionPipeline - use it as a context manager or call execute()
+        """
+        return TransactionPipeline(self, confirmation)
+
+    def wait_for_receipt(self, tx_hash, timeout: float = 120) -> dict:
+        """
+        Waits for a transaction to be mined.
+        If it is not mined in time it was probably dropped, so the nonce counter is resynchronised.
+        :param tx_hash: HexBytes - the transaction hash
+        :param timeout: float - seconds to wait
+        :return: receipt dict - the transaction receipt
+        """
+        try:
+            return dict(self.web3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout))
+        except TimeExhausted:
+            self.nonce_manager.resync(self.account_address)
+            raise
+
+    def call_contract_write_function(self, contract, function_name, *args,
+                                     confirmation: str = Confirmation.DETAILS) -> dict:
         """
         Calls a write function of a smart contract.
         :param contract web3.Contract - the smart contract instance to call the function on
         :param function_name: String - the name of the function to call
         :param args: List - the arguments to pass to the function
-        :return: receipt dict - the transaction receipt
+        :param confirmation: String - Confirmation.SENT returns the tracking record right after the broadcast,
+            Confirmation.MINED returns the bare receipt, Confirmation.DETAILS also loads the transaction details
+        :return: receipt dict - the transaction receipt, or the tracking record (SENT)
+        :raises ValueError: if the confirmation level is unknown
+        :raises TransactionFailedError: if the transaction reverted, or ran out of gas twice
         """
+        if confirmation not in Confirmation.LEVELS:
+            raise ValueError(f"Unknown confirmation level {confirmation}, expected one of {Confirmation.LEVELS}")
+        if confirmation == Confirmation.SENT:
+            return self.submit_contract_write_function(contract, function_name, *args)
+
         function = contract.functions[function_name](*args)
+        tx_hash = self.send_contract_transaction(function)
+        return self.get_receipt_or_resend(tx_hash, function, with_details=confirmation == Confirmation.DETAILS)
 
-        params = {
-            "from": self.account_address,
-            "gas": self.gas_limit,
-            "gasPrice": self.web3.eth.gas_price,
-            "nonce": self.web3.eth.get_transaction_count(self.account_address)
-        }
+    def get_receipt_or_resend(self, tx_hash, function, with_details: bool = True) -> dict:
+        """
+        Waits for a transaction to be mined. If it ran out of gas with an estimated limit (the cached
+        estimate came from a cheaper call of the function), it is sent once more with a fresh estimate.
+        :param tx_hash: HexBytes - the transaction hash
+        :param function: web3 ContractFunction - the bound function call of the transaction
+        :param with_details: bool - add the transaction details to the receipt (one more RPC)
+        :return: receipt dict - the transaction receipt
+        :raises TransactionFailedError: if the transaction reverted, or ran out of gas twice
+        """
+        try:
+            return self.get_receipt(tx_hash, with_details=with_details)
+        except OutOfGasError:
+            tx_hash = self.send_contract_transaction(function, refresh_gas=True)
+            return self.get_receipt(tx_hash, with_details=with_details)
 
-        transaction = function.build_transaction(params)
-        signed_txn = self.web3.eth.account.sign_transaction(transaction, private_key=self.account_private_key)
-        tx_hash = self.web3.eth.send_raw_transaction(signed_txn.raw_transaction)
-        tx_receipt = dict(self.web3.eth.wait_for_transaction_receipt(tx_hash))
+    def get_receipt(self, tx_hash, with_details: bool = True) -> dict:
+        """
+        Waits for a transaction to be mined.
+        :param tx_hash: HexBytes - the transaction hash
+        :param with_details: bool - add the transaction details to the receipt (one more RPC)
+        :return: receipt dict - the transaction receipt, with transactionHash and optionally transactionDetails
+        :raises TransactionFailedError: if the transaction failed (OutOfGasError if it ran out of an estimated
+            gas limit), with the receipt
+        """
+        tx_receipt = self.wait_for_receipt(tx_hash)
+        out_of_gas = self.gas_estimator.mined(tx_hash, tx_receipt['gasUsed'], tx_receipt['status'] == 1)
         tx_receipt['transactionHash'] = tx_hash
+        if with_details:
+            # load the transaction details
+            tx_details = self.web3.eth.get_transaction(tx_hash)
+            tx_receipt['transactionDetails'] = dict(tx_details)
 
-        # load the transaction details
-        tx_details = self.web3.eth.get_transaction(tx_hash)
-        tx_receipt['transactionDetails'] = dict(tx_details)
+        if tx_receipt['status'] != 1:
+            if out_of_gas:
+                raise OutOfGasError(f"Transaction {HexBytes(tx_hash).to_0x_hex()} ran out of gas", tx_receipt)
+            raise TransactionFailedError(f"Transaction {HexBytes(tx_hash).to_0x_hex()} reverted", tx_receipt)
         return tx_receipt
 
+    def submit_contract_write_function(self, contract, function_name, *args, on_complete=None) -> dict:
+        """
+        Calls a write function of a smart contract without waiting for it to be mined.
+        The transaction is handed to the TransactionTracker, which follows it in the background.
+        :param contract web3.Contract - the smart contract instance to call the function on
+        :param function_name: String - the name of the function to call
+        :param args: List - the arguments to pass to the function
+        :param on_complete: callable receiving the final tracking record once mined, failed or dropped
+        :return: dict - the tracking record (transactionHash and pending status)
+        """
+        function = contract.functions[function_name](*args)
+        tx_hash = self.send_contract_transaction(function)
+        return self.track_transaction(tx_hash, contract, function_name, on_complete)
+
+    def track_transaction(self, tx_hash, contract, function_name: str, on_complete=None) -> dict:
+        """
+        Hands a sent transaction to the TransactionTracker, resynchronising the nonces if it gets dropped.
+        :param tx_hash: HexBytes - the transaction hash
+        :param contract web3.Contract - the smart contract the transaction calls
+        :param function_name: String - the name of the called function
+        :param on_complete: callable receiving the final tracking record once mined, failed or dropped
+        :return: dict - the tracking record (transactionHash and pending status)
+        """
+        account_address = self.account_address
+
+        def on_tracked(record):
+            if record["status"] == TransactionStatus.DROPPED:
+                self.nonce_manager.resync(account_address)
+            elif record.get("gasUsed") is not None:
+                self.gas_estimator.mined(tx_hash, record["gasUsed"], record["status"] == TransactionStatus.MINED)
+            if on_complete is not None:
+                on_complete(record)
+
+        metadata = {"contract": contract.address, "function": function_name}
+        return self.transaction_tracker.track(tx_hash, metadata, on_tracked)
+
+    def get_transaction_status(self, transaction_hash) -> dict | None:
+        """
+        Returns the status of a transaction (pending, mined, failed or dropped).
+        :param transaction_hash: the transaction hash
+        :return: dict - the tracking record, or None if the transaction is unknown
+        """
+        return self.transaction_tracker.status(transaction_hash)
+
     def call_contract_write_function_directly(self, contract, function_name, *args) -> dict:
         """
         Calls a write function of a smart contract directly without building the transaction.
@@ -0,0 +1,223 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+LOGGER = logging.getLogger(__name__)
+
+
+class GasEstimator:
+    """
+    Cache of eth_estimateGas results used as the gas limit of contract writes, instead of a fixed limit.
+
+    Estimates are keyed by (contract, function selector, argument size class) so calls to the same
+    function with arguments of a similar size share one estimate. The gas limit sent is the cached
+    estimate plus a safety margin, capped by the interface's maximum gas limit. The cost of a write
+    depends on the contract state (a first write costs more than an overwrite), so the estimate of a key
+    is the largest gas ever estimated or used for it and is never lowered: entries are refreshed every
+    `refresh_interval` seconds and by the gas used of the mined transactions, which can only raise them.
+    A transaction running out of gas is reported by `mined`, to be sent again with a fresh estimate.
+    """
+
+    DEFAULT_MARGIN = 0.2
+    DEFAULT_REFRESH_INTERVAL = 300
+    MAX_TRACKED_TRANSACTIONS = 10000
+
+    _estimators = {}
+    _estimators_lock = threading.Lock()
+
+    def __init__(self, web3: Web3, margin: float = DEFAULT_MARGIN, refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+                 enabled: bool = True):
+        """
+        :param web3: Web3 - web3 instance used to estimate the gas
+        :param margin: float - fraction added on top of the estimate (0.2 sends 120% of the estimate)
+        :param refresh_interval: float - seconds an estimate is reused before being estimated again
+        :param enabled: bool - False sends every transaction with the fixed gas limit
+        """
+        self.web3 = web3
+        self.margin = margin
+        self.refresh_interval = refresh_interval
+        self.enabled = enabled
+        self._entries = {}
+        self._sent = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._failures = 0
+
+    @classmethod
+    def for_endpoint(cls, blockchain_address: str, web3: Web3):
+        """
+        Get the estimator shared by every interface connected to the same RPC endpoint.
+        :param blockchain_address: String - the RPC endpoint url
+        :param web3: Web3 - web3 instance used to query the node
+        :return: GasEstimator
+        """
+        with cls._estimators_lock:
+            estimator = cls._estimators.get(blockchain_address)
+            if estimator is None:
+                estimator = cls(web3)
+                cls._estimators[blockchain_address] = estimator
+            return estimator
+
+    def configure(self, margin: float = None, refresh_interval: float = None, enabled: bool = None):
+        """
+        Change the estimation settings. Unset values are left untouched.
+        :param margin: float - fraction added on top of the estimate
+        :param refresh_interval: float - seconds an estimate is reused
+        :param enabled: bool - False sends every transaction with the fixed gas limit
+        :return: self
+        """
+        with self._lock:
+            if margin is not None:
+                self.margin = margin
+            if refresh_interval is not None:
+                self.refresh_interval = refresh_interval
+            if enabled is not None:
+                self.enabled = enabled
+        return self
+
+    @staticmethod
+    def size_class(data: str) -> int:
+        """
+        Bucket the ABI-encoded arguments of a call by size: the number of 32 bytes words, rounded up
+        to a power of two.
+        :param data: str - the hex call data (selector and arguments)
+        :return: int - the size class
+        """
+        words = max(len(data) - 10, 0) // 64
+        return 0 if words == 0 else 1 << (words - 1).bit_length()
+
+    @classmethod
+    def key(cls, transaction: dict) -> tuple:
+        """
+        :param transaction: dict - a built transaction
+        :return: tuple - (contract address, function selector, argument size class)
+        """
+        data = transaction.get("data") or "0x"
+        return transaction.get("to"), data[:10], cls.size_class(data)
+
+    def estimate(self, transaction: dict, max_gas: int, refresh: bool = False) -> int:
+        """
+        Get the gas limit to send a transaction with.
+        :param transaction: dict - the built transaction (from, to and data are used)
+        :param max_gas: int - the maximum gas limit, also used when the estimation is disabled or fails
+        :param refresh: bool - estimate this call even if the key has a recent estimate
+        :return: int - the gas limit
+        """
+        if not self.enabled:
+            return max_gas
+
+        key = self.key(transaction)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if not refresh and entry is not None and now - entry["estimatedAt"] <= self.refresh_interval:
+                self._hits += 1
+                return self._with_margin(entry["gas"], max_gas)
+            self._misses += 1
+
+        try:
+            estimated = self.web3.eth.estimate_gas({
+                "from": transaction.get("from"),
+                "to": transaction.get("to"),
+                "data": transaction.get("data")
+            })
+        except Exception as e:
+            # most likely the call reverts: send it with the fixed limit so the revert is reported as before
+            LOGGER.debug(f"Gas estimation failed for {key}: {str(e)}")
+            with self._lock:
+                self._failures += 1
+            return max_gas
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {"gas": 0, "transactions": 0, "gasSent": 0, "gasUsed": 0,
+                                              "maxGasUsed": 0, "outOfGas": 0}
+            # calls sharing a key cost more or less depending on their arguments and the contract
+            # state: keep the largest value seen
+            entry["gas"] = max(estimated, entry["gas"])
+            entry["estimatedAt"] = now
+            return self._with_margin(entry["gas"], max_gas)
+
+    def _with_margin(self, gas: int, max_gas: int) -> int:
+        gas = math.ceil(gas * (1 + self.margin))
+        return min(gas, max_gas) if max_gas else gas
+
+    def sent(self, tx_hash, transaction: dict):
+        """
+        Remember the key and gas limit of a sent transaction, to record its usage once mined.
+        :param tx_hash: HexBytes - the transaction hash
+        :param transaction: dict - the sent transaction
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._sent[HexBytes(tx_hash)] = (self.key(transaction), transaction.get("gas"))
+            while len(self._sent) > self.MAX_TRACKED_TRANSACTIONS:
+                self._sent.popitem(last=False)
+
+    def mined(self, tx_hash, gas_used: int, succeeded: bool) -> bool:
+        """
+        Record the gas used by a mined transaction.
+        :param tx_hash: HexBytes - the transaction hash
+        :param gas_used: int - the gas used by the transaction
+        :param succeeded: bool - the transaction status
+        :return: bool - True if the transaction ran out of gas with an estimated limit
+        """
+        with self._lock:
+            sent = self._sent.pop(HexBytes(tx_hash), None)
+            if sent is None:
+                return False
+            key, gas_sent = sent
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            entry["transactions"] += 1
+            entry["gasSent"] += gas_sent or 0
+            entry["gasUsed"] += gas_used
+            entry["maxGasUsed"] = max(entry["maxGasUsed"], gas_used)
+            entry["gas"] = max(entry["gas"], gas_used)
+            if not succeeded and gas_sent and gas_used >= gas_sent:
+                # ran out of gas: estimate again on the next call
+                entry["outOfGas"] += 1
+                entry["estimatedAt"] = float("-inf")
+                LOGGER.warning(f"Transaction {HexBytes(tx_hash).to_0x_hex()} ran out of gas with a limit of {gas_sent}")
+                return True
+            return False
+
+    def clear(self):
+        """
+        Drop every estimate.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._sent.clear()
+
+    def stats(self) -> dict:
+        """
+        :return: dict with the hits, misses and failed estimations, and per (contract, selector, size class)
+            the current estimate and the estimated (sent) versus used gas of the mined transactions
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "failures": self._failures,
+                "functions": {
+                    f"{contract}:{selector}:{size_class}": {
+                        "estimate": entry["gas"],
+                        "transactions": entry["transactions"],
+                        "averageGasSent": entry["gasSent"] // entry["transactions"] if entry["transactions"] else None,
+                        "averageGasUsed": entry["gasUsed"] // entry["transactions"] if entry["transactions"] else None,
+                        "maxGasUsed": entry["maxGasUsed"],
+                        "outOfGas": entry["outOfGas"]
+                    }
+                    for (contract, selector, size_class), entry in self._entries.items()
+                }
+            }
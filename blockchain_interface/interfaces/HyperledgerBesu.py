@@ -8,7 +8,7 @@ from blockchain_interface.interfaces.EVMInterface import EVMInterface
 
 class HyperledgerBesu(EVMInterface):
     BLOCKCHAIN = "Hyperledger Besu"
-    DEFAULT_GAS_LIMIT = 4100000  # Default gas limit for transactions
+    DEFAULT_GAS_LIMIT = 4100000  # Maximum gas limit for transactions (the limit sent is estimated)
 
     def __init__(self, blockchain_address: str, gas_limit: int = DEFAULT_GAS_LIMIT):
         super().__init__(blockchain_address, self.BLOCKCHAIN)
@@ -0,0 +1,137 @@
+import logging
+import threading
+from typing import List
+
+from web3 import Web3
+
+LOGGER = logging.getLogger(__name__)
+
+
+class NonceManager:
+    """
+    Thread-safe, per-account nonce allocator.
+
+    Nonces are reserved locally so many signed transactions from the same account can be in
+    flight at once, instead of asking the node for the transaction count before every write.
+    The local counter is resynchronised with the node pending nonce when a transaction fails
+    to broadcast or is dropped from the pool; nonces given back or skipped meanwhile are
+    reused before new ones.
+    """
+
+    _managers = {}
+    _managers_lock = threading.Lock()
+
+    NONCE_ERROR_MARKERS = ("nonce", "underpriced", "already known")
+
+    def __init__(self, web3: Web3):
+        self.web3 = web3
+        self._next_nonce = {}
+        self._released = {}  # address -> nonces below the counter to hand out again
+        self._reserved = {}  # address -> nonces handed out, not broadcast nor released yet
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_endpoint(cls, blockchain_address: str, web3: Web3):
+        """
+        Get the nonce manager shared by every interface connected to the same RPC endpoint.
+        :param blockchain_address: String - the RPC endpoint url
+        :param web3: Web3 - web3 instance used to query the node
+        :return: NonceManager
+        """
+        with cls._managers_lock:
+            manager = cls._managers.get(blockchain_address)
+            if manager is None:
+                manager = cls(web3)
+                cls._managers[blockchain_address] = manager
+            return manager
+
+    @classmethod
+    def is_nonce_error(cls, error: Exception) -> bool:
+        """
+        Check if a broadcast error was caused by a stale or duplicated nonce.
+        :param error: Exception - the error raised by the node
+        :return: bool
+        """
+        message = str(error).lower()
+        return any(marker in message for marker in cls.NONCE_ERROR_MARKERS)
+
+    def _pending_nonce(self, address: str) -> int:
+        return self.web3.eth.get_transaction_count(address, "pending")
+
+    def reserve(self, address: str) -> int:
+        """
+        Reserve the next nonce of an account.
+        :param address: String - the account address
+        :return: int - the reserved nonce
+        """
+        return self.reserve_many(address, 1)[0]
+
+    def reserve_many(self, address: str, count: int) -> List[int]:
+        """
+        Reserve several nonces of an account, e.g. to pipeline several transactions.
+        Released nonces (gaps below the counter) are handed out first, then consecutive new ones.
+        :param address: String - the account address
+        :param count: int - how many nonces to reserve
+        :return: list of reserved nonces, in increasing order
+        """
+        with self._lock:
+            nonce = self._next_nonce.get(address)
+            if nonce is None:
+                nonce = self._pending_nonce(address)
+            released = self._released.setdefault(address, set())
+            nonces = sorted(released)[:count]
+            released.difference_update(nonces)
+            nonces += range(nonce, nonce + count - len(nonces))
+            self._next_nonce[address] = max(nonce, nonces[-1] + 1) if nonces else nonce
+            self._reserved.setdefault(address, set()).update(nonces)
+            return nonces
+
+    def sent(self, address: str, nonce: int):
+        """
+        Mark a reserved nonce as broadcast: the node now accounts for it.
+        :param address: String - the account address
+        :param nonce: int - the nonce of the sent transaction
+        """
+        with self._lock:
+            self._reserved.get(address, set()).discard(nonce)
+
+    def release(self, address: str, nonce: int):
+        """
+        Give back a nonce whose transaction was never broadcast. It is handed out again before new nonces,
+        so later nonces already reserved are not reused.
+        :param address: String - the account address
+        :param nonce: int - the unused nonce
+        """
+        with self._lock:
+            self._reserved.get(address, set()).discard(nonce)
+            next_nonce = self._next_nonce.get(address)
+            if next_nonce is None or nonce >= next_nonce:
+                return
+            released = self._released.setdefault(address, set())
+            released.add(nonce)
+            # move the counter back over the free nonces at its end
+            while next_nonce - 1 in released:
+                next_nonce -= 1
+                released.discard(next_nonce)
+            self._next_nonce[address] = next_nonce
+
+    def resync(self, address: str):
+        """
+        Resynchronise the local counter with the node pending nonce
+        (after failed broadcasts or dropped transactions).
+        The node does not know about the nonces reserved but not broadcast yet: while some are in flight the
+        counter is kept, and the other nonces from the node pending nonce up to it are handed out again first.
+        :param address: String - the account address
+        """
+        with self._lock:
+            pending = self._pending_nonce(address)
+            next_nonce = self._next_nonce.get(address)
+            in_flight = {nonce for nonce in self._reserved.get(address, ()) if nonce >= pending}
+            if next_nonce is None or next_nonce <= pending or not in_flight:
+                self._next_nonce[address] = pending
+                self._released[address] = set()
+                LOGGER.info(f"Nonce for {address} resynchronised to {pending}")
+            else:
+                self._released[address] = set(range(pending, next_nonce)) - in_flight
+                LOGGER.info(f"Nonce for {address} resynchronised to {pending}, {len(in_flight)} reserved nonces "
+                            f"in flight up to {next_nonce - 1}")
@@ -0,0 +1,125 @@
+from typing import List
+
+from eth_utils.abi import collapse_if_tuple
+from hexbytes import HexBytes
+
+from blockchain_interface.errors import ContractReadError
+
+
+def decode_function_result(web3, outputs: List[dict], raw_result):
+    """
+    Decode the raw return data of a contract function with its ABI outputs.
+    Addresses are checksummed and a single output is returned unwrapped,
+    the same way ContractFunction.call() does.
+    :param web3: Web3 - web3 instance holding the ABI codec
+    :param outputs: list - the `outputs` entry of the function ABI
+    :param raw_result: hex string or bytes - the raw return data
+    :return: the decoded value(s)
+    """
+    types = [collapse_if_tuple(output) for output in outputs]
+    decoded = web3.codec.decode(types, HexBytes(raw_result))
+    decoded = [_normalize_output(web3, output, value) for output, value in zip(outputs, decoded)]
+    return decoded[0] if len(decoded) == 1 else decoded
+
+
+def _normalize_output(web3, output: dict, value):
+    abi_type = output["type"]
+    if abi_type.endswith("]"):
+        item = dict(output, type=abi_type[:abi_type.rindex("[")])
+        return [_normalize_output(web3, item, element) for element in value]
+    if abi_type == "tuple":
+        return tuple(_normalize_output(web3, component, element)
+                     for component, element in zip(output["components"], value))
+    if abi_type == "address":
+        return web3.to_checksum_address(value)
+    return value
+
+
+class ReadBatch:
+    """
+    Collects contract read calls and sends them as a single JSON-RPC batch of `eth_call`s,
+    all pinned to the same block. Results are decoded with each function ABI and returned in
+    the order the calls were added.
+
+    Usage:
+        with evm_interface.read_batch() as batch:
+            batch.add(pip.contract, "getUserGroups", user)
+            batch.add(pip.contract, "getUserRoleAttribute", user)
+        groups, role = batch.results
+    """
+
+    def __init__(self, evm_interface, block_identifier=None):
+        """
+        :param evm_interface: EVMInterface - the interface used to send the batch
+        :param block_identifier: block number or tag to read at (default: the current block number)
+        """
+        self.evm_interface = evm_interface
+        self.block_identifier = block_identifier
+        self.block_number = None
+        self.results = None
+        self._calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and self.results is None:
+            self.execute()
+        return False
+
+    def __len__(self):
+        return len(self._calls)
+
+    def add(self, contract, function_name, *args) -> int:
+        """
+        Queue a read call.
+        :param contract: web3.Contract - the smart contract instance to call the function on
+        :param function_name: String - the name of the function to call
+        :param args: List - the arguments to pass to the function
+        :return: int - the position of the result in the batch
+        """
+        function = contract.functions[function_name](*args)
+        self._calls.append((contract.address, contract.encode_abi(function_name, args=args), function.abi["outputs"]))
+        return len(self._calls) - 1
+
+    def _resolve_block(self):
+        if self.block_identifier is None:
+            self.block_number = self.evm_interface.web3.eth.block_number
+            return hex(self.block_number)
+        if isinstance(self.block_identifier, int):
+            self.block_number = self.block_identifier
+            return hex(self.block_identifier)
+        return self.block_identifier
+
+    def execute(self, raise_on_error: bool = True) -> List:
+        """
+        Send the queued calls in one JSON-RPC batch request.
+        :param raise_on_error: raise ContractReadError on the first failed call,
+            otherwise failed calls hold a ContractReadError instance in the results
+        :return: list of decoded results, in the order the calls were added
+        """
+        if not self._calls:
+            self.results = []
+            return self.results
+
+        block = self._resolve_block()
+        requests = [
+            ("eth_call", [{"from": self.evm_interface.account_address, "to": address, "data": data}, block])
+            for address, data, _ in self._calls
+        ]
+        responses = self.evm_interface.web3.provider.make_batch_request(requests)
+        if isinstance(responses, dict):
+            # the node rejected the whole batch
+            raise ContractReadError(f"Batch request failed: {responses.get('error')}")
+        responses = sorted(responses, key=lambda response: response.get("id", 0))
+
+        self.results = []
+        for (address, _, outputs), response in zip(self._calls, responses):
+            if "error" in response:
+                error = ContractReadError(f"Read call to {address} failed: {response['error']}")
+                if raise_on_error:
+                    raise error
+                self.results.append(error)
+                continue
+            self.results.append(decode_function_result(self.evm_interface.web3, outputs, response["result"]))
+        return self.results
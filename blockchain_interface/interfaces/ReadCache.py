@@ -0,0 +1,304 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+LOGGER = logging.getLogger(__name__)
+
+ALL_KEYS = object()  # invalidate every entry of a contract
+
+
+class ReadCache:
+    """
+    Block-aware read-through cache of contract view calls.
+
+    Entries are keyed by (contract, function, args) and tagged with the block they were read at.
+    They are dropped when:
+    - this process sends a write to the same contract and key (the first call argument),
+    - a new block holds logs emitted by the contract (checked at most every `log_check_interval`): only the
+      reads of the key changed by each log if the contract registered a decoder, every read of it otherwise.
+      Logs of the transactions this process already invalidated are skipped,
+    - they are older than `ttl` seconds, which bounds the staleness of changes that emit no logs.
+    """
+
+    DEFAULT_TTL = 30
+    DEFAULT_MAX_SIZE = 4096
+    DEFAULT_LOG_CHECK_INTERVAL = 1.0
+    MAX_APPLIED_TRANSACTIONS = 10000
+
+    _caches = {}
+    _caches_lock = threading.Lock()
+
+    def __init__(self, web3: Web3, ttl: float = DEFAULT_TTL, max_size: int = DEFAULT_MAX_SIZE,
+                 log_check_interval: float = DEFAULT_LOG_CHECK_INTERVAL):
+        """
+        :param web3: Web3 - web3 instance used to watch the chain head and logs
+        :param ttl: float - maximum age of an entry in seconds (0 disables the cache)
+        :param max_size: int - maximum number of entries (least recently used are evicted)
+        :param log_check_interval: float - minimum seconds between two checks for new blocks
+        """
+        self.web3 = web3
+        self.ttl = ttl
+        self.max_size = max_size
+        self.log_check_interval = log_check_interval
+        self._entries = OrderedDict()
+        self._keys_by_contract = {}
+        self._generations = {}
+        self._watched = set()
+        self._log_keys = {}
+        self._applied_transactions = OrderedDict()
+        self._listeners = []
+        self._last_block = None
+        self._last_check = 0.0
+        self._lock = threading.RLock()
+        self._check_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    @classmethod
+    def for_endpoint(cls, blockchain_address: str, web3: Web3):
+        """
+        Get the cache shared by every interface connected to the same RPC endpoint.
+        :param blockchain_address: String - the RPC endpoint url
+        :param web3: Web3 - web3 instance used to query the node
+        :return: ReadCache
+        """
+        with cls._caches_lock:
+            cache = cls._caches.get(blockchain_address)
+            if cache is None:
+                cache = cls(web3)
+                cls._caches[blockchain_address] = cache
+            return cache
+
+    def configure(self, ttl: float = None, max_size: int = None, log_check_interval: float = None):
+        """
+        Change the cache bounds. Unset values are left untouched.
+        :param ttl: float - maximum age of an entry in seconds (0 disables the cache)
+        :param max_size: int - maximum number of entries
+        :param log_check_interval: float - minimum seconds between two checks for new blocks
+        :return: self
+        """
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if max_size is not None:
+                self.max_size = max_size
+            if log_check_interval is not None:
+                self.log_check_interval = log_check_interval
+            self._evict()
+        return self
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    @staticmethod
+    def _index_key(value):
+        return value.lower() if isinstance(value, str) else value
+
+    def generation(self, contract_address: str) -> int:
+        """
+        Get the invalidation counter of a contract. Pass it back to set() so a value read
+        before a concurrent invalidation is not cached.
+        :param contract_address: String - the contract address
+        :return: int
+        """
+        with self._lock:
+            return self._generations.get(contract_address, 0)
+
+    def get(self, contract_address: str, function_name: str, args: tuple):
+        """
+        Look up a cached read.
+        :param contract_address: String - the contract address
+        :param function_name: String - the view function name
+        :param args: tuple - the call arguments
+        :return: tuple (hit, value)
+        """
+        self.check_new_blocks()
+        key = (contract_address, function_name, args)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry["cachedAt"] <= self.ttl:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return True, entry["value"]
+            if entry is not None:
+                self._drop(key)
+            self._misses += 1
+            return False, None
+
+    def set(self, contract_address: str, function_name: str, args: tuple, value, generation: int = None):
+        """
+        Cache a read result, tagged with the last block seen.
+        :param contract_address: String - the contract address
+        :param function_name: String - the view function name
+        :param args: tuple - the call arguments
+        :param value: the decoded result
+        :param generation: int - the value of generation() taken before the read
+        """
+        key = (contract_address, function_name, args)
+        with self._lock:
+            if generation is not None and generation != self._generations.get(contract_address, 0):
+                return
+            self._entries[key] = {"value": value, "blockNumber": self._last_block, "cachedAt": time.monotonic()}
+            self._entries.move_to_end(key)
+            index_key = self._index_key(args[0]) if args else None
+            self._keys_by_contract.setdefault(contract_address, {}).setdefault(index_key, set()).add(key)
+            self._evict()
+
+    def invalidate(self, contract_address: str, key=ALL_KEYS, transaction_hash=None):
+        """
+        Drop cached reads of a contract.
+        :param contract_address: String - the contract address
+        :param key: the first call argument whose reads are dropped (default: every read of the contract)
+        :param transaction_hash: the mined transaction that changed the key, its logs are then skipped
+        """
+        with self._lock:
+            if transaction_hash is not None:
+                self._applied_transactions[HexBytes(transaction_hash)] = (contract_address, key)
+                while len(self._applied_transactions) > self.MAX_APPLIED_TRANSACTIONS:
+                    self._applied_transactions.popitem(last=False)
+            self._generations[contract_address] = self._generations.get(contract_address, 0) + 1
+            self._invalidations += 1
+            index = self._keys_by_contract.get(contract_address, {})
+            if key is ALL_KEYS:
+                keys = [entry_key for entry_keys in index.values() for entry_key in entry_keys]
+            else:
+                # reads without arguments (e.g. lists) may depend on any key
+                keys = list(index.get(self._index_key(key), ())) + list(index.get(None, ()))
+            for entry_key in keys:
+                self._drop(entry_key)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(contract_address, key)
+            except Exception as e:
+                LOGGER.error(f"Error in cache invalidation listener: {str(e)}")
+
+    def watch(self, contract_address: str):
+        """
+        Check the logs of a contract on new blocks even if none of its reads are cached, so the
+        invalidation listeners hear about its changes.
+        :param contract_address: String - the contract address
+        """
+        with self._lock:
+            self._watched.add(contract_address)
+
+    def register_log_keys(self, contract_address: str, log_key):
+        """
+        Register how to tell the key changed by a log of a contract, so new blocks only drop the reads of that key.
+        :param contract_address: String - the contract address
+        :param log_key: callable receiving a raw log and returning the key (first argument of the affected
+            reads), None if the log changes no read, or ALL_KEYS
+        """
+        with self._lock:
+            self._log_keys[contract_address] = log_key
+
+    def add_listener(self, listener):
+        """
+        Register a callable run after each invalidation, e.g. to drop values derived from the reads.
+        :param listener: callable receiving (contract_address, key), key being ALL_KEYS for a whole contract
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def clear(self):
+        """
+        Drop every cached read.
+        """
+        with self._lock:
+            for contract_address in list(self._keys_by_contract):
+                self.invalidate(contract_address)
+
+    def stats(self) -> dict:
+        """
+        :return: dict with the cache size, hits, misses, invalidations and last block seen
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+                "blockNumber": self._last_block
+            }
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        contract_address, _, args = key
+        index = self._keys_by_contract.get(contract_address, {})
+        index_key = self._index_key(args[0]) if args else None
+        keys = index.get(index_key)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                index.pop(index_key, None)
+
+    def _evict(self):
+        while len(self._entries) > self.max_size:
+            self._drop(next(iter(self._entries)))
+
+    def check_new_blocks(self):
+        """
+        Invalidate the reads changed by the logs of the blocks mined since the last check.
+        Rate limited to one check every `log_check_interval` seconds, shared by all threads.
+        """
+        if time.monotonic() - self._last_check < self.log_check_interval:
+            return
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_check = time.monotonic()
+            head = self.web3.eth.block_number
+            if self._last_block is None or head <= self._last_block:
+                self._last_block = head if self._last_block is None else self._last_block
+                return
+
+            with self._lock:
+                contracts = list(set(self._keys_by_contract) | self._watched)
+            if contracts:
+                logs = self.web3.eth.get_logs({
+                    "fromBlock": self._last_block + 1,
+                    "toBlock": head,
+                    "address": contracts
+                })
+                for contract_address, keys in self._log_invalidations(logs).items():
+                    LOGGER.debug(f"Invalidating cached reads of {contract_address}, logs found up to block {head}")
+                    if ALL_KEYS in keys:
+                        self.invalidate(contract_address)
+                        continue
+                    for key in keys:
+                        self.invalidate(contract_address, key)
+            self._last_block = head
+        except Exception as e:
+            # the entries stay bounded by the ttl, retry on the next lookup
+            LOGGER.warning(f"Error checking new blocks for cache invalidation: {str(e)}")
+        finally:
+            self._check_lock.release()
+
+    def _log_invalidations(self, logs) -> dict:
+        """
+        :return: dict contract address -> set of the keys changed by the logs (ALL_KEYS for every read)
+        """
+        with self._lock:
+            log_keys = dict(self._log_keys)
+            applied = {transaction_hash: self._applied_transactions.get(transaction_hash)
+                       for transaction_hash in {HexBytes(log["transactionHash"]) for log in logs}}
+        invalidations = {}
+        for log in logs:
+            contract_address = log["address"]
+            log_key = log_keys.get(contract_address)
+            key = log_key(log) if log_key is not None else ALL_KEYS
+            if key is None:
+                continue
+            applied_write = applied.get(HexBytes(log["transactionHash"]))
+            if applied_write is not None and applied_write[0] == contract_address and \
+                    (applied_write[1] is ALL_KEYS or self._index_key(applied_write[1]) == self._index_key(key)):
+                # written by this process, already invalidated once mined
+                continue
+            invalidations.setdefault(contract_address, set()).add(key)
+        return invalidations
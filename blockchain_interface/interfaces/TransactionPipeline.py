@@ -0,0 +1,91 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from blockchain_interface.interfaces.TransactionTracker import Confirmation
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TransactionPipeline:
+    """
+    Sends several contract write calls back to back with consecutive nonces, then waits for
+    all the receipts concurrently, so independent transactions cost about one block time.
+
+    Usage:
+        with evm_interface.pipeline() as pipeline:
+            pip.add_resource(uri, content_hash, pipeline=pipeline)
+            pap.register_resource(uri, policy_address, pipeline=pipeline)
+        pipeline.results  # one receipt (or exception) per call, in order
+    """
+
+    def __init__(self, evm_interface, confirmation: str = Confirmation.DETAILS):
+        """
+        :param evm_interface: EVMInterface - the interface used to sign and send the transactions
+        :param confirmation: str - Confirmation level: SENT tracks the transactions in the background,
+            MINED waits for the receipts, DETAILS also loads the transaction details
+        """
+        self.evm_interface = evm_interface
+        self.confirmation = confirmation
+        self.results = None
+        self._calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and self.results is None:
+            self.execute()
+        return False
+
+    def __len__(self):
+        return len(self._calls)
+
+    def add(self, contract, function_name: str, *args, on_complete: Callable = None) -> int:
+        """
+        Queue a write call.
+        :param contract: web3.Contract - the smart contract instance to call the function on
+        :param function_name: String - the name of the function to call
+        :param args: List - the arguments to pass to the function
+        :param on_complete: callable run once the transaction is mined (or finished, if only sent)
+        :return: int - the position of the result in the pipeline
+        """
+        self._calls.append((contract, function_name, contract.functions[function_name](*args), on_complete))
+        return len(self._calls) - 1
+
+    def execute(self) -> List:
+        """
+        Send the queued calls and, unless only sending, collect their receipts.
+        :return: list of receipts (tracking records if only sent), or the exception of the calls that failed
+            (TransactionFailedError with the receipt if mined but failed)
+        """
+        tx_hashes = self.evm_interface.send_contract_transactions([function for _, _, function, _ in self._calls])
+
+        if self.confirmation == Confirmation.SENT:
+            self.results = [
+                tx_hash if isinstance(tx_hash, Exception) else
+                self.evm_interface.track_transaction(tx_hash, contract, function_name, on_complete)
+                for (contract, function_name, _, on_complete), tx_hash in zip(self._calls, tx_hashes)
+            ]
+            return self.results
+
+        def wait_for(position):
+            tx_hash = tx_hashes[position]
+            if isinstance(tx_hash, Exception):
+                return tx_hash
+            try:
+                return self.evm_interface.get_receipt_or_resend(tx_hash, self._calls[position][2],
+                                                                with_details=self.confirmation == Confirmation.DETAILS)
+            except Exception as e:
+                return e
+            finally:
+                on_complete = self._calls[position][3]
+                if on_complete is not None:
+                    try:
+                        on_complete(tx_hash)
+                    except Exception as e:
+                        LOGGER.error(f"Error in transaction {tx_hash} completion callback: {str(e)}")
+
+        with ThreadPoolExecutor(max_workers=max(len(self._calls), 1)) as executor:
+            self.results = list(executor.map(wait_for, range(len(self._calls))))
+        return self.results
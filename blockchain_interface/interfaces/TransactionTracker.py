@@ -0,0 +1,187 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TransactionStatus:
+    PENDING = "pending"
+    MINED = "mined"
+    FAILED = "failed"
+    DROPPED = "dropped"
+
+
+class Confirmation:
+    """
+    How long a write call waits before returning.
+    """
+    SENT = "sent"  # on broadcast, returns the tracking record
+    MINED = "mined"  # on receipt
+    DETAILS = "details"  # on receipt, with the full transaction details (one more RPC)
+    LEVELS = (SENT, MINED, DETAILS)
+
+
+class TransactionTracker:
+    """
+    Background tracker of submitted transactions.
+
+    A daemon thread watches the chain head and, every time a new block arrives, looks up the
+    receipts of the pending transactions. Finished transactions are kept in a bounded history
+    so their status can be reported after the fact.
+    """
+
+    _trackers = {}
+    _trackers_lock = threading.Lock()
+
+    def __init__(self, web3: Web3, poll_interval: float = 1.0, timeout: float = 600, history_size: int = 10000):
+        """
+        :param web3: Web3 - web3 instance used to query the node
+        :param poll_interval: float - seconds between two chain head checks
+        :param timeout: float - seconds after which a pending transaction is considered dropped
+        :param history_size: int - number of finished transactions kept in memory
+        """
+        self.web3 = web3
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.history_size = history_size
+        self._pending = {}
+        self._history = OrderedDict()
+        self._callbacks = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._last_block = None
+
+    @classmethod
+    def for_endpoint(cls, blockchain_address: str, web3: Web3):
+        """
+        Get the tracker shared by every interface connected to the same RPC endpoint.
+        :param blockchain_address: String - the RPC endpoint url
+        :param web3: Web3 - web3 instance used to query the node
+        :return: TransactionTracker
+        """
+        with cls._trackers_lock:
+            tracker = cls._trackers.get(blockchain_address)
+            if tracker is None:
+                tracker = cls(web3)
+                cls._trackers[blockchain_address] = tracker
+            return tracker
+
+    @staticmethod
+    def _key(tx_hash) -> str:
+        return HexBytes(tx_hash).to_0x_hex()
+
+    def track(self, tx_hash, metadata: dict = None, on_complete: Callable[[dict], None] = None) -> dict:
+        """
+        Start tracking a submitted transaction.
+        :param tx_hash: the transaction hash
+        :param metadata: dict - extra fields reported with the status (e.g. contract, function)
+        :param on_complete: callable receiving the final record once mined, failed or dropped
+        :return: dict - the tracking record
+        """
+        key = self._key(tx_hash)
+        record = {
+            "transactionHash": key,
+            "status": TransactionStatus.PENDING,
+            "submittedAt": time.time(),
+            **(metadata or {})
+        }
+        with self._lock:
+            self._pending[key] = record
+            if on_complete is not None:
+                self._callbacks[key] = on_complete
+        self._ensure_running()
+        self._wakeup.set()
+        return dict(record)
+
+    def status(self, tx_hash) -> dict | None:
+        """
+        Get the status of a transaction. Unknown transactions are looked up on the chain.
+        :param tx_hash: the transaction hash
+        :return: dict - the tracking record, or None if the chain does not know the transaction
+        """
+        key = self._key(tx_hash)
+        with self._lock:
+            record = self._pending.get(key) or self._history.get(key)
+            if record is not None:
+                return dict(record)
+
+        try:
+            return self._finish_record({"transactionHash": key}, self.web3.eth.get_transaction_receipt(key))
+        except TransactionNotFound:
+            pass
+        try:
+            self.web3.eth.get_transaction(key)
+            return {"transactionHash": key, "status": TransactionStatus.PENDING}
+        except TransactionNotFound:
+            return None
+
+    @staticmethod
+    def _finish_record(record: dict, receipt) -> dict:
+        record["status"] = TransactionStatus.MINED if receipt["status"] == 1 else TransactionStatus.FAILED
+        record["blockNumber"] = receipt["blockNumber"]
+        record["gasUsed"] = receipt["gasUsed"]
+        return record
+
+    def _ensure_running(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="transaction-tracker", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                self.poll()
+            except Exception as e:
+                LOGGER.error(f"Error polling transaction receipts: {str(e)}")
+
+    def poll(self):
+        """
+        Check the receipts of the pending transactions if a new block arrived.
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            pending = list(self._pending.items())
+
+        block_number = self.web3.eth.block_number
+        head_moved = block_number != self._last_block
+        self._last_block = block_number
+
+        now = time.time()
+        for key, record in pending:
+            if head_moved:
+                try:
+                    self._complete(key, self._finish_record(dict(record), self.web3.eth.get_transaction_receipt(key)))
+                    continue
+                except TransactionNotFound:
+                    pass
+            if now - record["submittedAt"] > self.timeout:
+                record = dict(record, status=TransactionStatus.DROPPED)
+                self._complete(key, record)
+
+    def _complete(self, key: str, record: dict):
+        record["completedAt"] = time.time()
+        with self._lock:
+            self._pending.pop(key, None)
+            self._history[key] = record
+            while len(self._history) > self.history_size:
+                self._history.popitem(last=False)
+            callback = self._callbacks.pop(key, None)
+        if callback is not None:
+            try:
+                callback(dict(record))
+            except Exception as e:
+                LOGGER.error(f"Error in transaction {key} completion callback: {str(e)}")
@@ -0,0 +1,68 @@
+import threading
+from typing import Type
+
+from blockchain_interface.interfaces.ABACContracts.SmartContract import SmartContract
+from blockchain_interface.interfaces.EVMInterface import EVMInterface
+from blockchain_interface.interfaces.HyperledgerBesu import HyperledgerBesu
+
+
+class ContractRegistry:
+    """
+    Process-wide registry of blockchain clients and loaded contracts.
+
+    One EVMInterface is built per RPC endpoint and account, and one loaded contract object per
+    (contract class, address), both on first use, so importing the API does not touch the node or
+    the compiled artifacts and every namespace shares the same objects.
+    """
+
+    def __init__(self, interface_class: Type[EVMInterface] = HyperledgerBesu):
+        """
+        :param interface_class: the EVMInterface implementation to build
+        """
+        self.interface_class = interface_class
+        self._interfaces = {}
+        self._contracts = {}
+        self._lock = threading.RLock()
+
+    def get_interface(self, blockchain_address: str, private_key: str = None) -> EVMInterface:
+        """
+        Get the interface connected to an RPC endpoint, with the account of the private key loaded.
+        :param blockchain_address: str - the RPC endpoint url
+        :param private_key: str - the account private key, None for a read-only interface
+        :return: EVMInterface
+        """
+        key = (blockchain_address, private_key)
+        with self._lock:
+            evm_interface = self._interfaces.get(key)
+            if evm_interface is None:
+                evm_interface = self.interface_class(blockchain_address)
+                if private_key:
+                    evm_interface.connect(private_key)
+                self._interfaces[key] = evm_interface
+            return evm_interface
+
+    def get_contract(self, contract_class: Type[SmartContract], evm_interface: EVMInterface, contract_address: str,
+                     contract_file_path: str) -> SmartContract:
+        """
+        Get a loaded contract object.
+        :param contract_class: the SmartContract wrapper class (e.g. PolicyInformationPoint)
+        :param evm_interface: EVMInterface - the interface the contract is called through
+        :param contract_address: str - the address of the deployed contract
+        :param contract_file_path: str - the path to the contract source, next to its compiled artifacts
+        :return: SmartContract - the loaded contract
+        """
+        key = (contract_class, id(evm_interface), evm_interface.web3.to_checksum_address(contract_address))
+        with self._lock:
+            contract = self._contracts.get(key)
+            if contract is None:
+                contract = contract_class(evm_interface, contract_address, contract_file_path).load()
+                self._contracts[key] = contract
+            return contract
+
+    def clear(self):
+        """
+        Forget every interface and contract, e.g. after a redeployment.
+        """
+        with self._lock:
+            self._interfaces.clear()
+            self._contracts.clear()
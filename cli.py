@@ -1,10 +1,11 @@
 import argparse
 import os
 from pathlib import Path
-from time import sleep
+from time import perf_counter, sleep
 
 from dotenv import load_dotenv
 
+from blockchain_interface.indexer import ABACIndexer
 from blockchain_interface.helpers.testing import validate_on_behalf_of_permission, validate_user_attributes_management, \
     validate_resource_management, validate_resource_policy_management, validate_policy_evaluation
 from blockchain_interface.helpers.utils import load_json_from_file
@@ -24,6 +25,7 @@ class AccessControlCLI:
     POLICY_ADMINISTRATION_POINT_CONTRACT = "PAP.sol"
     POLICY_INFORMATION_POINT_CONTRACT = "PIP.sol"
     POLICY_DECISION_POINT_CONTRACT = "PDP.sol"
+    ABAC_MULTICALL_CONTRACT = "ABACMulticall.sol"
 
     def __init__(self, blockchain_rpc_url: str, contracts_root_path: str, **kwargs):
         self.blockchain_rpc_url = blockchain_rpc_url
@@ -40,6 +42,8 @@ class AccessControlCLI:
             return self.create_account()
         elif command == "test_abac":
             return self._test_abac()
+        elif command == "index":
+            return self._run_indexer()
         elif self.running_args.get('command') == "on-behalf-of":
             user_private_key = self.running_args.get('user_private_key')
             wallet_address = self.running_args.get('wallet_address')
@@ -106,16 +110,48 @@ class AccessControlCLI:
         if not self.is_blockchain_wallet_loaded:
             raise Exception("Blockchain wallet not loaded. Please load a wallet before starting the workspace.")
 
-        response = dict()
-        response['PIPAddress'] = self._deploy_contract(self.POLICY_INFORMATION_POINT_CONTRACT)
-        response['PAPAddress'] = self._deploy_contract(self.POLICY_ADMINISTRATION_POINT_CONTRACT)
+        timings = dict()
+        started_at = perf_counter()
+
+        # compile everything at once (up-to-date contracts are not recompiled)
+        phase_started_at = perf_counter()
+        self.deployer.compile_contracts([
+            self._contract_path(contract_name) for contract_name in (
+                self.POLICY_INFORMATION_POINT_CONTRACT, self.POLICY_ADMINISTRATION_POINT_CONTRACT,
+                self.POLICY_DECISION_POINT_CONTRACT, self.ABAC_MULTICALL_CONTRACT
+            )
+        ])
+        timings['compile'] = perf_counter() - phase_started_at
+
+        # PIP, PAP and the multicall do not depend on each other: mined together
+        phase_started_at = perf_counter()
+        pip_address, pap_address, multicall_address = self.deployer.deploy_contracts([
+            (self._contract_path(self.POLICY_INFORMATION_POINT_CONTRACT), ()),
+            (self._contract_path(self.POLICY_ADMINISTRATION_POINT_CONTRACT), ()),
+            (self._contract_path(self.ABAC_MULTICALL_CONTRACT), ()),
+        ])
+        timings['deploy PIP/PAP/ABACMulticall'] = perf_counter() - phase_started_at
+
+        # the PDP constructor needs the PAP and PIP addresses
+        phase_started_at = perf_counter()
+        pdp_input_data = (pap_address, pip_address)
+        pdp_address = self.deployer.deploy_contract(self._contract_path(self.POLICY_DECISION_POINT_CONTRACT),
+                                                    *pdp_input_data)
+        timings['deploy PDP'] = perf_counter() - phase_started_at
+        timings['total'] = perf_counter() - started_at
 
-        pdp_input_data = (response['PAPAddress'], response['PIPAddress'])
-        response['PDPAddress'] = self._deploy_contract(self.POLICY_DECISION_POINT_CONTRACT, *pdp_input_data)
+        response = dict()
+        response['PIPAddress'] = pip_address
+        response['PAPAddress'] = pap_address
+        response['PDPAddress'] = pdp_address
+        response['ABACMulticallAddress'] = multicall_address
 
-        self._display_start_blockchain_output(response)
+        self._display_start_blockchain_output(response, timings)
         return response
 
+    def _contract_path(self, contract_name: str) -> str:
+        return f"{self.contracts_root_path}/{contract_name}"
+
     def _deploy_contract(self, contract_name: str, *input_data) -> str:
         """
         Deploy a smart contract to the blockchain.
@@ -124,20 +160,57 @@ class AccessControlCLI:
         :return: Address of the deployed contract
         """
         # load file content
-        contract_path = f"{self.contracts_root_path}/{contract_name}"
+        contract_path = self._contract_path(contract_name)
         compiled_contract = self.deployer.compile_contract(contract_path, dump_compiled=True)
         contract_address = self.deployer.deploy_contract(contract_path, *input_data)
         return contract_address
 
-    def _display_start_blockchain_output(self, output: dict):
+    def _display_start_blockchain_output(self, output: dict, timings: dict = None):
         """
         Display the output of the start blockchain workspace command.
         :param output: dict - the output of the start blockchain workspace command
+        :param timings: dict - seconds spent in each phase of the command
         """
         print("Blockchain workspace started successfully.")
         print("Deployed contract addresses:")
         for contract_name, contract_address in output.items():
             print(f"{contract_name}: {contract_address}")
+        if timings:
+            print("Timings:")
+            for phase, seconds in timings.items():
+                print(f"{phase}: {seconds:.2f}s")
+
+    def _run_indexer(self):
+        """
+        Mirror the PIP and PAP state into the local SQLite index and keep following the chain.
+        """
+        environ = self.running_args.get('environ')
+        pip = PolicyInformationPoint(
+            self.blockchain_interface,
+            environ.get('POLICY_INFORMATION_POINT_ADDRESS'),
+            f"{self.contracts_root_path}/{self.POLICY_INFORMATION_POINT_CONTRACT}"
+        ).load()
+        pap = PolicyAdministrationPoint(
+            self.blockchain_interface,
+            environ.get('POLICY_ADMINISTRATION_POINT_ADDRESS'),
+            f"{self.contracts_root_path}/{self.POLICY_ADMINISTRATION_POINT_CONTRACT}"
+        ).load()
+
+        indexer = ABACIndexer(
+            self.blockchain_interface, pip, pap,
+            environ.get('ABAC_INDEX_DATABASE_PATH', str(BASE_DIR / "abac_index.sqlite3")),
+            start_block=int(environ.get('ABAC_INDEX_START_BLOCK', 0)),
+            batch_size=int(environ.get('ABAC_INDEX_BATCH_SIZE', 2000)),
+            workers=int(environ.get('ABAC_INDEX_WORKERS', 4)),
+            confirmations=int(environ.get('ABAC_INDEX_CONFIRMATIONS', 0))
+        )
+        print(f"Indexing PIP {pip.contract_address} and PAP {pap.contract_address} into {indexer.database_path}")
+        print(f"Backfilled up to block {indexer.sync()}, following the chain (Ctrl+C to stop)")
+        try:
+            indexer.run()
+        except KeyboardInterrupt:
+            indexer.stop()
+        return indexer.last_block
 
     def _test_abac(self):
         """
@@ -267,6 +340,8 @@ if __name__ == '__main__':
     ap.add_argument("-d", "--deploy", nargs="?", const=True, required=False, help="Deploy .sol contract and return the address")
     ap.add_argument("--deploy-args-file", nargs="?", required=False, help="Deploy .sol contract and return the address")
     ap.add_argument("-t", "--test_abac", nargs="?", const=True, required=False, help="Run ABAC test suite")
+    ap.add_argument("-i", "--index", nargs="?", const=True, required=False,
+                    help="Mirror the PIP/PAP state into a local SQLite index and follow the chain")
 
     # ap.add_argument("-o", "--on-behalf-of", nargs=2, metavar=('USER_PRIVATE_KEY', 'WALLET_ADDRESS'), required=False,
     #                 help="Grant on behalf of permission to a wallet address")
@@ -0,0 +1,64 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.18;
+
+import "contracts/PAP.sol";
+import "contracts/PIP.sol";
+
+/// @notice Read-only aggregator used to fetch ABAC state in a single eth_call.
+contract ABACMulticall {
+    struct Call {
+        address target;
+        bytes callData;
+    }
+
+    struct Result {
+        bool success;
+        bytes returnData;
+    }
+
+    struct AccessContext {
+        uint256 blockNumber;
+        uint256 timestamp;
+        string userRole;
+        string[] userGroups;
+        bool onBehalfOf;
+        PolicyInformationPoint.ResourceAttributes[] resources;
+        address[] resourcePolicies; // empty addresses if no PAP is given
+    }
+
+    /// @notice Runs every call as a staticcall against the same block and returns the raw results
+    function aggregate(Call[] calldata calls) public view returns (uint256 blockNumber, Result[] memory results) {
+        blockNumber = block.number;
+        results = new Result[](calls.length);
+        for (uint i = 0; i < calls.length; i++) {
+            (bool success, bytes memory returnData) = calls[i].target.staticcall(calls[i].callData);
+            results[i] = Result(success, returnData);
+        }
+    }
+
+    /// @notice Collects the user attributes, the on behalf of status and the attributes of every resource
+    function getAccessContext(
+        address pipAddress,
+        address papAddress,
+        address user,
+        address organisation,
+        string[] calldata resourceURIs) public view returns (AccessContext memory context) {
+
+        PolicyInformationPoint pip = PolicyInformationPoint(pipAddress);
+
+        context.blockNumber = block.number;
+        context.timestamp = block.timestamp;
+        context.userRole = pip.getUserRoleAttribute(user);
+        context.userGroups = pip.getUserGroups(user);
+        context.onBehalfOf = pip.organisationHasAccess(user, organisation);
+        context.resources = new PolicyInformationPoint.ResourceAttributes[](resourceURIs.length);
+        context.resourcePolicies = new address[](resourceURIs.length);
+
+        for (uint i = 0; i < resourceURIs.length; i++) {
+            context.resources[i] = pip.getResourceAttributes(resourceURIs[i]);
+            if (papAddress != address(0)) {
+                context.resourcePolicies[i] = PolicyAdministrationPoint(papAddress).getResourcePolicy(resourceURIs[i]);
+            }
+        }
+    }
+}
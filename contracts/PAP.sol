@@ -7,8 +7,15 @@ contract PolicyAdministrationPoint{
     // owner address => policy address
     mapping(address => address[]) public registeredPolicies;
 
+    // Events for every state change, used to mirror the PAP state off-chain
+    event ResourcePolicySet(string uri, address indexed policyAddress);
+    event ResourcePolicyRemoved(string uri);
+    event PolicyRegistered(address indexed owner, address indexed policyAddress);
+    event PolicyUnregistered(address indexed owner, address indexed policyAddress);
+
     function registerResource(string memory uri, address policyAddress) public{
         resourcePolicies[uri] = policyAddress;
+        emit ResourcePolicySet(uri, policyAddress);
     }
 
     function getResourcePolicy(string memory uri) public view returns (address) {
@@ -17,6 +24,7 @@ contract PolicyAdministrationPoint{
 
     function removeResourcePolicy(string memory uri) public {
         delete resourcePolicies[uri];
+        emit ResourcePolicyRemoved(uri);
     }
 
     function registerPolicy(address policyAddress) public {
@@ -26,6 +34,7 @@ contract PolicyAdministrationPoint{
             if (policies[i] == policyAddress) return; // Already registered
         }
         policies.push(policyAddress);
+        emit PolicyRegistered(msg.sender, policyAddress);
     }
 
     function getRegisteredPolicy() public view returns (address[] memory){
@@ -38,6 +47,7 @@ contract PolicyAdministrationPoint{
             if (policies[i] == policyAddress) {
                 policies[i] = policies[policies.length - 1]; // Move last to current
                 policies.pop(); // Remove last
+                emit PolicyUnregistered(msg.sender, policyAddress);
                 return;
             }
         }
@@ -22,16 +22,24 @@ contract PolicyInformationPoint {
 
     mapping (address => UserAttributes) private userAttributes;
     mapping (string => ResourceAttributes) private resourceAttributes;
-
-    // Event when access is granted
-    event AccessGranted(address organisation, uint256 expiresAt);
+    // user => keccak256(group) => position in the user groups list + 1 (0 if the user is not in the group)
+    mapping (address => mapping (bytes32 => uint256)) private groupPositions;
+
+    // Events for every state change, used to mirror the PIP state off-chain
+    event AccessGranted(address indexed user, address indexed organisation, uint256 expiresAt);
+    event AccessRevoked(address indexed user, address indexed organisation);
+    event GroupAdded(address indexed user, string group);
+    event GroupRemoved(address indexed user, string group);
+    event UserRoleSet(address indexed user, string role);
+    event ResourceAdded(string uri, address indexed owner, string contentHash, uint256 createdAt);
+    event ResourceContentHashUpdated(string uri, string contentHash, uint256 updatedAt);
 
     // Function to grant access for 24 hours from now (Executed by the User)
     function grantOnBehalfOfToken(address organisation) public {
         UserAttributes storage attrs = userAttributes[msg.sender];
         uint256 expiresAt = block.timestamp + DURATION;
         attrs.onBehalfOfToken[organisation]  = expiresAt;
-        emit AccessGranted(organisation, expiresAt);
+        emit AccessGranted(msg.sender, organisation, expiresAt);
     }
 
     // Function to check if access is still valid for the issuer
@@ -39,24 +47,50 @@ contract PolicyInformationPoint {
         return userAttributes[user].onBehalfOfToken[organisation] != 0 && block.timestamp <= userAttributes[user].onBehalfOfToken[organisation];
     }
 
+    // Expiry (block timestamp) of the access granted by a user to an organisation, 0 if never granted or revoked
+    function getOnBehalfOfExpiry(address user, address organisation) public view returns (uint256) {
+        return userAttributes[user].onBehalfOfToken[organisation];
+    }
+
     // Optional: revoke access early
     function revokeAccess(address user) public {
         delete userAttributes[user].onBehalfOfToken[msg.sender];
+        emit AccessRevoked(user, msg.sender);
     }
 
     /// @notice Adds a group to a user's attributes, creating a new entry if necessary.
     function addGroupToUser(address user, string memory group) public {
-        UserAttributes storage attrs = userAttributes[user];
+        _addGroup(user, group);
+    }
 
-        // Check if group already exists (to avoid duplicates)
-        for (uint i = 0; i < attrs.groups.length; i++) {
-            if (keccak256(bytes(attrs.groups[i])) == keccak256(bytes(group))) {
-                return; // Group already exists; do nothing
-            }
+    /// @notice Adds several groups to a user's attributes in one transaction, skipping the ones already set.
+    function addGroupsToUser(address user, string[] memory groups) public {
+        for (uint i = 0; i < groups.length; i++) {
+            _addGroup(user, groups[i]);
         }
+    }
+
+    /// @notice Adds several groups and sets the role of a user in one transaction (an empty role is left unchanged).
+    function updateUserAttributes(address user, string[] memory groups, string memory role) public {
+        for (uint i = 0; i < groups.length; i++) {
+            _addGroup(user, groups[i]);
+        }
+        if (bytes(role).length != 0) {
+            setUserRoleAttribute(user, role);
+        }
+    }
+
+    function _addGroup(address user, string memory group) private {
+        bytes32 groupHash = keccak256(bytes(group));
+
+        // Check if group already exists (to avoid duplicates)
+        if (groupPositions[user][groupHash] != 0) return;
 
         // Otherwise, add the group
+        UserAttributes storage attrs = userAttributes[user];
         attrs.groups.push(group);
+        groupPositions[user][groupHash] = attrs.groups.length;
+        emit GroupAdded(user, group);
     }
 
     // here is where we check if the organisation has access to the user attributes
@@ -67,20 +101,23 @@ contract PolicyInformationPoint {
     /// @notice Removes the group from the user groups list
     function removeGroupFromUser(address user, string memory group) public {
         UserAttributes storage attrs = userAttributes[user];
-        uint index = 0;
-        for (index; index < attrs.groups.length; index++) {
-            if (keccak256(bytes(attrs.groups[index])) == keccak256(bytes(group))) break ;// and break out of loop
-        }
-        
-        require(keccak256(bytes(attrs.groups[index])) == keccak256(bytes(group)), "Group does not exist");
-        attrs.groups[index] = attrs.groups[attrs.groups.length - 1]; // Replace with last
+        bytes32 groupHash = keccak256(bytes(group));
+        uint position = groupPositions[user][groupHash];
+        require(position != 0, "Group does not exist");
+
+        string memory last = attrs.groups[attrs.groups.length - 1];
+        attrs.groups[position - 1] = last; // Replace with last
+        groupPositions[user][keccak256(bytes(last))] = position;
         attrs.groups.pop();
+        delete groupPositions[user][groupHash];
+        emit GroupRemoved(user, group);
     }
 
     /// @notice Set the user role attribute
     function setUserRoleAttribute(address user, string memory role) public {
         UserAttributes storage attrs = userAttributes[user];
         attrs.role = role;
+        emit UserRoleSet(user, role);
     }
 
     /// @notice Get the user role attribute
@@ -96,11 +133,13 @@ contract PolicyInformationPoint {
         attr.contentHash = contentHash;
         attr.createdAt = block.timestamp;
         attr.updatedAt = block.timestamp;
+        emit ResourceAdded(uri, msg.sender, contentHash, block.timestamp);
     }
 
     function updateResourceContentHash(string memory uri, string memory contentHash) public{
         resourceAttributes[uri].contentHash = contentHash;
         resourceAttributes[uri].updatedAt = block.timestamp;
+        emit ResourceContentHashUpdated(uri, contentHash, block.timestamp);
     }
 
     function getResourceAttributes(string memory uri) public view returns (ResourceAttributes memory){
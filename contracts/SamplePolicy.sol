@@ -136,6 +136,22 @@ contract SamplePolicy is AccessControlPolicy {
         return keccak256(abi.encodePacked(resourceContentHash)) == resourceContentValidHash;
     }
 
+    /// @notice Exposes the policy parameters so the decision can be reproduced off-chain
+    function getPolicyParameters() public view returns (
+        string[] memory roles,
+        Area[] memory locations,
+        string[] memory groups,
+        bytes32[] memory ipHashes,
+        bytes32 contentValidHash,
+        uint8 shiftStart,
+        uint8 shiftEnd,
+        uint8 workingDayStart,
+        uint8 workingDayEnd
+    ) {
+        return (allowedRoles, allowedLocations, allowedGroups, allowedIPs, resourceContentValidHash,
+            userShiftStart, userShiftEnd, userWorkingDayStart, userWorkingDayEnd);
+    }
+
     function evaluateRequest(RequestContext memory context) external view returns (bool) {
         return
         isResourceValid(context.resourceContentHash) &&
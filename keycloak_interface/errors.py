@@ -26,3 +26,9 @@ class MissingScopeError(KeycloakACError):
     def __init__(self):
         self.message = "Missing scope. Please send a scope in the request header."
         self.error_code = 400
+
+
+class TokenVerificationUnavailableError(KeycloakACError):
+    def __init__(self):
+        self.message = "Unable to verify the token locally. The realm signing keys are unavailable."
+        self.error_code = 503
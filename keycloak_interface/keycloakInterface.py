@@ -1,11 +1,16 @@
 import json
 import logging
+import time
 from typing import Tuple
 
 import requests
 from requests import HTTPError
 
+from keycloak_interface.errors import KeycloakACError, TokenVerificationUnavailableError
 from keycloak_interface.utils.functions import get_or_create_keycloak_user
+from keycloak_interface.utils.cache import TokenCache
+from keycloak_interface.utils.http import get_session
+from keycloak_interface.utils.jwks import JWKSCache, LocalTokenVerifier, unverified_claims
 
 LOGGER = logging.getLogger(__name__)
 
@@ -13,7 +18,18 @@ LOGGER = logging.getLogger(__name__)
 class KeycloakInterface:
     RESOURCES_CACHE = []
 
-    def __init__(self, server_url, realm_name, client_id, client_secret_key=None):
+    IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+    RETRY_STATUS_CODES = {502, 503, 504}
+
+    # Token verification modes
+    VERIFY_INTROSPECT = "introspect"
+    VERIFY_LOCAL = "local"
+
+    def __init__(self, server_url, realm_name, client_id, client_secret_key=None,
+                 verification_mode=VERIFY_INTROSPECT, jwks_endpoint=None, audience=None, issuer=None,
+                 signing_algorithms=None, introspection_fallback=False, jwks_cache_ttl=300,
+                 token_cache_size=1024, token_cache_ttl=60, pool_size=10, connect_timeout=3.05,
+                 read_timeout=10, max_retries=2, retry_backoff=0.2, log_response_body=False):
         """Create Keycloak Instance.
 
         Args:
@@ -29,6 +45,37 @@ class KeycloakInterface:
                     - bearer-only -> Optional
                     - public -> Mandatory
                     - confidencial -> Mandatory
+            verification_mode (str, optional):
+                "introspect" (default) asks Keycloak about every token,
+                "local" verifies the token signature and claims with the realm JWKS.
+            jwks_endpoint (str, optional):
+                JWKS endpoint of the realm, derived from the server url if omitted.
+            audience (str, optional):
+                Expected token audience (`aud` or `azp`) in local mode.
+            issuer (str, optional):
+                Expected token issuer in local mode.
+            signing_algorithms (list, optional):
+                Accepted signing algorithms in local mode (default RS256).
+            introspection_fallback (bool, optional):
+                In local mode, use introspection when the signing keys are unavailable.
+            jwks_cache_ttl (int, optional):
+                Seconds before the cached JWKS is downloaded again.
+            token_cache_size (int, optional):
+                Maximum number of cached introspect/userinfo responses (0 disables the cache).
+            token_cache_ttl (int, optional):
+                Maximum seconds a cached response is reused, bounded by the token `exp`.
+            pool_size (int, optional):
+                Keep-alive connections pooled for the Keycloak server (shared process-wide).
+            connect_timeout (float, optional):
+                Seconds to wait for a connection to Keycloak.
+            read_timeout (float, optional):
+                Seconds to wait for a Keycloak response.
+            max_retries (int, optional):
+                Retries of idempotent calls on connection errors, timeouts and 502/503/504.
+            retry_backoff (float, optional):
+                Base of the exponential backoff between retries, in seconds.
+            log_response_body (bool, optional):
+                Log every response body at DEBUG level (off on the hot path by default).
 
         Returns:
             object: Keycloak object
@@ -38,6 +85,11 @@ class KeycloakInterface:
         self.realm_name = realm_name
         self.client_id = client_id
         self.client_secret_key = client_secret_key
+        self.session = get_session(server_url, pool_size)
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.log_response_body = log_response_body
 
         # Keycloak useful Urls
         self.well_known_endpoint = (
@@ -64,21 +116,100 @@ class KeycloakInterface:
                 + self.realm_name
                 + "/protocol/openid-connect/userinfo"
         )
+        self.jwks_endpoint = jwks_endpoint or (
+                self.server_url
+                + "/realms/"
+                + self.realm_name
+                + "/protocol/openid-connect/certs"
+        )
+
+        self.verification_mode = verification_mode
+        self.introspection_fallback = introspection_fallback
+        self.token_verifier = None
+        if self.verification_mode == self.VERIFY_LOCAL:
+            jwks_cache = JWKSCache(lambda: self._send_request("GET", self.jwks_endpoint)[0], ttl=jwks_cache_ttl)
+            self.token_verifier = LocalTokenVerifier(jwks_cache, signing_algorithms, audience, issuer)
+
+        self.introspection_cache = TokenCache(token_cache_size, token_cache_ttl)
+        self.userinfo_cache = TokenCache(token_cache_size, token_cache_ttl)
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Create a KeycloakInterface from the KEYCLOAK_CONFIG settings dict.
+        :param config: dict - the KEYCLOAK_CONFIG settings
+        :return: KeycloakInterface instance
+        """
+        return cls(
+            server_url=config.get('KEYCLOAK_SERVER_URL'),
+            realm_name=config.get('KEYCLOAK_REALM'),
+            client_id=config.get('KEYCLOAK_CLIENT_ID'),
+            client_secret_key=config.get('KEYCLOAK_CLIENT_SECRET_KEY'),
+            verification_mode=config.get('KEYCLOAK_TOKEN_VERIFICATION', cls.VERIFY_INTROSPECT),
+            jwks_endpoint=config.get('KEYCLOAK_JWKS_ENDPOINT'),
+            audience=config.get('KEYCLOAK_TOKEN_AUDIENCE'),
+            issuer=config.get('KEYCLOAK_TOKEN_ISSUER'),
+            signing_algorithms=config.get('KEYCLOAK_TOKEN_ALGORITHMS'),
+            introspection_fallback=config.get('KEYCLOAK_INTROSPECTION_FALLBACK', False),
+            jwks_cache_ttl=config.get('KEYCLOAK_JWKS_CACHE_TTL', 300),
+            token_cache_size=config.get('KEYCLOAK_TOKEN_CACHE_SIZE', 1024),
+            token_cache_ttl=config.get('KEYCLOAK_TOKEN_CACHE_TTL', 60),
+            pool_size=config.get('KEYCLOAK_HTTP_POOL_SIZE', 10),
+            connect_timeout=config.get('KEYCLOAK_HTTP_CONNECT_TIMEOUT', 3.05),
+            read_timeout=config.get('KEYCLOAK_HTTP_READ_TIMEOUT', 10),
+            max_retries=config.get('KEYCLOAK_HTTP_MAX_RETRIES', 2),
+            retry_backoff=config.get('KEYCLOAK_HTTP_RETRY_BACKOFF', 0.2),
+            log_response_body=config.get('KEYCLOAK_LOG_RESPONSE_BODY', False),
+        )
+
+    def cache_stats(self) -> dict:
+        """
+        Get the hit/miss counters of the token caches.
+
+        Returns:
+            dict: counters for the introspect and userinfo caches.
+        """
+        return {
+            "introspect": self.introspection_cache.stats(),
+            "userinfo": self.userinfo_cache.stats(),
+        }
 
-    @staticmethod
-    def _send_request(method, url, **kwargs) -> Tuple[dict, int]:
-        """Send request by method and url.
+    def _send_request(self, method, url, idempotent=None, **kwargs) -> Tuple[dict, int]:
+        """Send request by method and url through the pooled session.
+         Idempotent calls are retried with exponential backoff on connection errors,
+         timeouts and 502/503/504 responses.
          Raises HTTPError exceptions if status >= 400
 
+         Args:
+             idempotent (bool, optional): Allow retries, defaults to True for GET/HEAD/OPTIONS.
+
          Returns:
              json: Response body
          """
-        response = requests.request(method, url, **kwargs)
-
-        # logging the response for debugging purposes
-        logging.error(f"Response Status Code: {response.status_code}")
-        logging.error(f"Response Body: {response.text}")
+        if idempotent is None:
+            idempotent = method.upper() in self.IDEMPOTENT_METHODS
+        attempts = 1 + (self.max_retries if idempotent else 0)
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in range(attempts):
+            if attempt:
+                time.sleep(self.retry_backoff * (2 ** (attempt - 1)))
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as ex:
+                LOGGER.warning(f"{method} {url} failed (attempt {attempt + 1}/{attempts}): {ex}")
+                if attempt + 1 == attempts:
+                    raise
+                continue
+            if response.status_code not in self.RETRY_STATUS_CODES or attempt + 1 == attempts:
+                break
+            LOGGER.warning(f"{method} {url} returned {response.status_code} (attempt {attempt + 1}/{attempts})")
+
+        if self.log_response_body:
+            LOGGER.debug(f"Response Status Code: {response.status_code}")
+            LOGGER.debug(f"Response Body: {response.text}")
         if response.status_code >= 400:
+            LOGGER.error(f"{method} {url} returned {response.status_code}")
             try:
                 error_response = response.json()
             except json.JSONDecodeError:
@@ -107,8 +238,6 @@ class KeycloakInterface:
             "password": password,
         }
 
-        logging.error(f"{payload}")
-
         headers = {"content-type": "application/x-www-form-urlencoded"}
 
         return self._send_request('POST', self.token_endpoint, data=payload, headers=headers)
@@ -177,6 +306,10 @@ class KeycloakInterface:
         Returns:
             json: The introspect token
         """
+        cached = self.introspection_cache.get(token)
+        if cached is not None:
+            return cached
+
         payload = {
             "token": token,
             "client_id": self.client_id,
@@ -188,7 +321,7 @@ class KeycloakInterface:
         }
         try:
             response, status_code = self._send_request(
-                "POST", self.token_introspection_endpoint, data=payload, headers=headers)
+                "POST", self.token_introspection_endpoint, idempotent=True, data=payload, headers=headers)
         except HTTPError as ex:
             LOGGER.error(
                 "Error obtaining introspect token from endpoint: "
@@ -198,8 +331,39 @@ class KeycloakInterface:
             if raise_exception:
                 raise
             return {}
+        # only active tokens are cached, so revoked or unknown tokens are always re-checked
+        if response.get("active", False):
+            self.introspection_cache.set(token, response, response.get("exp"))
         return response
 
+    def decode_token(self, token, raise_exception=True) -> dict:
+        """
+        Resolve the claims of a token using the configured verification mode.
+        In local mode the token is verified with the cached realm keys, and introspection is
+        only used when the keys are unavailable and `introspection_fallback` is enabled.
+
+        Args:
+            token (str): The string value of the token.
+            raise_exception: Raise exception if the request ended with a status >= 400.
+
+        Returns:
+            dict: Introspection-like claims, with "active" set to False for rejected tokens.
+        """
+        if self.token_verifier is None:
+            return self.introspect(token, raise_exception=raise_exception)
+
+        try:
+            claims = self.token_verifier.verify(token)
+        except TokenVerificationUnavailableError:
+            if self.introspection_fallback:
+                return self.introspect(token, raise_exception=raise_exception)
+            LOGGER.error("Local token verification unavailable and introspection fallback is disabled")
+            return {"active": False}
+        except KeycloakACError:
+            return {"active": False}
+        claims["active"] = True
+        return claims
+
     def is_token_active(self, token, raise_exception=True):
         """Verify if introspect token is active.
 
@@ -229,7 +393,7 @@ class KeycloakInterface:
         Returns:
             bool: True if the token is valid and belongs to the specified group, False otherwise.
         """
-        introspect_token = self.introspect(token, raise_exception)
+        introspect_token = self.decode_token(token, raise_exception)
         if not introspect_token.get("active", False):
             return False
 
@@ -250,7 +414,7 @@ class KeycloakInterface:
         Returns:
             list: List of roles.
         """
-        token_decoded = self.introspect(token, raise_exception)
+        token_decoded = self.decode_token(token, raise_exception)
 
         realm_access = token_decoded.get("realm_access", None)
         resource_access = token_decoded.get("resource_access", None)
@@ -283,6 +447,10 @@ class KeycloakInterface:
         Returns:
             json: user info data
         """
+        cached = self.userinfo_cache.get(token)
+        if cached is not None:
+            return cached
+
         headers = {"authorization": "Bearer " + token}
         try:
             response, status_code = self._send_request(
@@ -296,6 +464,10 @@ class KeycloakInterface:
             if raise_exception:
                 raise
             return {}
+        try:
+            self.userinfo_cache.set(token, (response, status_code), unverified_claims(token).get("exp"))
+        except KeycloakACError:
+            pass  # opaque token without a readable expiry, do not cache
         return response, status_code
 
     def create_user(self, username: str, password: str, email: str, name: str):
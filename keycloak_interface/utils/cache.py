@@ -0,0 +1,94 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    """
+    Thread-safe, size-bounded LRU cache for responses derived from a bearer token.
+
+    Entries are keyed by the SHA-256 of the token so raw tokens are never kept in memory,
+    and expire after `ttl` seconds or at the token `exp`, whichever comes first.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: int = 60):
+        """
+        :param max_size: maximum number of entries before the least recently used is evicted
+        :param ttl: maximum seconds an entry is served from the cache
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str):
+        """
+        Get the cached value for a token.
+        :param token: the bearer token
+        :return: the cached value or None if missing or expired
+        """
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, token: str, value, expires_at: float = None):
+        """
+        Cache a value for a token.
+        :param token: the bearer token
+        :param value: the value to cache
+        :param expires_at: token expiry (epoch seconds), used as an upper bound for the TTL
+        """
+        deadline = time.time() + self.ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        if deadline <= time.time() or self.max_size <= 0:
+            return
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (deadline, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token: str):
+        """
+        Remove the cached value for a token.
+        :param token: the bearer token
+        """
+        with self._lock:
+            self._entries.pop(self._key(token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Get the cache counters.
+        :return: dict with size, hits, misses and hit ratio
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,217 @@
+import logging
+import threading
+import time
+from typing import Callable, List
+
+from api import settings
+from keycloak_interface.utils.handlers import get_admin_connection
+
+LOGGER = logging.getLogger(__name__)
+
+
+def paginate(items: List, page: int = None, size: int = None) -> List:
+    """
+    Slice a list into a page. Pages start at 1; no paging is applied if size is None.
+    :param items: list to slice
+    :param page: page number
+    :param size: number of items per page
+    :return: the requested page
+    """
+    if not size:
+        return items
+    first = (max(page or 1, 1) - 1) * size
+    return items[first:first + size]
+
+
+class OrgCatalog:
+    """
+    In-memory catalog of the ExtremeXP realm roles and groups.
+
+    Roles are indexed by name and groups by path (subgroups of different parents can share a
+    name) so listing and searching do not hit Keycloak. Entries created through the catalog are added immediately, and a daemon thread
+    reloads everything every `refresh_interval` seconds to pick up changes made outside the app.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, get_connection: Callable, refresh_interval: int = 300):
+        """
+        :param get_connection: callable returning a connected KeycloakHandler
+        :param refresh_interval: seconds between two background reloads (0 disables them)
+        """
+        self.get_connection = get_connection
+        self.refresh_interval = refresh_interval
+        self.loaded_at = None
+        self._roles = {}
+        self._groups = []
+        self._groups_by_path = {}
+        self._lock = threading.RLock()
+        self._refresher = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def shared(cls):
+        """
+        Get the catalog shared by the whole process.
+        :return: OrgCatalog
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls(get_admin_connection,
+                                      settings.KEYCLOAK_CONFIG.get("KEYCLOAK_CATALOG_REFRESH_INTERVAL", 300))
+        return cls._shared
+
+    def refresh(self):
+        """
+        Reload every ExtremeXP role and the full group tree from Keycloak.
+        """
+        connection = self.get_connection()
+        roles = connection.get_realm_roles()
+        groups = connection.get_realm_groups()
+        with self._lock:
+            self._roles = dict(roles)
+            self._groups = list(groups)
+            self._groups_by_path = {}
+            self._index_groups(self._groups)
+            self.loaded_at = time.time()
+
+    def _index_groups(self, groups: List, parent_path: str = ''):
+        for group in groups:
+            path = group.get('path') or f"{parent_path}/{group['name']}"
+            self._groups_by_path[path] = group
+            self._index_groups(group.get('subGroups', []), path)
+
+    def _ensure_loaded(self):
+        if self.loaded_at is None:
+            with self._lock:
+                if self.loaded_at is None:
+                    self.refresh()
+        self._start_refresher()
+
+    def _start_refresher(self):
+        if self.refresh_interval <= 0 or self._refresher is not None:
+            return
+        with self._lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_loop, name="keycloak-org-catalog",
+                                                   daemon=True)
+                self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                LOGGER.error(f"Error refreshing the Keycloak organisation catalog: {str(e)}")
+
+    def stop(self):
+        """
+        Stop the background refresh thread.
+        """
+        self._stop.set()
+
+    def invalidate(self):
+        """
+        Drop the cached catalog, forcing a reload on the next access.
+        """
+        with self._lock:
+            self.loaded_at = None
+
+    def get_roles(self) -> dict:
+        """
+        Get the ExtremeXP realm roles indexed by name (same shape as KeycloakHandler.get_realm_roles).
+        :return: dict role name -> role representation
+        """
+        self._ensure_loaded()
+        with self._lock:
+            return dict(self._roles)
+
+    def search_roles(self, search: str = None) -> List:
+        """
+        List the ExtremeXP realm roles, optionally filtered by a case-insensitive name substring.
+        :param search: name substring to match
+        :return: list of roles sorted by name
+        """
+        self._ensure_loaded()
+        with self._lock:
+            if search:
+                search = search.lower()
+                roles = [role for name, role in self._roles.items() if search in name.lower()]
+            else:
+                roles = list(self._roles.values())
+        return sorted(roles, key=lambda role: role['name'].lower())
+
+    def get_groups(self) -> List:
+        """
+        Get the realm group tree (same shape as KeycloakHandler.get_realm_groups).
+        :return: list of top-level groups
+        """
+        self._ensure_loaded()
+        with self._lock:
+            return list(self._groups)
+
+    def search_groups(self, search: str = None) -> List:
+        """
+        Search groups at any depth of the tree by a case-insensitive name substring.
+        Without a search term the top-level groups are returned.
+        :param search: name substring to match
+        :return: list of groups sorted by name, then path
+        """
+        if not search:
+            return self.get_groups()
+        self._ensure_loaded()
+        search = search.lower()
+        with self._lock:
+            groups = [(path, group) for path, group in self._groups_by_path.items()
+                      if search in group['name'].lower()]
+        return [group for path, group in sorted(groups, key=lambda item: (item[1]['name'].lower(), item[0]))]
+
+    def get_group(self, path: str) -> dict | None:
+        """
+        Get a group by path (e.g. /orgA/members).
+        :param path: the group path
+        :return: group representation or None if it does not exist
+        """
+        self._ensure_loaded()
+        with self._lock:
+            return self._groups_by_path.get(path)
+
+    def create_role(self, name: str) -> str | None:
+        """
+        Create an ExtremeXP role in Keycloak and add it to the catalog.
+        :param name: the name of the role to create
+        :return: keycloak role id or None if the role already exists
+        """
+        connection = self.get_connection()
+        role_id = connection.create_realm_role(name)
+        try:
+            role = connection.get_realm_role(name)
+        except Exception as e:
+            LOGGER.warning(f"Error loading created role {name}, invalidating the catalog: {str(e)}")
+            self.invalidate()
+            return role_id
+        with self._lock:
+            self._roles[name] = role
+        return role_id
+
+    def create_group(self, name: str) -> str | None:
+        """
+        Create a top-level group in Keycloak and add it to the catalog.
+        :param name: the name of the group to create
+        :return: keycloak group id or None if the group already exists
+        """
+        group_id = self.get_connection().create_group(name)
+        if group_id is None:
+            return None
+        group = {
+            "id": group_id,
+            "name": name,
+            "path": f"/{name}",
+            "subGroups": []
+        }
+        with self._lock:
+            self._groups.append(group)
+            self._groups_by_path[group["path"]] = group
+        return group_id
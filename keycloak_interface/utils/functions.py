@@ -1,7 +1,8 @@
 from flask import Request
 
 from keycloak_interface.errors import MissingTokenError
-from keycloak_interface.utils.handlers import KeyCloakRootConnection
+from keycloak_interface.utils.catalog import OrgCatalog
+from keycloak_interface.utils.handlers import get_admin_connection
 
 
 def extract_header_token(request: Request) -> str:
@@ -17,37 +18,37 @@ Validate the request token against Keycloak.
 
 
 def get_keycloak_user(username):
-    return KeyCloakRootConnection().get_keycloak_user_id(username)
+    return get_admin_connection().get_keycloak_user_id(username)
 
 
 def get_keycloak_user_by_email(email):
-    return KeyCloakRootConnection().get_keycloak_user_by_email(email)
+    return get_admin_connection().get_keycloak_user_by_email(email)
 
 
 def get_keycloak_user_roles(user_id):
-    roles = [role['name'] for role in KeyCloakRootConnection().get_user_role(user_id)]
+    roles = [role['name'] for role in get_admin_connection().get_user_role(user_id)]
     return roles
 
 
-def get_keycloak_organisation_roles():
-    return KeyCloakRootConnection().get_realm_roles()
+def get_keycloak_organisation_roles(search=None):
+    return OrgCatalog.shared().search_roles(search)
 
 
 def create_keycloak_organisation_role(name) -> str | None:
-    return KeyCloakRootConnection().create_realm_role(name)
+    return OrgCatalog.shared().create_role(name)
 
 
-def get_keycloak_organization_groups():
-    return KeyCloakRootConnection().get_realm_groups()
+def get_keycloak_organization_groups(search=None):
+    return OrgCatalog.shared().search_groups(search)
 
 
 def create_keycloak_organisation_group(name) -> str | None:
-    return KeyCloakRootConnection().create_group(name)
+    return OrgCatalog.shared().create_group(name)
 
 
 def get_or_create_keycloak_user(username, email, name, password, role):
     keycloak_user_id = get_keycloak_user(username)
-    keycloak_root_connection = KeyCloakRootConnection()
+    keycloak_root_connection = get_admin_connection()
     created = False
     if keycloak_user_id is None:
         created = True
@@ -1,3 +1,6 @@
+import logging
+import threading
+from datetime import datetime, timedelta
 from typing import List
 
 from keycloak import KeycloakAdmin
@@ -5,6 +8,8 @@ from keycloak import KeycloakOpenIDConnection
 
 from api import settings
 
+LOGGER = logging.getLogger(__name__)
+
 
 class KeycloakHandler:
     def __init__(self, environ):
@@ -171,3 +176,97 @@ class KeyCloakRootConnection(KeycloakHandler):
     def __init__(self):
         super().__init__(settings)
         super().connect(settings.KEYCLOAK_ADMIN_USERNAME, settings.KEYCLOAK_ADMIN_PASSWORD)
+
+
+class KeycloakAdminSession:
+    """
+    Process-wide admin connection to Keycloak.
+    Logs in to the master realm once and refreshes the admin token before it expires,
+    so request threads can share one KeycloakHandler instead of logging in on every call.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, environ, refresh_margin: int = 30):
+        """
+        :param environ: settings module holding the Keycloak admin credentials
+        :param refresh_margin: seconds before the token expiry at which it is refreshed
+        """
+        self.environ = environ
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self.handler = None
+        self.logins = 0
+        self.refreshes = 0
+        self.acquisitions = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """
+        Get the admin session shared by the whole process.
+        :return: KeycloakAdminSession
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls(settings, settings.KEYCLOAK_CONFIG.get("KEYCLOAK_ADMIN_REFRESH_MARGIN", 30))
+        return cls._shared
+
+    def get(self) -> KeycloakHandler:
+        """
+        Get the connected admin handler, logging in or refreshing the token if required.
+        :return: KeycloakHandler
+        """
+        with self._lock:
+            self.acquisitions += 1
+            if self.handler is None:
+                self._login()
+            elif self._expires_soon():
+                self._refresh()
+            return self.handler
+
+    def _login(self):
+        self.handler = KeycloakHandler(self.environ).connect(
+            self.environ.KEYCLOAK_ADMIN_USERNAME, self.environ.KEYCLOAK_ADMIN_PASSWORD)
+        self.logins += 1
+
+    def _expires_soon(self) -> bool:
+        expires_at = getattr(self.handler.connection, "expires_at", None)
+        return expires_at is None or datetime.now() >= expires_at - self.refresh_margin
+
+    def _refresh(self):
+        try:
+            self.handler.connection.refresh_token()
+            self.refreshes += 1
+        except Exception as e:
+            LOGGER.warning(f"Error refreshing Keycloak admin token, logging in again: {str(e)}")
+            self._login()
+
+    def invalidate(self):
+        """
+        Drop the current admin connection, forcing a new login on the next call.
+        """
+        with self._lock:
+            self.handler = None
+
+    def stats(self) -> dict:
+        """
+        Get the session counters.
+        :return: dict with logins, refreshes, acquisitions and logins saved
+        """
+        with self._lock:
+            return {
+                "logins": self.logins,
+                "refreshes": self.refreshes,
+                "acquisitions": self.acquisitions,
+                "logins_saved": self.acquisitions - self.logins,
+            }
+
+
+def get_admin_connection() -> KeycloakHandler:
+    """
+    Get the shared, logged-in Keycloak admin handler.
+    :return: KeycloakHandler
+    """
+    return KeycloakAdminSession.shared().get()
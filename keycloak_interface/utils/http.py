@@ -0,0 +1,34 @@
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def get_session(server_url: str, pool_size: int = 10) -> requests.Session:
+    """
+    Get the process-wide keep-alive session for a Keycloak server.
+    Sessions are shared by every KeycloakInterface pointing to the same scheme://host:port,
+    so TCP/TLS connections are reused across request threads.
+    :param server_url: the Keycloak server url
+    :param pool_size: maximum number of pooled connections kept open to the server
+    :return: requests.Session
+    """
+    parts = urlsplit(server_url)
+    key = (parts.scheme, parts.netloc)
+    session = _SESSIONS.get(key)
+    if session is not None:
+        return session
+
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(key)
+        if session is None:
+            session = requests.Session()
+            # retries are handled by the caller, which knows which calls are idempotent
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+            session.mount(f"{parts.scheme}://", adapter)
+            _SESSIONS[key] = session
+        return session
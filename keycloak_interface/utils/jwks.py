@@ -0,0 +1,154 @@
+import base64
+import json
+import logging
+import threading
+import time
+from typing import Callable
+
+from jwcrypto import jwk, jwt
+from jwcrypto.common import JWException
+
+from keycloak_interface.errors import InvalidTokenError, TokenVerificationUnavailableError
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _decode_segment(segment: str) -> dict:
+    padded = segment + "=" * (-len(segment) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+
+
+def unverified_header(token: str) -> dict:
+    """
+    Decode the JOSE header of a compact JWT without checking its signature.
+    :param token: the encoded JWT
+    :return: header dict (raises InvalidTokenError if the token is malformed)
+    """
+    try:
+        return _decode_segment(token.split(".")[0])
+    except (ValueError, IndexError):
+        raise InvalidTokenError()
+
+
+def unverified_claims(token: str) -> dict:
+    """
+    Decode the payload of a compact JWT without checking its signature.
+    Only use the result for non-security decisions (e.g. cache bounds).
+    :param token: the encoded JWT
+    :return: claims dict (raises InvalidTokenError if the token is malformed)
+    """
+    try:
+        return _decode_segment(token.split(".")[1])
+    except (ValueError, IndexError):
+        raise InvalidTokenError()
+
+
+class JWKSCache:
+    """
+    Thread-safe cache of the realm signing keys published on the JWKS endpoint.
+
+    The key set is refreshed when it is older than `ttl` seconds, and on demand when a
+    token references an unknown `kid` (key rotation). On-demand refreshes are rate limited
+    by `min_refresh_interval` so forged `kid` values cannot be used to hammer Keycloak.
+    """
+
+    def __init__(self, fetch_keys: Callable[[], dict], ttl: int = 300, min_refresh_interval: int = 10):
+        """
+        :param fetch_keys: callable returning the JWKS document as a dict
+        :param ttl: seconds a fetched key set is considered fresh
+        :param min_refresh_interval: minimum seconds between two forced refreshes
+        """
+        self.fetch_keys = fetch_keys
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._key_set = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False) -> jwk.JWKSet:
+        """
+        Download the key set if it is stale (or `force` is set and the rate limit allows it).
+        If the download fails and a previous key set exists, the previous one is kept.
+        :return: the current key set
+        """
+        with self._lock:
+            age = time.monotonic() - self._fetched_at
+            must_refresh = self._key_set is None or age > self.ttl or (force and age > self.min_refresh_interval)
+            if not must_refresh:
+                return self._key_set
+            try:
+                key_set = jwk.JWKSet()
+                key_set.import_keyset(json.dumps(self.fetch_keys()))
+                self._key_set = key_set
+                self._fetched_at = time.monotonic()
+            except Exception as e:
+                LOGGER.error(f"Error refreshing JWKS: {e}")
+                if self._key_set is None:
+                    raise TokenVerificationUnavailableError()
+            return self._key_set
+
+    def get_key(self, kid: str) -> jwk.JWK:
+        """
+        Get the signing key for a `kid`, refreshing the key set once if it is unknown.
+        :param kid: key id from the token header
+        :return: the matching JWK (raises TokenVerificationUnavailableError if not found)
+        """
+        key = self.refresh().get_key(kid)
+        if key is None:
+            key = self.refresh(force=True).get_key(kid)
+        if key is None:
+            raise TokenVerificationUnavailableError()
+        return key
+
+
+class LocalTokenVerifier:
+    """
+    Verifies Keycloak access tokens offline using the cached realm keys.
+    """
+
+    def __init__(self, jwks_cache: JWKSCache, algorithms=None, audience=None, issuer=None, leeway: int = 0):
+        """
+        :param jwks_cache: JWKSCache instance used to resolve signing keys
+        :param algorithms: accepted signing algorithms (default RS256)
+        :param audience: expected `aud` (or `azp`) value, skipped if None
+        :param issuer: expected `iss` value, skipped if None
+        :param leeway: clock skew tolerance in seconds for `exp`/`nbf`
+        """
+        self.jwks_cache = jwks_cache
+        self.algorithms = algorithms or ["RS256"]
+        self.audience = audience
+        self.issuer = issuer
+        self.leeway = leeway
+
+    def verify(self, token: str) -> dict:
+        """
+        Check signature, expiry, not-before, issuer and audience of a token.
+        :param token: the encoded JWT
+        :return: the token claims
+        :raises InvalidTokenError: if the token is malformed, forged, expired or not for us
+        :raises TokenVerificationUnavailableError: if the signing key cannot be resolved
+        """
+        header = unverified_header(token)
+        if header.get("alg") not in self.algorithms:
+            raise InvalidTokenError()
+
+        key = self.jwks_cache.get_key(header.get("kid"))
+        try:
+            claims = json.loads(jwt.JWT(jwt=token, key=key, algs=self.algorithms, check_claims=False).claims)
+        except (JWException, ValueError):
+            raise InvalidTokenError()
+
+        now = time.time()
+        if "exp" not in claims or now > claims["exp"] + self.leeway:
+            raise InvalidTokenError()
+        if "nbf" in claims and now < claims["nbf"] - self.leeway:
+            raise InvalidTokenError()
+        if self.issuer and claims.get("iss") != self.issuer:
+            raise InvalidTokenError()
+        if self.audience:
+            audience = claims.get("aud", [])
+            if isinstance(audience, str):
+                audience = [audience]
+            if self.audience not in audience and claims.get("azp") != self.audience:
+                raise InvalidTokenError()
+        return claims
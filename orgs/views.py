@@ -1,25 +1,39 @@
 from flask import request
 from flask_restx import Namespace, Resource
 
-from api import settings
+from api.services import get_keycloak_interface
 from keycloak_interface.errors import MissingTokenError, KeycloakACError
-from keycloak_interface.keycloakInterface import KeycloakInterface
+from keycloak_interface.utils.catalog import paginate
 from keycloak_interface.utils.functions import get_keycloak_organization_groups, create_keycloak_organisation_group, \
     get_keycloak_organisation_roles, create_keycloak_organisation_role, extract_header_token
 
 api: Namespace = Namespace('Orgs', description='ExtremeXP Organisations Endpoints')
 
-keycloak_interface = KeycloakInterface(
-    server_url=settings.KEYCLOAK_CONFIG.get('KEYCLOAK_SERVER_URL'),
-    realm_name=settings.KEYCLOAK_CONFIG.get('KEYCLOAK_REALM'),
-    client_id=settings.KEYCLOAK_CONFIG.get('KEYCLOAK_CLIENT_ID'),
-    client_secret_key=settings.KEYCLOAK_CONFIG.get('KEYCLOAK_CLIENT_SECRET_KEY')
-)
+
+def paged_response(key: str, items: list) -> dict:
+    """
+    Build a paged listing from the page/size query parameters (no paging if size is missing).
+    :param key: response key holding the page items
+    :param items: full list of items
+    :return: response dict with count, next, previous and the page items
+    """
+    page = request.args.get('page', 1, type=int)
+    size = request.args.get('size', None, type=int)
+    params = {key: value for key, value in request.args.items() if key not in ('page', 'size')}
+    current_url = request.base_url + '?' + '&'.join([f"{key}={value}" for key, value in params.items()])
+
+    return {
+        "count": len(items),
+        "next": current_url + f'&page={page + 1}&size={size}' if size and (page * size) < len(items) else None,
+        "previous": current_url + f'&page={page - 1}&size={size}' if size and page > 1 else None,
+        key: paginate(items, page, size),
+    }
 
 
 @api.route("/groups")
 class OrgGroupsView(Resource):
-    @api.doc('list_orgs_groups')
+    @api.doc('list_orgs_groups', params={'search': 'Group name (or part of it) to search for',
+                                         'page': 'Page number to retrieve', 'size': 'Number of groups per page'})
     def get(self):
         try:
             token = request.headers.get('Authorization')
@@ -27,12 +41,8 @@ class OrgGroupsView(Resource):
                 raise MissingTokenError()
             else:
                 token = token.split(' ')[1]
-            org_groups = get_keycloak_organization_groups()
-            response = {
-                'orgs_groups': org_groups
-            }
-
-            return response, 200
+            org_groups = get_keycloak_organization_groups(request.args.get('search'))
+            return paged_response('orgs_groups', org_groups), 200
         except MissingTokenError as e:
             return {'error': e.message}, 401
         except KeycloakACError as e:
@@ -74,7 +84,8 @@ class OrgGroupsView(Resource):
 
 @api.route("/roles")
 class OrgGroupsView(Resource):
-    @api.doc('list_orgs_roles')
+    @api.doc('list_orgs_roles', params={'search': 'Role name (or part of it) to search for',
+                                        'page': 'Page number to retrieve', 'size': 'Number of roles per page'})
     def get(self):
         try:
             token = request.headers.get('Authorization')
@@ -82,10 +93,12 @@ class OrgGroupsView(Resource):
                 raise MissingTokenError()
             else:
                 token = token.split(' ')[1]
-            roles = get_keycloak_organisation_roles()
-            if not roles:
+            search = request.args.get('search')
+            roles = get_keycloak_organisation_roles(search)
+            if not roles and not search:
+                # the realm has no ExtremeXP role, a search or page without results is an empty page
                 return {'message': 'No roles found'}, 404
-            return {"roles": list(roles.values())}, 200
+            return paged_response('roles', roles), 200
         except MissingTokenError as e:
             return {'error': e.message}, 401
         except KeycloakACError as e:
@@ -94,7 +107,7 @@ class OrgGroupsView(Resource):
     @api.doc('create_orgs_groups')
     def post(self):
         try:
-            if not keycloak_interface.validate_request_token(extract_header_token(request)):
+            if not get_keycloak_interface().validate_request_token(extract_header_token(request)):
                 return {'error': 'Invalid or missing token'}, 401
 
             payload = request.json
@@ -0,0 +1,181 @@
+"""
+Microbenchmark of the compiled policies (parser/compiler.py) against the interpreter (parser/parser.py).
+
+Run from the repository root:
+    python -m parser.benchmark [iterations]
+    python -m parser.benchmark load [policies]   # ET.parse against the streaming loader on a generated PolicySet
+    python -m parser.benchmark index [policies]  # scan against the target index, from 10 policies up to [policies]
+"""
+import glob
+import os
+import re
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from parser.compiler import STRING_EQUAL, XACML_STRING, compile_policy
+from parser.index import PolicyIndex
+from parser.loader import LoadedPolicy, iter_policies
+from parser.parser import evaluate_policy, process_policy, strip_namespace
+
+EXAMPLES = './parser/examples/*.xacml'
+
+# requests matching none, some and most of the example rules
+ATTRIBUTE_SETS = [
+    {},
+    {'location-mobile': 'true'},
+    {
+        'device-type': 'Mobile',
+        'xxp:ebbb1098-154b-18df-07b9-5886ef272e62': '10.0.4.2',
+        'xxp:3a3c76c7-9300-078f-6ebb-4767b7352561': 'www.example.GR',
+    },
+    {
+        'pcm:b7674280-8c34-0e9f-a247-ed92ec522b52': 'Activeeon',
+        'pcm:e148f112-6aab-479e-7f34-625031ee263a': 'Monday',
+        'pcm:ed7267e8-3aa5-3479-8e15-3b2758290ed4': 'Friday',
+    },
+]
+
+
+def load_policies(pattern: str = EXAMPLES) -> list:
+    return [process_policy(ET.parse(path).getroot()) for path in sorted(glob.glob(pattern))]
+
+
+def check(policies: list, compiled_policies: list):
+    for policy, compiled_policy in zip(policies, compiled_policies):
+        for attributes in ATTRIBUTE_SETS:
+            expected = evaluate_policy(policy, attributes)
+            decision = compiled_policy.evaluate(attributes).decision
+            if decision != expected:
+                raise AssertionError(f"Policy {policy['PolicyId']} with {attributes}: "
+                                     f"compiled {decision}, interpreted {expected}")
+
+
+def run(iterations: int = 20000):
+    policies = load_policies()
+    compile_time = timeit.timeit(lambda: [compile_policy(policy) for policy in policies], number=100) / 100
+    compiled_policies = [compile_policy(policy) for policy in policies]
+    check(policies, compiled_policies)
+
+    def interpret():
+        for policy in policies:
+            for attributes in ATTRIBUTE_SETS:
+                evaluate_policy(policy, attributes)
+
+    def evaluate_compiled():
+        for compiled_policy in compiled_policies:
+            for attributes in ATTRIBUTE_SETS:
+                compiled_policy.evaluate(attributes)
+
+    evaluations = iterations * len(policies) * len(ATTRIBUTE_SETS)
+    interpreted = timeit.timeit(interpret, number=iterations)
+    compiled = timeit.timeit(evaluate_compiled, number=iterations)
+
+    print(f"{len(policies)} policies x {len(ATTRIBUTE_SETS)} attribute sets x {iterations} iterations")
+    print(f"compile:     {compile_time * 1e6:10.1f} us for all the policies")
+    print(f"interpreted: {interpreted / evaluations * 1e6:10.3f} us per evaluation")
+    print(f"compiled:    {compiled / evaluations * 1e6:10.3f} us per evaluation ({interpreted / compiled:.1f}x)")
+
+
+def write_policy_set(path: str, count: int, pattern: str = EXAMPLES):
+    """
+    Write a PolicySet of `count` policies, copies of the examples with unique ids.
+    """
+    templates = []
+    for example in sorted(glob.glob(pattern)):
+        with open(example) as file:
+            templates.append(re.sub(r'<\?xml[^>]*\?>', '', file.read()).strip())
+
+    with open(path, 'w') as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   '<PolicySet xmlns="urn:oasis:names:tc:xacml:3.0:core:schema:wd-17" PolicySetId="benchmark" '
+                   'PolicyCombiningAlgId="urn:oasis:names:tc:xacml:3.0:policy-combining-algorithm:deny-overrides" '
+                   'Version="1.0">\n<Target/>\n')
+        for index in range(count):
+            template = templates[index % len(templates)]
+            file.write(re.sub(r'PolicyId="([^"]*)"', rf'PolicyId="\1-{index}"', template, count=1))
+            file.write('\n')
+        file.write('</PolicySet>\n')
+
+
+def _parse_whole_document(path: str) -> int:
+    root = ET.parse(path).getroot()
+    return sum(1 for policy in root if strip_namespace(policy.tag) == 'Policy'
+               and compile_policy(process_policy(policy)))
+
+
+def _stream_document(path: str) -> int:
+    return sum(1 for item in iter_policies(path) if isinstance(item, LoadedPolicy))
+
+
+def run_loading(count: int = 10000):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'policy_set.xacml')
+        write_policy_set(path, count)
+        print(f"{count} policies, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        for name, load in (("ET.parse:", _parse_whole_document), ("iterparse:", _stream_document)):
+            tracemalloc.start()
+            start = time.perf_counter()
+            loaded = load(path)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            # the compiled policies are dropped by both loaders: the peak is the cost of the parsing
+            print(f"{name:<12}{elapsed:8.2f} s, peak {peak / 1e6:8.1f} MB ({loaded} policies)")
+
+
+def resource_target(resource_id: str) -> list:
+    return [[[{
+        'MatchId': STRING_EQUAL,
+        'AttributeValue': {'DataType': XACML_STRING, 'Value': resource_id},
+        'AttributeDesignator': {'AttributeId': 'resource-id', 'Category': None, 'DataType': XACML_STRING,
+                                'MustBePresent': 'false'}
+    }]]]
+
+
+def targeted_policies(count: int, policies: list) -> list:
+    """
+    :return: list of `count` policy dicts, copies of the examples each targeting its own resource
+    """
+    return [{**policies[index % len(policies)], 'PolicyId': f"{policies[index % len(policies)]['PolicyId']}-{index}",
+             'Target': resource_target(f'resource-{index}')}
+            for index in range(count)]
+
+
+def run_index(max_count: int = 100000):
+    policies = load_policies()
+    check(targeted_policies(10, policies), [compile_policy(policy) for policy in targeted_policies(10, policies)])
+
+    count = 10
+    while count <= max_count:
+        start = time.perf_counter()
+        index = PolicyIndex(compile_policy(policy) for policy in targeted_policies(count, policies))
+        build_time = time.perf_counter() - start
+
+        requests = [{**ATTRIBUTE_SETS[request % len(ATTRIBUTE_SETS)], 'resource-id': f'resource-{request * 7 % count}'}
+                    for request in range(20)]
+        for attributes in requests:
+            if index.evaluate(attributes) != index.evaluate_all(attributes):
+                raise AssertionError(f"Index and scan disagree on {attributes}")
+
+        iterations = max(1, 10000 // count)
+        scanned = timeit.timeit(lambda: [index.evaluate_all(attributes) for attributes in requests],
+                                number=iterations) / (iterations * len(requests))
+        indexed = timeit.timeit(lambda: [index.evaluate(attributes) for attributes in requests],
+                                number=iterations * 100) / (iterations * 100 * len(requests))
+        print(f"{count:>7} policies: build {build_time:7.2f} s, scan {scanned * 1e6:10.1f} us, "
+              f"index {indexed * 1e6:6.2f} us per request ({scanned / indexed:.0f}x)")
+        count *= 10
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'load':
+        run_loading(int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'index':
+        run_index(int(sys.argv[2]) if len(sys.argv) > 2 else 100000)
+    else:
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,435 @@
+"""
+Compiles the policies produced by parser.process_policy into trees of pre-bound closures.
+
+The interpreter in parser.py walks the policy dicts and compares function ids on every request.
+Here that work is done once: functions are resolved through FUNCTIONS, constant AttributeValues are
+decoded according to their DataType, attribute ids are interned, and constant sub-expressions are folded,
+so evaluating a policy is a handful of nested calls:
+
+    policy = compile_policy(process_policy(ET.parse(path).getroot()))
+    policy.evaluate({'device-type': 'Mobile'}).decision  # 'Permit', 'Deny' or 'NotApplicable'
+
+Compiled policies, rules and decisions are immutable (named tuples over closures that only capture
+tuples and constants): a policy can be loaded once and evaluated from any number of threads, or of
+processes forked after loading, and each evaluation returns its own Decision without touching the policy.
+"""
+import sys
+from typing import Callable, FrozenSet, NamedTuple, Optional, Tuple
+
+XACML_STRING = 'http://www.w3.org/2001/XMLSchema#string'
+XACML_BOOLEAN = 'http://www.w3.org/2001/XMLSchema#boolean'
+XACML_INTEGER = 'http://www.w3.org/2001/XMLSchema#integer'
+XACML_DOUBLE = 'http://www.w3.org/2001/XMLSchema#double'
+
+PERMIT = 'Permit'
+DENY = 'Deny'
+NOT_APPLICABLE = 'NotApplicable'
+
+STRING_EQUAL = 'urn:oasis:names:tc:xacml:1.0:function:string-equal'
+
+# DataType -> decoder of the AttributeValue text
+DATA_TYPES = {
+    XACML_STRING: str,
+    XACML_BOOLEAN: lambda value: value.strip().lower() == 'true',
+    XACML_INTEGER: int,
+    XACML_DOUBLE: float,
+}
+
+# FunctionId -> builder receiving the compiled arguments and returning the compiled apply
+FUNCTIONS = {}
+
+# RuleCombiningAlgId -> builder receiving the compiled rules and returning a function of the attributes
+# that selects the rule deciding the request (None if no rule applies)
+RULE_COMBINING_ALGORITHMS = {}
+
+
+class PolicyCompilationError(Exception):
+    pass
+
+
+def register_function(function_id):
+    """
+    Register a builder for a FunctionId. The builder receives the compiled arguments (callables taking
+    the attributes dict; constants also carry a `constant` attribute) and returns the compiled apply.
+    """
+    def decorator(builder):
+        FUNCTIONS[function_id] = builder
+        return builder
+    return decorator
+
+
+def register_strict_function(function_id):
+    """
+    Register a plain function of the argument values (all arguments are evaluated first).
+    """
+    def decorator(function):
+        FUNCTIONS[function_id] = lambda arguments: bind(function, arguments)
+        return function
+    return decorator
+
+
+def register_rule_combining_algorithm(algorithm_id):
+    def decorator(builder):
+        RULE_COMBINING_ALGORITHMS[algorithm_id] = builder
+        return builder
+    return decorator
+
+
+def constant(value):
+    def evaluate(attributes):
+        return value
+    evaluate.constant = value
+    return evaluate
+
+
+def is_constant(expression) -> bool:
+    return hasattr(expression, 'constant')
+
+
+def bind(function, arguments):
+    """
+    Bind a function of values to compiled arguments, folding it if every argument is constant and
+    unrolling the argument evaluation for one and two arguments.
+    """
+    if all(is_constant(argument) for argument in arguments):
+        return constant(function(*[argument.constant for argument in arguments]))
+
+    if len(arguments) == 1:
+        (argument,) = arguments
+        return lambda attributes: function(argument(attributes))
+
+    if len(arguments) == 2:
+        first, second = arguments
+        if is_constant(first):
+            first_value = first.constant
+            return lambda attributes: function(first_value, second(attributes))
+        if is_constant(second):
+            second_value = second.constant
+            return lambda attributes: function(first(attributes), second_value)
+        return lambda attributes: function(first(attributes), second(attributes))
+
+    arguments = tuple(arguments)
+    return lambda attributes: function(*[argument(attributes) for argument in arguments])
+
+
+# ---------------------------------------------------------------- functions
+
+@register_strict_function(STRING_EQUAL)
+def string_equal(first, second):
+    return first == second
+
+
+@register_strict_function('urn:oasis:names:tc:xacml:3.0:function:string-starts-with')
+def string_starts_with(prefix, value):
+    # true if the second argument starts with the first one
+    return prefix is not None and value is not None and value.startswith(prefix)
+
+
+@register_strict_function('urn:oasis:names:tc:xacml:3.0:function:string-ends-with')
+def string_ends_with(suffix, value):
+    # true if the second argument ends with the first one
+    return suffix is not None and value is not None and value.endswith(suffix)
+
+
+@register_strict_function('urn:oasis:names:tc:xacml:1.0:function:string-normalize-to-lower-case')
+def string_normalize_to_lower_case(value):
+    return value.lower() if value is not None else None
+
+
+@register_function('urn:oasis:names:tc:xacml:1.0:function:string-one-and-only')
+def build_one_and_only(arguments):
+    # attributes hold single values: the bag function is the designator itself
+    return arguments[0]
+
+
+@register_function('urn:oasis:names:tc:xacml:1.0:function:and')
+def build_and(arguments):
+    arguments = [argument for argument in arguments if not (is_constant(argument) and argument.constant)]
+    if any(is_constant(argument) for argument in arguments):
+        return constant(False)
+    if not arguments:
+        return constant(True)
+    if len(arguments) == 1:
+        (argument,) = arguments
+        return lambda attributes: bool(argument(attributes))
+    if len(arguments) == 2:
+        first, second = arguments
+        return lambda attributes: bool(first(attributes) and second(attributes))
+    arguments = tuple(arguments)
+    return lambda attributes: all(argument(attributes) for argument in arguments)
+
+
+@register_function('urn:oasis:names:tc:xacml:1.0:function:or')
+def build_or(arguments):
+    arguments = [argument for argument in arguments if not (is_constant(argument) and not argument.constant)]
+    if any(is_constant(argument) for argument in arguments):
+        return constant(True)
+    if not arguments:
+        return constant(False)
+    if len(arguments) == 1:
+        (argument,) = arguments
+        return lambda attributes: bool(argument(attributes))
+    if len(arguments) == 2:
+        first, second = arguments
+        return lambda attributes: bool(first(attributes) or second(attributes))
+    arguments = tuple(arguments)
+    return lambda attributes: any(argument(attributes) for argument in arguments)
+
+
+# ---------------------------------------------------------------- expressions
+
+def compile_attribute_value(attribute_value):
+    decode = DATA_TYPES.get(attribute_value.get('DataType'), str)
+    try:
+        return constant(decode(attribute_value.get('Value')))
+    except ValueError as e:
+        raise PolicyCompilationError(f"Invalid {attribute_value.get('DataType')} value "
+                                     f"{attribute_value.get('Value')!r}: {e}")
+
+
+def compile_attribute_designator(attribute_designator):
+    attribute_id = sys.intern(attribute_designator['AttributeId'])
+    return lambda attributes: attributes.get(attribute_id)
+
+
+def compile_expression(expression):
+    if 'FunctionId' in expression:
+        function_id = expression['FunctionId']
+        builder = FUNCTIONS.get(function_id)
+        if builder is None:
+            raise PolicyCompilationError(f"Function {function_id} not implemented.")
+        return builder([compile_expression(argument) for argument in expression['Arguments']])
+    if 'AttributeDesignator' in expression:
+        return compile_attribute_designator(expression['AttributeDesignator'])
+    if 'AttributeValue' in expression:
+        return compile_attribute_value(expression['AttributeValue'])
+    raise PolicyCompilationError(f"Unknown expression {expression}")
+
+
+def compile_condition(condition):
+    """
+    :return: the compiled condition, None if the rule has no condition (always applies)
+    """
+    if condition is None:
+        return None
+    if 'Apply' not in condition:
+        # as in the interpreter, an empty condition never applies
+        return constant(False)
+    return compile_expression(condition['Apply'])
+
+
+# ---------------------------------------------------------------- targets
+
+def compile_match(match):
+    builder = FUNCTIONS.get(match['MatchId'])
+    if builder is None:
+        raise PolicyCompilationError(f"Function {match['MatchId']} not implemented.")
+    return builder([compile_attribute_value(match['AttributeValue']),
+                    compile_attribute_designator(match['AttributeDesignator'])])
+
+
+def compile_target(target):
+    """
+    :return: the compiled target, None if it matches every request
+    """
+    if not target:
+        return None
+    compiled = build_and([build_or([build_and([compile_match(match) for match in all_of]) for all_of in any_of])
+                          for any_of in target])
+    return None if is_constant(compiled) and compiled.constant else compiled
+
+
+def target_index_keys(target) -> Optional[FrozenSet[tuple]]:
+    """
+    Get the (AttributeId, value) pairs one of which a request must have for the target to match, taken
+    from the string-equal matches of the most selective AnyOf whose every AllOf has one.
+    :return: frozenset of (AttributeId, value), None if the target cannot be indexed (or matches everything)
+    """
+    best = None
+    for any_of in target or []:
+        keys = set()
+        for all_of in any_of:
+            key = next(((sys.intern(match['AttributeDesignator']['AttributeId']), match['AttributeValue']['Value'])
+                        for match in all_of
+                        if match['MatchId'] == STRING_EQUAL
+                        and match['AttributeValue'].get('DataType') in (None, XACML_STRING)), None)
+            if key is None:
+                break
+            keys.add(key)
+        else:
+            if best is None or len(keys) < len(best):
+                best = frozenset(keys)
+    return best
+
+
+# ---------------------------------------------------------------- compiled policies
+
+class Decision(NamedTuple):
+    """
+    Result of a policy evaluation.
+    """
+    decision: str  # Permit, Deny or NotApplicable
+    policy_id: Optional[str]
+    rule_id: Optional[str]  # the rule that decided, None if no rule applies
+    obligations: Tuple[str, ...]  # ObligationIds of the rule and policy obligations fulfilled on the decision
+
+    @property
+    def permitted(self) -> bool:
+        return self.decision == PERMIT
+
+
+class CompiledRule(NamedTuple):
+    rule_id: Optional[str]
+    effect: str
+    condition: Optional[Callable]  # None if the rule always applies
+    decision: Decision  # returned as is whenever the rule decides
+
+    @property
+    def always_applies(self) -> bool:
+        return self.condition is None or (is_constant(self.condition) and bool(self.condition.constant))
+
+    @property
+    def never_applies(self) -> bool:
+        return self.condition is not None and is_constant(self.condition) and not self.condition.constant
+
+    def applies(self, attributes: dict) -> bool:
+        return self.condition is None or bool(self.condition(attributes))
+
+
+class CompiledPolicy(NamedTuple):
+    policy_id: Optional[str]
+    version: Optional[str]
+    rule_combining_alg_id: str
+    target: Optional[Callable]  # None if the policy applies to every request
+    index_keys: Optional[FrozenSet[tuple]]  # see target_index_keys
+    rules: Tuple[CompiledRule, ...]
+    not_applicable: Decision
+    select_rule: Callable  # attributes -> the deciding CompiledRule, or None
+
+    def evaluate(self, attributes: dict) -> Decision:
+        """
+        Evaluate a request.
+        :param attributes: dict - AttributeId -> value
+        :return: Decision - shared, immutable result object
+        """
+        if self.target is not None and not self.target(attributes):
+            return self.not_applicable
+        rule = self.select_rule(attributes)
+        return self.not_applicable if rule is None else rule.decision
+
+    __call__ = evaluate
+
+
+# ---------------------------------------------------------------- rule combining algorithms
+
+def _build_overrides(rules, first_effect, second_effect):
+    def candidates(effect):
+        # rules of the effect that may apply, None as condition meaning the rule always applies
+        selected = []
+        for rule in rules:
+            if rule.effect != effect or rule.never_applies:
+                continue
+            if rule.always_applies:
+                return tuple(selected), rule
+            selected.append((rule.condition, rule))
+        return tuple(selected), None
+
+    first_rules, first_default = candidates(first_effect)
+    second_rules, second_default = candidates(second_effect)
+
+    def select_rule(attributes):
+        for condition, rule in first_rules:
+            if condition(attributes):
+                return rule
+        if first_default is not None:
+            return first_default
+        for condition, rule in second_rules:
+            if condition(attributes):
+                return rule
+        return second_default
+    return select_rule
+
+
+@register_rule_combining_algorithm('urn:oasis:names:tc:xacml:3.0:rule-combining-algorithm:permit-overrides')
+def build_permit_overrides(rules):
+    return _build_overrides(rules, PERMIT, DENY)
+
+
+@register_rule_combining_algorithm('urn:oasis:names:tc:xacml:3.0:rule-combining-algorithm:deny-overrides')
+def build_deny_overrides(rules):
+    return _build_overrides(rules, DENY, PERMIT)
+
+
+@register_rule_combining_algorithm('urn:oasis:names:tc:xacml:1.0:rule-combining-algorithm:first-applicable')
+def build_first_applicable(rules):
+    conditional_rules = []
+    default = None
+    for rule in rules:
+        if rule.always_applies:
+            # the following rules are unreachable
+            default = rule
+            break
+        if not rule.never_applies:
+            conditional_rules.append((rule.condition, rule))
+    conditional_rules = tuple(conditional_rules)
+
+    def select_rule(attributes):
+        for condition, rule in conditional_rules:
+            if condition(attributes):
+                return rule
+        return default
+    return select_rule
+
+
+def _find_rule_combining_algorithm(algorithm_id):
+    builder = RULE_COMBINING_ALGORITHMS.get(algorithm_id)
+    if builder is None and algorithm_id:
+        # same as the interpreter: match on the algorithm name whatever the XACML version
+        name = algorithm_id.rsplit(':', 1)[-1]
+        builder = next((builder for registered_id, builder in RULE_COMBINING_ALGORITHMS.items()
+                        if registered_id.endswith(f':{name}')), None)
+    if builder is None:
+        raise PolicyCompilationError(f"Rule Combining Algorithm {algorithm_id} not implemented.")
+    return builder
+
+
+# ---------------------------------------------------------------- policies
+
+def _obligation_ids(obligations, effect) -> tuple:
+    return tuple(obligation.get('ObligationId') for obligation in obligations or []
+                 if obligation.get('FulfillOn') == effect)
+
+
+def compile_rule(rule_dict, policy_dict) -> CompiledRule:
+    effect = rule_dict.get('Effect')
+    decision = Decision(effect, policy_dict.get('PolicyId'), rule_dict.get('RuleId'),
+                        _obligation_ids(rule_dict.get('Obligations'), effect) +
+                        _obligation_ids(policy_dict.get('Obligations'), effect))
+    condition = compile_condition(rule_dict.get('Condition'))
+    # a rule applies if its target and its condition match
+    target = compile_target(rule_dict.get('Target'))
+    if target is not None:
+        condition = target if condition is None else build_and([target, condition])
+    return CompiledRule(rule_dict.get('RuleId'), effect, condition, decision)
+
+
+def compile_policy(policy_dict) -> CompiledPolicy:
+    """
+    Compile a policy dict (as returned by parser.process_policy). The dict is not modified nor referenced.
+    :param policy_dict: dict - the parsed policy
+    :return: CompiledPolicy - evaluate(attributes) returns the Decision
+    :raises PolicyCompilationError: if the policy uses an unknown function or rule combining algorithm
+    """
+    algorithm_id = policy_dict.get('RuleCombiningAlgId')
+    builder = _find_rule_combining_algorithm(algorithm_id)
+    rules = tuple(compile_rule(rule, policy_dict) for rule in policy_dict.get('Rules', []))
+    return CompiledPolicy(
+        policy_id=policy_dict.get('PolicyId'),
+        version=policy_dict.get('Version'),
+        rule_combining_alg_id=algorithm_id,
+        target=compile_target(policy_dict.get('Target')),
+        index_keys=target_index_keys(policy_dict.get('Target')),
+        rules=rules,
+        not_applicable=Decision(NOT_APPLICABLE, policy_dict.get('PolicyId'), None, ()),
+        select_rule=builder(rules)
+    )
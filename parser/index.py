@@ -0,0 +1,182 @@
+"""
+Index of compiled policies by target, so a request only evaluates the policies whose target can match it.
+
+A PolicyIndex is a compiled policy set. Each child (policy or nested policy set) is indexed under the
+(AttributeId, value) pairs of its target's string-equal matches (compiler.target_index_keys). A request
+looks up its own attributes and gets the candidate children, plus the children whose target cannot be
+indexed, in document order. The set's target is checked first. The candidates are then evaluated, nested
+sets through their own index, and their decisions are combined with the policy combining algorithm of the set:
+
+    index = PolicyIndex.from_source('policy_set.xacml')
+    index.evaluate({'resource-id': 'https://...', 'device-type': 'Mobile'}).decision
+
+A nested set is indexed under its target's pairs, or under the pairs of its children when its target cannot
+be indexed (it only applies if one of them does). The index is built once and only read afterwards, so it
+can be shared by threads like the policies.
+"""
+from parser.compiler import DENY, NOT_APPLICABLE, PERMIT, Decision, PolicyCompilationError
+from parser.loader import POLICY, POLICY_ID_REFERENCE, PolicyLoadingError, load_documents
+
+DENY_OVERRIDES = 'urn:oasis:names:tc:xacml:3.0:policy-combining-algorithm:deny-overrides'
+
+# policy combining algorithm name -> overriding decision (None: the first applicable policy decides)
+POLICY_COMBINING_ALGORITHMS = {
+    'deny-overrides': DENY,
+    'permit-overrides': PERMIT,
+    'first-applicable': None,
+}
+
+# attribute values holding several values, whose elements are looked up in the index
+BAGS = (list, tuple, set, frozenset)
+
+
+class PolicyIndex:
+    def __init__(self, policies=(), policy_combining_alg_id: str = DENY_OVERRIDES, policy_set_id: str = None,
+                 target=None, target_index_keys=None):
+        """
+        :param policies: iterable of CompiledPolicy or PolicyIndex (nested policy sets) - in evaluation order
+        :param policy_combining_alg_id: str - how the decisions of the applicable children are combined
+        :param policy_set_id: str - reported by the NotApplicable decision
+        :param target: the compiled target of the set, None if it applies to every request
+        :param target_index_keys: frozenset - the index keys of the set target (see compiler.target_index_keys)
+        :raises PolicyCompilationError: if the policy combining algorithm is not implemented
+        """
+        name = (policy_combining_alg_id or '').rsplit(':', 1)[-1]
+        if name not in POLICY_COMBINING_ALGORITHMS:
+            raise PolicyCompilationError(f"Policy Combining Algorithm {policy_combining_alg_id} not implemented.")
+        self.policy_set_id = policy_set_id
+        self.policy_combining_alg_id = policy_combining_alg_id
+        self.target = target
+        self.target_index_keys = target_index_keys
+        self._overriding = POLICY_COMBINING_ALGORITHMS[name]
+        self.not_applicable = Decision(NOT_APPLICABLE, policy_set_id, None, ())
+        self._policies = []
+        self._index = {}  # (AttributeId, value) -> positions of the children
+        self._unindexed = []  # positions of the children evaluated for every request
+        for policy in policies:
+            self.add(policy)
+
+    @classmethod
+    def from_source(cls, source, *referenced_sources):
+        """
+        Stream a XACML document and index its policies. Nested policy sets keep their target and policy
+        combining algorithm, and references are resolved in the document and the referenced documents.
+        :param source: str or file object - the XACML document
+        :param referenced_sources: str or file objects - documents defining the referenced policies and sets
+        :return: PolicyIndex
+        :raises PolicyLoadingError: if a reference is not defined, an id is defined twice or sets reference
+            each other in a cycle
+        """
+        policies, policy_sets, roots = load_documents(source, *referenced_sources)
+        kind, root_id = roots[0] or (None, None)
+        if kind is None:
+            raise PolicyLoadingError("The document holds no policy")
+        if kind == POLICY:
+            return cls([policies[root_id]])
+
+        built = {}
+
+        def build(policy_set_id, building):
+            if policy_set_id in building:
+                raise PolicyLoadingError(f"Policy set {policy_set_id} references itself")
+            if policy_set_id not in built:
+                info = policy_sets[policy_set_id]
+                children = []
+                for child_kind, child_id in info.children:
+                    if child_kind in (POLICY, POLICY_ID_REFERENCE):
+                        children.append(policies[child_id])
+                    else:
+                        children.append(build(child_id, building | {policy_set_id}))
+                built[policy_set_id] = cls(children, info.policy_combining_alg_id or DENY_OVERRIDES,
+                                           policy_set_id, info.target, info.index_keys)
+            return built[policy_set_id]
+
+        return build(root_id, frozenset())
+
+    @property
+    def index_keys(self):
+        """
+        The (AttributeId, value) pairs one of which a request must have for the set to apply, None if it
+        cannot be indexed (same as CompiledPolicy.index_keys).
+        """
+        if self.target_index_keys is not None:
+            return self.target_index_keys
+        if self._unindexed:
+            return None
+        return frozenset(self._index)
+
+    def add(self, policy):
+        """
+        Index a policy or a nested set, evaluated after the ones already added. Not to be called while the
+        index is read.
+        """
+        position = len(self._policies)
+        self._policies.append(policy)
+        index_keys = policy.index_keys
+        if index_keys is None:
+            self._unindexed.append(position)
+            return
+        for key in index_keys:
+            self._index.setdefault(key, []).append(position)
+
+    def __len__(self):
+        return len(self._policies)
+
+    def candidates(self, attributes: dict) -> list:
+        """
+        :param attributes: dict - AttributeId -> value, or bag (list, tuple, set) of values
+        :return: list of CompiledPolicy or PolicyIndex - the children whose target may match, in evaluation order
+        """
+        positions = set(self._unindexed)
+        for attribute_id, value in attributes.items():
+            # each value of a bag is looked up, unhashable values cannot be indexed and are skipped
+            for key_value in value if isinstance(value, BAGS) else (value,):
+                try:
+                    found = self._index.get((attribute_id, key_value))
+                except TypeError:
+                    continue
+                if found is not None:
+                    positions.update(found)
+        return [self._policies[position] for position in sorted(positions)]
+
+    def evaluate(self, attributes: dict) -> Decision:
+        """
+        Evaluate a request against the candidate children.
+        :param attributes: dict - AttributeId -> value
+        :return: Decision - of the policy deciding the request, NotApplicable if none applies
+        """
+        if self.target is not None and not self.target(attributes):
+            return self.not_applicable
+        return self._combine(policy.evaluate(attributes) for policy in self.candidates(attributes))
+
+    __call__ = evaluate
+
+    def evaluate_all(self, attributes: dict) -> Decision:
+        """
+        Same as evaluate, without the index: every policy is evaluated.
+        """
+        if self.target is not None and not self.target(attributes):
+            return self.not_applicable
+        return self._combine(policy.evaluate_all(attributes) if isinstance(policy, PolicyIndex)
+                             else policy.evaluate(attributes) for policy in self._policies)
+
+    def _combine(self, decisions) -> Decision:
+        first = None
+        for decision in decisions:
+            if decision.decision == NOT_APPLICABLE:
+                continue
+            if self._overriding is None or decision.decision == self._overriding:
+                return decision
+            if first is None:
+                first = decision
+        return first or self.not_applicable
+
+    def stats(self) -> dict:
+        """
+        :return: dict with the number of children, of index keys and of children evaluated for every request
+        """
+        return {
+            "policies": len(self._policies),
+            "keys": len(self._index),
+            "unindexed": len(self._unindexed)
+        }
@@ -0,0 +1,167 @@
+"""
+Streaming loader of XACML documents, for policy sets too large to be parsed with ET.parse.
+
+The document is read with ET.iterparse: every Policy is converted (parser.process_policy) and compiled
+(compiler.compile_policy) as soon as its end tag is read, then its element is removed from the tree, so the
+memory used does not grow with the size of the file. Policy sets are walked recursively and their structure
+(combining algorithm, target, nested policies, policy sets and references) is reported once the set is closed:
+
+    for item in iter_policies('policies.xacml'):
+        if isinstance(item, LoadedPolicy):
+            policies[item.policy.policy_id] = item.policy
+
+References (PolicyIdReference, PolicySetIdReference) are reported as they are, load_policies resolves them
+across several documents.
+"""
+import xml.etree.ElementTree as ET
+from typing import Any, FrozenSet, NamedTuple, Optional, Tuple
+
+from parser.compiler import compile_policy, compile_target, target_index_keys
+from parser.parser import parse_target, process_policy, strip_namespace
+
+POLICY = 'Policy'
+POLICY_SET = 'PolicySet'
+POLICY_ID_REFERENCE = 'PolicyIdReference'
+POLICY_SET_ID_REFERENCE = 'PolicySetIdReference'
+
+
+class PolicyLoadingError(Exception):
+    pass
+
+
+class LoadedPolicy(NamedTuple):
+    policy: Any  # CompiledPolicy, or the policy dict when not compiled
+    policy_sets: Tuple[str, ...]  # ids of the enclosing policy sets, outermost first
+    # targets of the enclosing policy sets that must also match for the policy to apply, outermost first
+    # (compiled, or parsed when not compiled)
+    targets: Tuple[Any, ...] = ()
+
+
+class PolicySetInfo(NamedTuple):
+    policy_set_id: str
+    version: Optional[str]
+    policy_combining_alg_id: Optional[str]
+    policy_sets: Tuple[str, ...]  # ids of the enclosing policy sets, outermost first
+    children: Tuple[Tuple[str, str], ...]  # (Policy, PolicySet, PolicyIdReference or PolicySetIdReference, id)
+    target: Any = None  # compiled (parsed when not compiled), None if the set applies to every request
+    index_keys: Optional[FrozenSet[tuple]] = None  # see compiler.target_index_keys
+
+
+class PolicyReference(NamedTuple):
+    kind: str  # PolicyIdReference or PolicySetIdReference
+    reference_id: str
+    version: Optional[str]
+    policy_sets: Tuple[str, ...]  # ids of the enclosing policy sets, outermost first
+
+
+def iter_policies(source, compiled: bool = True):
+    """
+    Stream the policies, policy sets and references of a XACML document (a Policy or a PolicySet root).
+    The target of a policy set is read before its policies (XACML puts it first) and is reported with each
+    of them, as it also restricts the requests they apply to.
+    :param source: str or file object - the XACML document
+    :param compiled: bool - yield CompiledPolicy objects and compiled targets, or the parsed dicts if False
+    :return: generator of LoadedPolicy, PolicyReference and PolicySetInfo (after its children), in document order
+    :raises PolicyCompilationError: if a policy or a policy set target uses an unknown function
+    """
+    elements = []  # open elements, root first
+    policy_sets = []  # open policy sets
+
+    def path():
+        return tuple(policy_set['PolicySetId'] for policy_set in policy_sets)
+
+    for event, element in ET.iterparse(source, events=('start', 'end')):
+        tag = strip_namespace(element.tag)
+        if event == 'start':
+            elements.append(element)
+            if tag == POLICY_SET:
+                policy_sets.append({
+                    'PolicySetId': element.get('PolicySetId'),
+                    'Version': element.get('Version'),
+                    'PolicyCombiningAlgId': element.get('PolicyCombiningAlgId'),
+                    'Children': [],
+                    'Target': None,
+                    'IndexKeys': None
+                })
+            continue
+
+        elements.pop()
+        parent_tag = strip_namespace(elements[-1].tag) if elements else None
+        if tag == POLICY_SET:
+            policy_set = policy_sets.pop()
+            if policy_sets:
+                policy_sets[-1]['Children'].append((POLICY_SET, policy_set['PolicySetId']))
+            yield PolicySetInfo(policy_set['PolicySetId'], policy_set['Version'], policy_set['PolicyCombiningAlgId'],
+                                path(), tuple(policy_set['Children']), policy_set['Target'], policy_set['IndexKeys'])
+        elif tag == 'Target' and parent_tag == POLICY_SET:
+            target = parse_target(element)
+            policy_sets[-1]['Target'] = compile_target(target) if compiled else target
+            policy_sets[-1]['IndexKeys'] = target_index_keys(target)
+        elif tag == POLICY and parent_tag in (None, POLICY_SET):
+            policy_dict = process_policy(element)
+            if policy_sets:
+                policy_sets[-1]['Children'].append((POLICY, policy_dict['PolicyId']))
+            targets = tuple(policy_set['Target'] for policy_set in policy_sets if policy_set['Target'] is not None)
+            yield LoadedPolicy(compile_policy(policy_dict) if compiled else policy_dict, path(), targets)
+        elif tag in (POLICY_ID_REFERENCE, POLICY_SET_ID_REFERENCE) and parent_tag == POLICY_SET:
+            reference_id = (element.text or '').strip()
+            if not reference_id:
+                raise PolicyLoadingError(f"Empty {tag} in policy set {policy_sets[-1]['PolicySetId']}")
+            policy_sets[-1]['Children'].append((tag, reference_id))
+            yield PolicyReference(tag, reference_id, element.get('Version'), path())
+
+        # the content of a policy is needed until its end tag, everything directly under a policy set
+        # (policies, references, descriptions, targets...) is done with once closed
+        if parent_tag == POLICY_SET:
+            elements[-1].remove(element)
+            element.clear()
+        elif parent_tag is None:
+            element.clear()
+
+
+def load_documents(*sources) -> tuple:
+    """
+    Load and compile the policies of several XACML documents, resolving the references between them.
+    :param sources: str or file objects - the XACML documents
+    :return: tuple (dict PolicyId -> CompiledPolicy, dict PolicySetId -> PolicySetInfo, list of the document
+        roots as (Policy or PolicySet, id), one per source)
+    :raises PolicyLoadingError: if an id is defined twice or a reference is not defined in any document
+    """
+    policies = {}
+    policy_sets = {}
+    references = []
+    roots = []
+    for source in sources:
+        root = None
+        for item in iter_policies(source):
+            if isinstance(item, LoadedPolicy):
+                if item.policy.policy_id in policies:
+                    raise PolicyLoadingError(f"Policy {item.policy.policy_id} defined twice")
+                policies[item.policy.policy_id] = item.policy
+                if not item.policy_sets:
+                    root = (POLICY, item.policy.policy_id)
+            elif isinstance(item, PolicySetInfo):
+                if item.policy_set_id in policy_sets:
+                    raise PolicyLoadingError(f"Policy set {item.policy_set_id} defined twice")
+                policy_sets[item.policy_set_id] = item
+                if not item.policy_sets:
+                    root = (POLICY_SET, item.policy_set_id)
+            else:
+                references.append(item)
+        roots.append(root)
+
+    for reference in references:
+        defined = policies if reference.kind == POLICY_ID_REFERENCE else policy_sets
+        if reference.reference_id not in defined:
+            raise PolicyLoadingError(f"{reference.kind} {reference.reference_id} in policy set "
+                                     f"{reference.policy_sets[-1]} is not defined")
+    return policies, policy_sets, roots
+
+
+def load_policies(*sources) -> tuple:
+    """
+    Same as load_documents, without the roots.
+    :return: tuple (dict PolicyId -> CompiledPolicy, dict PolicySetId -> PolicySetInfo)
+    """
+    policies, policy_sets, _ = load_documents(*sources)
+    return policies, policy_sets
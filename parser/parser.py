@@ -46,6 +46,29 @@ def parse_condition(element):
             condition['Apply'] = parse_apply(child)
     return condition
 
+def parse_match(element):
+    match_dict = {
+        'MatchId': element.get('MatchId'),
+        'AttributeValue': None,
+        'AttributeDesignator': None
+    }
+    for child in element:
+        tag = strip_namespace(child.tag)
+        if tag == 'AttributeValue':
+            match_dict['AttributeValue'] = parse_attribute_value(child)
+        elif tag == 'AttributeDesignator':
+            match_dict['AttributeDesignator'] = parse_attribute_designator(child)
+    return match_dict
+
+def parse_target(element):
+    # list of AnyOf (all must match), each a list of AllOf (one must match), each a list of Match (all must match)
+    target = []
+    for any_of in element.findall('./{*}AnyOf'):
+        target.append([[parse_match(match) for match in all_of.findall('./{*}Match')]
+                       for all_of in any_of.findall('./{*}AllOf')])
+    # an empty target matches every request, as a missing one
+    return target if target else None
+
 def parse_obligations(element):
     obligations = []
     for obligation in element.findall('./*'):
@@ -90,6 +113,9 @@ def process_rule(rule):
         rule_dict['Description'] = parse_description(description_text)
 
     target = rule.find('./{*}Target')
+    if target is not None:
+        rule_dict['Target'] = parse_target(target)
+
     condition = rule.find('./{*}Condition')
     if condition is not None:
         rule_dict['Condition'] = parse_condition(condition)
@@ -117,6 +143,9 @@ def process_policy(root):
         policy_dict['Description'] = parse_description(description_text)
 
     target = root.find('./{*}Target')
+    if target is not None:
+        policy_dict['Target'] = parse_target(target)
+
     for rule in root.findall('./{*}Rule'):
         policy_dict['Rules'].append(process_rule(rule))
 
@@ -138,21 +167,24 @@ def evaluate_function(function_id, arguments, attributes):
     elif function_id == 'urn:oasis:names:tc:xacml:1.0:function:or':
         return any(evaluate_expression(arg, attributes) for arg in arguments)
     elif function_id == 'urn:oasis:names:tc:xacml:3.0:function:string-starts-with':
+        # true if the second argument starts with the first one
         arg1 = evaluate_expression(arguments[0], attributes)
         arg2 = evaluate_expression(arguments[1], attributes)
-        return arg1.startswith(arg2)
+        return arg1 is not None and arg2 is not None and arg2.startswith(arg1)
     elif function_id == 'urn:oasis:names:tc:xacml:3.0:function:string-ends-with':
+        # true if the second argument ends with the first one
         arg1 = evaluate_expression(arguments[0], attributes)
         arg2 = evaluate_expression(arguments[1], attributes)
-        return arg1.endswith(arg2)
+        return arg1 is not None and arg2 is not None and arg2.endswith(arg1)
     elif function_id == 'urn:oasis:names:tc:xacml:1.0:function:string-normalize-to-lower-case':
         arg = evaluate_expression(arguments[0], attributes)
-        return arg.lower()
+        return arg.lower() if arg is not None else None
     else:
         raise NotImplementedError(f"Function {function_id} not implemented.")
 
 def evaluate_expression(expression, attributes):
-    if 'Apply' in expression:
+    # nested applies are stored as {'FunctionId', 'Arguments'}, only the condition root is wrapped in 'Apply'
+    if 'FunctionId' in expression:
         function_id = expression['FunctionId']
         arguments = expression['Arguments']
         return evaluate_function(function_id, arguments, attributes)
@@ -168,13 +200,38 @@ def evaluate_condition(condition, attributes):
     if 'Apply' in condition:
         return evaluate_expression(condition['Apply'], attributes)
 
+def evaluate_match(match, attributes):
+    arguments = [
+        {'AttributeValue': match['AttributeValue']},
+        {'AttributeDesignator': match['AttributeDesignator']}
+    ]
+    return evaluate_function(match['MatchId'], arguments, attributes)
+
+def evaluate_target(target, attributes):
+    if target is None:
+        return True
+    return all(any(all(evaluate_match(match, attributes) for match in all_of) for all_of in any_of)
+               for any_of in target)
+
+def evaluate_rule(rule, attributes):
+    if not evaluate_target(rule.get('Target'), attributes):
+        return False
+    return evaluate_condition(rule['Condition'], attributes)
+
 def evaluate_policy(policy_dict, attributes):
     rule_combining_alg = policy_dict['RuleCombiningAlgId']
     final_decision = 'NotApplicable'
 
+    if not evaluate_target(policy_dict.get('Target'), attributes):
+        policy_dict['Evaluation'] = {
+            'Decision': final_decision,
+            'TargetMatch': False
+        }
+        return final_decision
+
     if rule_combining_alg.endswith('first-applicable'):
         for rule in policy_dict['Rules']:
-            condition_result = evaluate_condition(rule['Condition'], attributes)
+            condition_result = evaluate_rule(rule, attributes)
             if condition_result:
                 final_decision = rule['Effect']
                 policy_dict['Evaluation'] = {
@@ -189,7 +246,7 @@ def evaluate_policy(policy_dict, attributes):
         deny_found = False
         applied_rules = []
         for rule in policy_dict['Rules']:
-            condition_result = evaluate_condition(rule['Condition'], attributes)
+            condition_result = evaluate_rule(rule, attributes)
             if condition_result:
                 applied_rules.append({
                     'RuleId': rule['RuleId'],
@@ -216,7 +273,7 @@ def evaluate_policy(policy_dict, attributes):
         permit_found = False
         applied_rules = []
         for rule in policy_dict['Rules']:
-            condition_result = evaluate_condition(rule['Condition'], attributes)
+            condition_result = evaluate_rule(rule, attributes)
             if condition_result:
                 applied_rules.append({
                     'RuleId': rule['RuleId'],
@@ -250,25 +307,26 @@ def process_and_evaluate_policy_file(input_file, attributes):
     policy_dict['AccessDecision'] = access_decision
     return policy_dict
 
-attribute_values = {
-    'location-mobile': 'true'
-}
-
-input_files = [
-    './parser/examples/xacml_policy.xacml',
-    './parser/examples/xacml_policy2.xacml',
-    './parser/examples/xacml_policy3.xacml',
-    './parser/examples/xacml_policy4.xacml',
-    './parser/examples/xacml_policy5.xacml'
-]
-
-output_dir = './parser/processed_policies'
-os.makedirs(output_dir, exist_ok=True)
-
-for input_file in input_files:
-    policy = process_and_evaluate_policy_file(input_file, attribute_values)
-    output_file = os.path.join(output_dir, f'processed_{os.path.basename(input_file).replace(".xacml", ".json")}')
-    with open(output_file, 'w') as json_file:
-        json.dump(policy, json_file, indent=4)
-    print(f"Processed policy saved to {output_file}")
-    print(f"Access Decision: {policy.get('AccessDecision')}")
+if __name__ == "__main__":
+    attribute_values = {
+        'location-mobile': 'true'
+    }
+
+    input_files = [
+        './parser/examples/xacml_policy.xacml',
+        './parser/examples/xacml_policy2.xacml',
+        './parser/examples/xacml_policy3.xacml',
+        './parser/examples/xacml_policy4.xacml',
+        './parser/examples/xacml_policy5.xacml'
+    ]
+
+    output_dir = './parser/processed_policies'
+    os.makedirs(output_dir, exist_ok=True)
+
+    for input_file in input_files:
+        policy = process_and_evaluate_policy_file(input_file, attribute_values)
+        output_file = os.path.join(output_dir, f'processed_{os.path.basename(input_file).replace(".xacml", ".json")}')
+        with open(output_file, 'w') as json_file:
+            json.dump(policy, json_file, indent=4)
+        print(f"Processed policy saved to {output_file}")
+        print(f"Access Decision: {policy.get('AccessDecision')}")
@@ -3,14 +3,14 @@ from flask_restx import Namespace, Resource
 from requests import HTTPError
 
 from api import settings
-from blockchain_interface.helpers.utils import transaction_to_dict
-from blockchain_interface.interfaces.ABACContracts.PIP import PolicyInformationPoint
-from blockchain_interface.interfaces.HyperledgerBesu import HyperledgerBesu
+from api.services import get_keycloak_interface, get_pip
+from blockchain_interface.errors import TransactionFailedError
+from blockchain_interface.helpers.utils import confirmation_from_request, serialize_transaction
+from blockchain_interface.interfaces.TransactionTracker import Confirmation
 from keycloak_interface.errors import KeycloakACError, MissingTokenError
-from keycloak_interface.keycloakInterface import KeycloakInterface
 from keycloak_interface.utils.functions import get_keycloak_user, get_keycloak_user_by_email, \
     extract_header_token
-from keycloak_interface.utils.handlers import KeyCloakRootConnection
+from keycloak_interface.utils.handlers import get_admin_connection
 from models.models import PersonDAO
 
 api: Namespace = Namespace('Person', description='ExtremeXP Person Endpoints')
@@ -19,23 +19,6 @@ person_model = api.model('Person', PersonDAO.structure)
 
 DAO = PersonDAO()
 
-keycloak_interface = KeycloakInterface(
-    server_url=settings.KEYCLOAK_CONFIG.get('KEYCLOAK_SERVER_URL'),
-    realm_name=settings.KEYCLOAK_CONFIG.get('KEYCLOAK_REALM'),
-    client_id=settings.KEYCLOAK_CONFIG.get('KEYCLOAK_CLIENT_ID'),
-    client_secret_key=settings.KEYCLOAK_CONFIG.get('KEYCLOAK_CLIENT_SECRET_KEY')
-)
-
-evm_interface_instance = HyperledgerBesu(settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_RPC_URL')).connect(
-    settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_PRIVATE_KEY')
-)
-
-PIPSmartContract = PolicyInformationPoint(
-    evm_interface_instance,
-    settings.BLOCKCHAIN_CONFIG.get('POLICY_INFORMATION_POINT_ADDRESS'),
-    f"{settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_CONTRACTS_ROOT_PATH')}/PIP.sol"
-).load()
-
 
 @api.route("/login")
 class PersonLoginView(Resource):
@@ -49,7 +32,7 @@ class PersonLoginView(Resource):
         password = api.payload['password']
 
         try:
-            response, status_code = keycloak_interface.authenticate(username, password)
+            response, status_code = get_keycloak_interface().authenticate(username, password)
 
             if status_code != 200:
                 if get_keycloak_user(username) is not None:
@@ -75,7 +58,7 @@ class PersonInfoView(Resource):
                 raise MissingTokenError()
             else:
                 token = token.split(' ')[1]
-            response, status_code = keycloak_interface.userinfo(token)
+            response, status_code = get_keycloak_interface().userinfo(token)
             return response, status_code
         except KeycloakACError as e:
             return {'error': str(e)}, e.error_code
@@ -99,7 +82,7 @@ class PersonRegisterView(Resource):
         name = api.payload['name']
 
         try:
-            response, status_code = keycloak_interface.create_user(
+            response, status_code = get_keycloak_interface().create_user(
                 username,
                 password,
                 email,
@@ -125,7 +108,7 @@ class PersonView(Resource):
     def get(self):
         try:
             token = extract_header_token(request)
-            if not keycloak_interface.validate_request_token(token):
+            if not get_keycloak_interface().validate_request_token(token):
                 return {'error': 'Invalid or missing token'}, 401
 
             first = request.args.get('page', 1, type=int)
@@ -141,8 +124,9 @@ class PersonView(Resource):
             if 'exact' in query:
                 query['exact'] = query['exact'] == 'true'
 
-            users_count = KeyCloakRootConnection().get_keycloak_user_list_count(query)
-            users = KeyCloakRootConnection().get_keycloak_user_list(query)
+            keycloak_root_connection = get_admin_connection()
+            users_count = keycloak_root_connection.get_keycloak_user_list_count(query)
+            users = keycloak_root_connection.get_keycloak_user_list(query)
             current_url = request.base_url + '?'
 
             # Remove pagination parameters from the URL to avoid duplication
@@ -173,28 +157,34 @@ class PersonView(Resource):
     def get(self, uuid):
         try:
             token = extract_header_token(request)
-            if not keycloak_interface.validate_request_token(token):
+            if not get_keycloak_interface().validate_request_token(token):
                 return {'error': 'Invalid or missing token'}, 401
-            response, status_code = keycloak_interface.userinfo(token)
+            response, status_code = get_keycloak_interface().userinfo(token)
             return response, status_code
         except MissingTokenError as e:
             return {'error': e.message}, 401
         except KeycloakACError as e:
             return {'error': str(e)}, e.error_code
 
+    @api.doc('update_person', params={
+        'uuid': 'UUID of the person',
+        'confirmation': 'sent: answer 202 on broadcast with the transaction hashes to poll on /transaction/<hash>, '
+                        'mined: answer on receipt, details: receipt and transaction details',
+        'wait': 'Deprecated, wait=false is the same as confirmation=sent'
+    })
     def patch(self, uuid):
         try:
             token = extract_header_token(request)
-            if not keycloak_interface.validate_request_token(token):
+            if not get_keycloak_interface().validate_request_token(token):
                 return {'error': 'Invalid or missing token'}, 401
 
             payload = request.json
-            keycloak_root_connection = KeyCloakRootConnection()
+            keycloak_root_connection = get_admin_connection()
 
             user_wallet_address = None
             user_info = None
             try:
-                user_info, status_code = keycloak_interface.userinfo(token)
+                user_info, status_code = get_keycloak_interface().userinfo(token)
                 if status_code != 200:
                     return {'error': 'Invalid token'}, 401
 
@@ -215,25 +205,31 @@ class PersonView(Resource):
                 keycloak_root_connection.set_user_attributes(uuid, attributes.get('attributes'))
 
             payload['transactions'] = []
-            # TODO: integrate with the blockchain to update the user groups
-            if payload.get('groups') and user_wallet_address:
-                # Add groups to user in the PIP
-                for group in payload.get('groups'):
-                    tx = PIPSmartContract.add_group_to_user(user_wallet_address, group)
-                    payload['transactions'].append({
-                        'group': group,
-                        'transaction': transaction_to_dict(tx)
-                    })
-
-            # TODO: integrate with the blockchain to update the user role
-            if payload.get('role') and user_wallet_address:
-                tx = PIPSmartContract.set_user_role_attribute(user_wallet_address, payload.get('role'))
+            confirmation = confirmation_from_request(
+                request.args, payload, settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_WRITE_CONFIRMATION')
+            )
+            payload.pop('wait', None)
+            payload.pop('confirmation', None)
+            # Add the groups and set the role of the user in the PIP with a single transaction
+            if (payload.get('groups') or payload.get('role')) and user_wallet_address:
+                tx = get_pip().update_user_attributes(
+                    user_wallet_address,
+                    payload.get('groups'),
+                    payload.get('role'),
+                    confirmation=confirmation
+                )
                 payload['transactions'].append({
+                    'groups': payload.get('groups') or [],
                     'role': payload.get('role'),
-                    'transaction': transaction_to_dict(tx)
+                    'transaction': serialize_transaction(tx, confirmation)
                 })
 
-            return payload, 200
+            return payload, 202 if confirmation == Confirmation.SENT and payload['transactions'] else 200
+        except TransactionFailedError as e:
+            # mined but reverted or out of gas: the PIP attributes were not changed
+            return {'error': str(e), 'transaction': serialize_transaction(e.receipt, Confirmation.MINED)}, 500
+        except ValueError as e:
+            return {'error': str(e)}, 400
         except MissingTokenError as e:
             return {'error': e.message}, 401
         except KeycloakACError as e:
@@ -2,55 +2,27 @@ from flask import request
 from flask_restx import Namespace, Resource
 
 from api import settings
-from blockchain_interface.helpers.utils import transaction_to_dict
-from blockchain_interface.interfaces.ABACContracts.PAP import PolicyAdministrationPoint
-from blockchain_interface.interfaces.ABACContracts.PDP import PolicyDecisionPoint
-from blockchain_interface.interfaces.ABACContracts.PIP import PolicyInformationPoint
-from blockchain_interface.interfaces.HyperledgerBesu import HyperledgerBesu
-from keycloak_interface.keycloakInterface import KeycloakInterface
+from api.services import get_decision_engine, get_evm_interface, get_keycloak_interface, get_multicall, get_pap, \
+    get_pip
+from blockchain_interface.helpers.utils import confirmation_from_request, serialize_transaction
+from blockchain_interface.interfaces.TransactionTracker import Confirmation
 from keycloak_interface.utils.functions import extract_header_token
 
 api: Namespace = Namespace('Resources', description='ExtremeXP Resource Management Endpoints')
 
-keycloak_interface = KeycloakInterface(
-    server_url=settings.KEYCLOAK_CONFIG.get('KEYCLOAK_SERVER_URL'),
-    realm_name=settings.KEYCLOAK_CONFIG.get('KEYCLOAK_REALM'),
-    client_id=settings.KEYCLOAK_CONFIG.get('KEYCLOAK_CLIENT_ID'),
-    client_secret_key=settings.KEYCLOAK_CONFIG.get('KEYCLOAK_CLIENT_SECRET_KEY')
-)
-
-evm_interface_instance = HyperledgerBesu(settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_RPC_URL')).connect(
-    settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_PRIVATE_KEY')
-)
-
-PIPSmartContract = PolicyInformationPoint(
-    evm_interface_instance,
-    settings.BLOCKCHAIN_CONFIG.get('POLICY_INFORMATION_POINT_ADDRESS'),
-    f"{settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_CONTRACTS_ROOT_PATH')}/PIP.sol"
-).load()
-
-PAPSmartContract = PolicyAdministrationPoint(
-    evm_interface_instance,
-    settings.BLOCKCHAIN_CONFIG.get('POLICY_ADMINISTRATION_POINT_ADDRESS'),
-    f"{settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_CONTRACTS_ROOT_PATH')}/PAP.sol"
-).load()
-
-PDPSmartContract = PolicyDecisionPoint(
-    evm_interface_instance,
-    settings.BLOCKCHAIN_CONFIG.get('POLICY_DECISION_POINT_ADDRESS'),
-    f"{settings.BLOCKCHAIN_CONFIG.get('BLOCKCHAIN_CONTRACTS_ROOT_PATH')}/PDP.sol"
-).load()
-
 @api.route("/protect")
 class ProtectResourceView(Resource):
     @api.doc('protect', params={
         'uri': 'Resource URI',
         'content_hash': 'Resource Content Hash (can be 0x0 if not applicable)',
-        'policy_address': 'Policy address hash in the blockchain'
+        'policy_address': 'Policy address hash in the blockchain',
+        'confirmation': 'sent: answer 202 on broadcast with the transaction hashes to poll on /transaction/<hash>, '
+                        'mined: answer on receipt, details: receipt and transaction details',
+        'wait': 'Deprecated, wait=false is the same as confirmation=sent'
     })
     def post(self):
         token = extract_header_token(request)
-        if not keycloak_interface.validate_request_token(token):
+        if not get_keycloak_interface().validate_request_token(token):
             return {'error': 'Invalid or missing token'}, 401
         try:
             payload = request.json
@@ -59,24 +31,34 @@ class ProtectResourceView(Resource):
                 return {'error': 'Missing required fields'}, 400
 
             response = {}
-
-            # add resource to PIP
-            tx = PIPSmartContract.add_resource(
-                payload.get('uri'),
-                payload.get('content_hash'),
-            )
-
-            response['PIP_transaction'] = transaction_to_dict(tx)
-
-            # register resource in PAP
-            tx = PAPSmartContract.register_resource(
-                payload.get('uri'),
-                payload.get('policy_address')
+            confirmation = confirmation_from_request(
+                request.args, payload, settings.BLOCKCHAIN_CONFIG.get('PROTECT_WRITE_CONFIRMATION')
             )
 
-            response['PAP_transaction'] = transaction_to_dict(tx)
-
-            return response, 201
+            # add resource to PIP and register it in PAP: both transactions are sent back to back
+            # and mined together
+            with get_evm_interface().pipeline(confirmation) as pipeline:
+                get_pip().add_resource(payload.get('uri'), payload.get('content_hash'), pipeline=pipeline)
+                get_pap().register_resource(payload.get('uri'), payload.get('policy_address'),
+                                    pipeline=pipeline)
+
+            errors = {}
+            for contract, tx in zip(('PIP', 'PAP'), pipeline.results):
+                if isinstance(tx, Exception):
+                    errors[contract] = str(tx)
+                    response[f'{contract}_transaction'] = None
+                else:
+                    response[f'{contract}_transaction'] = serialize_transaction(tx, confirmation)
+                    if tx.get('status') == 0:
+                        errors[contract] = 'Transaction reverted'
+
+            if errors:
+                response['errors'] = errors
+                # 207: one of the contracts was updated, the other was not
+                return response, 207 if len(errors) < len(pipeline.results) else 500
+            return response, 202 if confirmation == Confirmation.SENT else 201
+        except ValueError as e:
+            return {'error': str(e)}, 400
         except Exception as e:
             return {'error': str(e)}, 401
 
@@ -85,7 +67,7 @@ class ProtectResourceView(Resource):
     }, methods=['GET'])
     def get(self, *args, **kwargs):
         token = extract_header_token(request)
-        if not keycloak_interface.validate_request_token(token):
+        if not get_keycloak_interface().validate_request_token(token):
             return {'error': 'Invalid or missing token'}, 401
         try:
             payload = dict(request.args)
@@ -94,7 +76,7 @@ class ProtectResourceView(Resource):
                 return {'error': 'Missing required fields'}, 400
 
             # get resource from PAP
-            policy_address = PAPSmartContract.get_resource_policy(payload.get('uri'))
+            policy_address = get_pap().get_resource_policy(payload.get('uri'))
             response = {
                 'policy_address': policy_address
             }
@@ -112,7 +94,7 @@ class AccessResourceView(Resource):
     })
     def post(self):
         token = extract_header_token(request)
-        if not keycloak_interface.validate_request_token(token):
+        if not get_keycloak_interface().validate_request_token(token):
             return {'error': 'Invalid or missing token'}, 401
         try:
             payload = request.json
@@ -120,11 +102,11 @@ class AccessResourceView(Resource):
             if not payload.get('uri') or not payload.get('origin_ip') or not payload.get('scope'):
                 return {'error': 'Missing required fields'}, 400
 
-            user_info, status_code = keycloak_interface.userinfo(token)
+            user_info, status_code = get_keycloak_interface().userinfo(token)
             if status_code != 200:
                 return {'error': 'Invalid token'}, 401
 
-            access_granted = PDPSmartContract.evaluate_request(
+            access_granted = get_decision_engine().evaluate_request(
                 user_info.get('user_wallet_address'),
                 user_info.get('email'),
                 payload.get('origin_ip'),
@@ -136,4 +118,81 @@ class AccessResourceView(Resource):
 
             return {"grant": access_granted}, 200 if access_granted else 403
         except Exception as e:
-            return {'error': str(e)}, 403
\ No newline at end of file
+            return {'error': str(e)}, 403
+
+@api.route("/access/batch")
+class AccessResourceBatchView(Resource):
+    @api.doc('access_batch', params={
+        'origin_ip': 'Origin IP Address, shared by every request',
+        'requests': 'List of {"uri": Resource URI, "scope": Scope or Action to be performed}',
+    })
+    def post(self):
+        token = extract_header_token(request)
+        if not get_keycloak_interface().validate_request_token(token):
+            return {'error': 'Invalid or missing token'}, 401
+        try:
+            payload = request.json
+            requests = payload.get('requests')
+
+            if not payload.get('origin_ip') or not isinstance(requests, list) or not requests:
+                return {'error': 'Missing required fields'}, 400
+            if any(not isinstance(item, dict) or not item.get('uri') or not item.get('scope') for item in requests):
+                return {'error': 'Every request needs an uri and a scope'}, 400
+            max_size = settings.BLOCKCHAIN_CONFIG.get('ACCESS_BATCH_MAX_SIZE')
+            if len(requests) > max_size:
+                return {'error': f'Too many requests, the maximum batch size is {max_size}'}, 413
+
+            user_info, status_code = get_keycloak_interface().userinfo(token)
+            if status_code != 200:
+                return {'error': 'Invalid token'}, 401
+
+            decisions = get_decision_engine().evaluate_requests(
+                user_info.get('user_wallet_address'),
+                user_info.get('email'),
+                payload.get('origin_ip'),
+                user_info.get('user_location_lat'),
+                user_info.get('user_location_long'),
+                [(item.get('uri'), item.get('scope')) for item in requests]
+            )
+
+            response = {"grants": {}, "decisions": []}
+            for item, decision in zip(requests, decisions):
+                grant = decision is True
+                detail = {"uri": item.get('uri'), "scope": item.get('scope'), "grant": grant}
+                if isinstance(decision, Exception):
+                    detail['error'] = str(decision)
+                response['decisions'].append(detail)
+                # an URI is granted if every requested scope is
+                response['grants'][item.get('uri')] = response['grants'].get(item.get('uri'), True) and grant
+
+            return response, 200
+        except Exception as e:
+            return {'error': str(e)}, 403
+
+@api.route("/context")
+class AccessContextView(Resource):
+    @api.doc('context', params={
+        'uri': 'Resource URI (repeat the parameter for several resources)'
+    })
+    def get(self):
+        token = extract_header_token(request)
+        if not get_keycloak_interface().validate_request_token(token):
+            return {'error': 'Invalid or missing token'}, 401
+        try:
+            uris = request.args.getlist('uri')
+            if not uris:
+                return {'error': 'Missing required fields'}, 400
+
+            user_info, status_code = get_keycloak_interface().userinfo(token)
+            if status_code != 200:
+                return {'error': 'Invalid token'}, 401
+
+            context = get_pip().get_access_context(
+                user_info.get('user_wallet_address'),
+                get_evm_interface().account_address,
+                uris,
+                multicall=get_multicall()
+            )
+            return context, 200
+        except Exception as e:
+            return {'error': str(e)}, 400
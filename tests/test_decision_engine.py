@@ -0,0 +1,159 @@
+"""
+SamplePolicyEvaluator against the semantics of contracts/SamplePolicy.sol, and the loading of the policy
+parameters by the DecisionEngine. The expected values are worked out from the Solidity code.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from eth_utils import keccak
+
+from blockchain_interface.decision_engine import DecisionEngine, GET_POLICY_PARAMETERS_SELECTOR, \
+    SamplePolicyEvaluator, is_point_in_polygon
+from blockchain_interface.errors import UnsupportedPolicyError
+
+POLICY_ADDRESS = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+
+# (lat, long) corners of a 10 x 10 square
+SQUARE = ((0, 0), (0, 10), (10, 10), (10, 0))
+
+HOUR = 3600
+DAY = 24 * HOUR
+# block.timestamp 0 is a Thursday, SamplePolicy counts the week days from Sunday (0)
+THURSDAY = 0
+SUNDAY = 3 * DAY
+
+
+def parameters(**overrides) -> dict:
+    values = {
+        "roles": ["researcher"],
+        "locations": [SQUARE],
+        "groups": ["lab"],
+        "ipHashes": [keccak(text="10.0.0.1")],
+        "contentValidHash": keccak(text="content-hash"),
+        "shiftStart": 9,
+        "shiftEnd": 17,
+        "workingDayStart": 1,
+        "workingDayEnd": 5,
+    }
+    values.update(overrides)
+    return values
+
+
+def context(**overrides) -> dict:
+    values = {
+        "userRole": "researcher",
+        "userGroups": ["other", "lab"],
+        "userLocation": (5, 5),
+        "userIPAddress": "10.0.0.1",
+        "resourceContentHash": "content-hash",
+    }
+    values.update(overrides)
+    return values
+
+
+class PointInPolygonTest(unittest.TestCase):
+    def test_inside_and_outside(self):
+        self.assertTrue(is_point_in_polygon(SQUARE, (5, 5)))
+        self.assertFalse(is_point_in_polygon(SQUARE, (5, 15)))
+        self.assertFalse(is_point_in_polygon(SQUARE, (15, 5)))
+
+    def test_division_truncates_towards_zero(self):
+        # edge (0, 0) -> (3, -2) at lat 1: Solidity gives x = -2 / 3 = 0, floor division would give -1.
+        # The point crosses it and the (3, 5) -> (0, 5) edge: 2 crossings, outside.
+        polygon = ((0, 0), (3, -2), (3, 5), (0, 5))
+        self.assertFalse(is_point_in_polygon(polygon, (1, -1)))
+
+
+class WorkHoursTest(unittest.TestCase):
+    def setUp(self):
+        self.evaluator = SamplePolicyEvaluator(parameters(workingDayStart=4, workingDayEnd=4))
+
+    def test_shift_bounds_are_inclusive(self):
+        self.assertFalse(self.evaluator.is_during_work_hours(THURSDAY + 8 * HOUR + 3599))
+        self.assertTrue(self.evaluator.is_during_work_hours(THURSDAY + 9 * HOUR))
+        self.assertTrue(self.evaluator.is_during_work_hours(THURSDAY + 17 * HOUR + 3599))
+        self.assertFalse(self.evaluator.is_during_work_hours(THURSDAY + 18 * HOUR))
+
+    def test_week_days_start_on_sunday(self):
+        evaluator = SamplePolicyEvaluator(parameters(workingDayStart=0, workingDayEnd=0))
+        self.assertTrue(evaluator.is_during_work_hours(SUNDAY + 12 * HOUR))
+        self.assertFalse(evaluator.is_during_work_hours(SUNDAY + DAY + 12 * HOUR))
+        self.assertFalse(self.evaluator.is_during_work_hours(THURSDAY + DAY + 12 * HOUR))
+
+    def test_next_work_hours_change(self):
+        self.assertEqual(self.evaluator.next_work_hours_change(THURSDAY + 10 * HOUR + 5), THURSDAY + 18 * HOUR)
+        self.assertEqual(self.evaluator.next_work_hours_change(THURSDAY + 18 * HOUR), 7 * DAY + 9 * HOUR)
+
+
+class EvaluateTest(unittest.TestCase):
+    def setUp(self):
+        self.evaluator = SamplePolicyEvaluator(parameters())
+        self.monday_noon = SUNDAY + DAY + 12 * HOUR
+
+    def test_grant(self):
+        self.assertTrue(self.evaluator.evaluate(context(), self.monday_noon))
+
+    def test_every_check_denies(self):
+        for denied in (context(resourceContentHash="other-hash"), context(userRole="default-role"),
+                       context(userGroups=["other"]), context(userGroups=[]), context(userIPAddress="10.0.0.2"),
+                       context(userLocation=(5, 15))):
+            self.assertFalse(self.evaluator.evaluate(denied, self.monday_noon), denied)
+        self.assertFalse(self.evaluator.evaluate(context(), SUNDAY + 12 * HOUR))
+
+    def test_user_must_be_inside_every_area(self):
+        evaluator = SamplePolicyEvaluator(parameters(locations=[SQUARE, ((20, 20), (20, 30), (30, 30), (30, 20))]))
+        self.assertFalse(evaluator.evaluate(context(), self.monday_noon))
+
+    def test_no_area_allows_every_location(self):
+        evaluator = SamplePolicyEvaluator(parameters(locations=[]))
+        self.assertTrue(evaluator.evaluate(context(userLocation=(-50, 400)), self.monday_noon))
+
+
+class EvaluatorLoadingTest(unittest.TestCase):
+    def setUp(self):
+        self.get_code = mock.Mock(return_value=b"\x63" + GET_POLICY_PARAMETERS_SELECTOR)
+        evm_interface = SimpleNamespace(web3=SimpleNamespace(eth=SimpleNamespace(get_code=self.get_code)))
+        self.engine = DecisionEngine(SimpleNamespace(evm_interface=evm_interface), "contracts")
+
+    def policy(self, get_policy_parameters):
+        policy = mock.Mock()
+        policy.return_value.load.return_value.get_policy_parameters.side_effect = get_policy_parameters
+        return policy
+
+    def test_parameters_are_read_once(self):
+        policy = self.policy(lambda: parameters())
+        with mock.patch("blockchain_interface.decision_engine.SamplePolicy", policy):
+            first = self.engine._get_evaluator(POLICY_ADDRESS)
+            self.assertIs(self.engine._get_evaluator(POLICY_ADDRESS), first)
+        self.assertEqual(policy.call_count, 1)
+
+    def test_contract_without_parameters_is_not_read_again(self):
+        self.get_code.return_value = b"\x60\x80"
+        policy = self.policy(lambda: parameters())
+        with mock.patch("blockchain_interface.decision_engine.SamplePolicy", policy):
+            for _ in range(2):
+                with self.assertRaises(UnsupportedPolicyError):
+                    self.engine._get_evaluator(POLICY_ADDRESS)
+        self.assertEqual(self.get_code.call_count, 1)
+        policy.assert_not_called()
+
+    def test_rpc_error_is_retried(self):
+        policy = self.policy([TimeoutError("node unreachable"), parameters()])
+        with mock.patch("blockchain_interface.decision_engine.SamplePolicy", policy):
+            with self.assertRaises(UnsupportedPolicyError):
+                self.engine._get_evaluator(POLICY_ADDRESS)
+            # within the retry interval the node is not queried again
+            with self.assertRaises(UnsupportedPolicyError):
+                self.engine._get_evaluator(POLICY_ADDRESS)
+            self.assertEqual(policy.call_count, 1)
+
+            with mock.patch.object(DecisionEngine, "EVALUATOR_RETRY_INTERVAL", 0):
+                self.assertIsInstance(self.engine._get_evaluator(POLICY_ADDRESS), SamplePolicyEvaluator)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+"""
+NonceManager reservations against a stub node, and the nonces used by EVMInterface.send_contract_transactions
+when a call of the batch fails.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+import itertools
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from blockchain_interface.interfaces.EVMInterface import EVMInterface
+from blockchain_interface.interfaces.NonceManager import NonceManager
+
+ACCOUNT = "0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266"
+
+_endpoints = itertools.count()
+
+
+class StubNode:
+    """
+    Pending nonce and broadcast transactions of one account: the pending nonce is the first nonce
+    the node does not know, nonces above it are queued.
+    """
+
+    def __init__(self, pending: int = 0):
+        self.known = set(range(pending))
+        self.eth = SimpleNamespace(
+            get_transaction_count=self.get_transaction_count,
+            send_raw_transaction=self.send_raw_transaction,
+            account=SimpleNamespace(sign_transaction=lambda transaction, private_key:
+                                    SimpleNamespace(raw_transaction=transaction)),
+            chain_id=1337,
+            gas_price=1,
+        )
+
+    @property
+    def pending(self) -> int:
+        return next(nonce for nonce in itertools.count() if nonce not in self.known)
+
+    def get_transaction_count(self, address, block_identifier="latest"):
+        return self.pending
+
+    def send_raw_transaction(self, transaction):
+        nonce = transaction["nonce"]
+        if nonce in self.known:
+            raise ValueError("nonce too low")
+        self.known.add(nonce)
+        return bytes([nonce])
+
+    def drop(self, nonce: int):
+        self.known.discard(nonce)
+
+
+def function(fails: bool = False):
+    """
+    A bound contract function call whose transaction build fails (e.g. reverts) if asked to.
+    """
+    def build_transaction(params):
+        if fails:
+            raise ValueError("execution reverted")
+        return dict(params)
+
+    return SimpleNamespace(build_transaction=build_transaction)
+
+
+class ReserveReleaseTest(unittest.TestCase):
+    def setUp(self):
+        self.node = StubNode()
+        self.manager = NonceManager(self.node)
+
+    def test_counter_starts_at_the_pending_nonce(self):
+        self.node.known.update(range(4))
+        self.assertEqual(self.manager.reserve_many(ACCOUNT, 3), [4, 5, 6])
+        self.assertEqual(self.manager.reserve(ACCOUNT), 7)
+
+    def test_released_middle_nonce_is_reused_first(self):
+        self.assertEqual(self.manager.reserve_many(ACCOUNT, 3), [0, 1, 2])
+        self.manager.release(ACCOUNT, 1)
+        self.assertEqual(self.manager.reserve(ACCOUNT), 1)
+        self.assertEqual(self.manager.reserve(ACCOUNT), 3)
+
+    def test_released_nonces_at_the_end_move_the_counter_back(self):
+        self.assertEqual(self.manager.reserve_many(ACCOUNT, 4), [0, 1, 2, 3])
+        self.manager.release(ACCOUNT, 2)
+        self.manager.release(ACCOUNT, 3)
+        self.assertEqual(self.manager.reserve_many(ACCOUNT, 3), [2, 3, 4])
+
+    def test_reserve_many_fills_the_gaps_then_takes_new_nonces(self):
+        self.manager.reserve_many(ACCOUNT, 5)
+        self.manager.release(ACCOUNT, 1)
+        self.manager.release(ACCOUNT, 3)
+        self.assertEqual(self.manager.reserve_many(ACCOUNT, 3), [1, 3, 5])
+
+
+class ResyncTest(unittest.TestCase):
+    def setUp(self):
+        self.node = StubNode()
+        self.manager = NonceManager(self.node)
+
+    def send(self, nonce: int):
+        self.node.send_raw_transaction({"nonce": nonce})
+        self.manager.sent(ACCOUNT, nonce)
+
+    def test_resync_without_reservations_resets_to_the_pending_nonce(self):
+        self.send(self.manager.reserve(ACCOUNT))
+        # another writer used the account
+        self.node.known.update(range(5))
+        self.manager.resync(ACCOUNT)
+        self.assertEqual(self.manager.reserve(ACCOUNT), 5)
+
+    def test_resync_keeps_the_nonces_in_flight(self):
+        self.assertEqual(self.manager.reserve_many(ACCOUNT, 3), [0, 1, 2])
+        self.send(0)
+        # 1 is still being signed, 2 failed to broadcast and 0 gets dropped from the pool
+        self.manager.release(ACCOUNT, 2)
+        self.node.drop(0)
+        self.manager.resync(ACCOUNT)
+
+        self.assertEqual(self.manager.reserve(ACCOUNT), 0)
+        self.assertEqual(self.manager.reserve(ACCOUNT), 2)
+        self.send(1)
+        self.assertEqual(self.manager.reserve(ACCOUNT), 3)
+
+    def test_resync_hands_out_the_nonces_the_node_lost(self):
+        self.assertEqual(self.manager.reserve_many(ACCOUNT, 4), [0, 1, 2, 3])
+        for nonce in (0, 1, 2):
+            self.send(nonce)
+        self.node.drop(1)
+        self.node.drop(2)
+        self.manager.resync(ACCOUNT)
+
+        self.assertEqual(self.manager.reserve_many(ACCOUNT, 3), [1, 2, 4])
+
+
+class SendContractTransactionsTest(unittest.TestCase):
+    def setUp(self):
+        self.node = StubNode()
+        with mock.patch("blockchain_interface.interfaces.EVMInterface.Web3", return_value=self.node), \
+                mock.patch("blockchain_interface.interfaces.EVMInterface.HTTPProvider"):
+            self.evm_interface = EVMInterface(f"http://stub-node-{next(_endpoints)}", "besu")
+        self.evm_interface.account_address = ACCOUNT
+        self.evm_interface.gas_limit = 4100000
+        self.evm_interface.gas_estimator.configure(enabled=False)
+
+    def assertNoGap(self, count: int):
+        self.assertEqual(self.node.known, set(range(count)))
+        self.assertEqual(self.evm_interface.nonce_manager.reserve(ACCOUNT), count)
+
+    def test_all_sent(self):
+        results = self.evm_interface.send_contract_transactions([function() for _ in range(3)])
+        self.assertEqual(results, [bytes([0]), bytes([1]), bytes([2])])
+        self.assertNoGap(3)
+
+    def test_failed_call_leaves_no_gap(self):
+        results = self.evm_interface.send_contract_transactions(
+            [function(), function(fails=True), function(), function()])
+
+        self.assertEqual(results[0], bytes([0]))
+        self.assertIsInstance(results[1], ValueError)
+        # the calls after the failed one take its nonce and the next ones
+        self.assertEqual(results[2:], [bytes([1]), bytes([2])])
+        self.assertNoGap(3)
+
+    def test_stale_counter_is_resynchronised(self):
+        self.evm_interface.nonce_manager.reserve_many(ACCOUNT, 2)
+        self.evm_interface.nonce_manager.release(ACCOUNT, 1)
+        self.evm_interface.nonce_manager.release(ACCOUNT, 0)
+        # another writer used nonces 0 and 1 meanwhile
+        self.node.known.update((0, 1))
+
+        results = self.evm_interface.send_contract_transactions([function() for _ in range(3)])
+
+        self.assertIsInstance(results[0], ValueError)
+        self.assertEqual(results[1:], [bytes([2]), bytes([3])])
+        self.assertNoGap(4)
+
+    def test_single_send_retries_after_a_nonce_error(self):
+        self.evm_interface.nonce_manager.reserve(ACCOUNT)
+        self.evm_interface.nonce_manager.release(ACCOUNT, 0)
+        self.node.known.add(0)
+
+        self.assertEqual(self.evm_interface.send_contract_transaction(function()), bytes([1]))
+        self.assertNoGap(2)
+
+
+if __name__ == "__main__":
+    unittest.main()
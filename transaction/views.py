@@ -0,0 +1,32 @@
+from flask import request
+from flask_restx import Namespace, Resource
+
+from api.services import get_evm_interface, get_keycloak_interface
+from keycloak_interface.errors import KeycloakACError, MissingTokenError
+from keycloak_interface.utils.functions import extract_header_token
+
+api: Namespace = Namespace('Transactions', description='ExtremeXP Blockchain Transaction Endpoints')
+
+
+@api.route("/<string:tx_hash>")
+class TransactionStatusView(Resource):
+    @api.doc('transaction_status', params={'tx_hash': 'Transaction hash returned by a non-blocking write'})
+    def get(self, tx_hash):
+        try:
+            token = extract_header_token(request)
+            if not get_keycloak_interface().validate_request_token(token):
+                return {'error': 'Invalid or missing token'}, 401
+            status = get_evm_interface().get_transaction_status(tx_hash)
+            if status is None:
+                return {'error': f'Transaction {tx_hash} not found'}, 404
+            return status, 200
+        except MissingTokenError as e:
+            return {'error': e.message}, 401
+        except KeycloakACError as e:
+            return {'error': str(e)}, e.error_code
+        except ValueError as e:
+            # not a transaction hash
+            return {'error': str(e)}, 400
+        except Exception as e:
+            # the node could not be queried
+            return {'error': "Internal server error", "error_description": str(e), "error_code": 500}, 500